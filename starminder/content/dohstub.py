@@ -0,0 +1,98 @@
+"""Local stand-in for Cloudflare Family DNS's JSON API, for benchmarking.
+
+Answers the queries query_family_dns makes, after a random delay and with
+a configurable share of failures, flagging hostnames under blocked_domains
+the way Family DNS flags filtered ones.
+"""
+
+from collections.abc import Iterable
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+
+class DohStubHandler(BaseHTTPRequestHandler):
+    server: "DohStubServer"
+
+    def do_GET(self) -> None:
+        stub = self.server
+        stub.count_request()
+
+        if stub.latency:
+            # exponential delays give the long tail real resolvers have
+            time.sleep(random.expovariate(1 / stub.latency))
+
+        if random.random() < stub.error_rate:
+            self.send_response(HTTPStatus.SERVICE_UNAVAILABLE)
+            self.end_headers()
+            return
+
+        params = parse_qs(urlsplit(self.path).query)
+        name = params.get("name", [""])[0].lower()
+        blocked = stub.is_blocked(name)
+
+        payload: dict = {
+            "Status": 0,
+            "Answer": [
+                {
+                    "name": name,
+                    "type": 1,
+                    "data": "0.0.0.0" if blocked else "192.0.2.1",
+                }
+            ],
+        }
+        if blocked:
+            payload["Comment"] = ["EDE(17): Filtered"]
+
+        body = json.dumps(payload).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/dns-json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+class DohStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        error_rate: float = 0.0,
+        blocked_domains: Iterable[str] = (),
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), DohStubHandler)
+        self.latency = latency  # mean seconds per response
+        self.error_rate = error_rate
+        self.blocked_domains = frozenset(blocked_domains)
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}/dns-query"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.request_count += 1
+
+    def is_blocked(self, name: str) -> bool:
+        return any(
+            name == domain or name.endswith(f".{domain}")
+            for domain in self.blocked_domains
+        )
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
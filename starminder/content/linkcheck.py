@@ -1,17 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
 import re
 import time
+from typing import NamedTuple
 from urllib.parse import urlsplit
 
+from django.utils import timezone
 import httpx
 from httpx_retries import Retry, RetryTransport
 import idna
 from loguru import logger
 import sentry_sdk
 
+from starminder.content.models import HostnameVerdict
+
 
 FAMILY_DOH_URL = "https://family.cloudflare-dns.com/dns-query"
 BLOCKED_ANSWERS = {"0.0.0.0", "::"}
 DOH_TIME_BUDGET = 60  # seconds per reminder
+# hostnames looked up at once, so slow lookups share the time budget
+# instead of queueing behind each other
+DOH_CONCURRENCY = 8
+
+# domains whose hostnames are never looked up; every reminder already
+# links each repository on github.com
+SAFE_DOMAINS = frozenset({"github.com"})
+
+# how long a hostname's verdict is reused before it's checked again; failed
+# checks are retried soon, so an outage doesn't keep hostnames flagged
+CLEAN_VERDICT_TTL = timedelta(days=1)
+FLAGGED_VERDICT_TTL = timedelta(days=7)
+FAILED_VERDICT_TTL = timedelta(minutes=10)
 
 SCHEME_URL_RE = re.compile(r"""https?://[^\s<>"')\[\]]+""", re.IGNORECASE)
 # labels are unicode letters/digits (matching url-regex-safe's breadth); the
@@ -23,6 +42,14 @@ class DohTimeBudgetExceededError(Exception):
     pass
 
 
+class LinkCheck(NamedTuple):
+    flagged_urls: set[str]
+    # flagged only because the time budget ran out before their lookup
+    skipped_urls: list[str]
+    # hostnames with neither a safe domain nor a cached verdict
+    queried_hostnames: set[str]
+
+
 def extract_urls(text: str) -> list[str]:
     """Extract URL-ish tokens, including bare domains, the way spam scanners do."""
     urls = SCHEME_URL_RE.findall(text)
@@ -44,20 +71,37 @@ def extract_hostname(url: str) -> str | None:
         return None
 
 
-def query_family_dns(client: httpx.Client, domain: str) -> bool:
+def normalize_hostname(hostname: str) -> str | None:
+    """Reduce hostname to the ASCII form its DNS verdict is looked up by."""
+    hostname = hostname.lower().rstrip(".")
+    if not hostname:
+        return None
+    if hostname.startswith("www.") and hostname.count(".") > 1:
+        hostname = hostname.removeprefix("www.")
+
     # IDNA 2008 first (matches modern registry encodings, e.g. faß.de),
-    # stdlib IDNA 2003 as fallback; unencodable domains go through raw and
+    # stdlib IDNA 2003 as fallback; unencodable hostnames go through raw and
     # any resulting DoH error lands in the fail-closed handler
     try:
-        domain = idna.encode(domain).decode("ascii")
+        return idna.encode(hostname).decode("ascii")
     except idna.IDNAError:
         try:
-            domain = domain.encode("idna").decode("ascii")
+            return hostname.encode("idna").decode("ascii")
         except UnicodeError:
-            pass
+            return hostname
+
 
+def is_safe_hostname(hostname: str) -> bool:
+    return any(
+        hostname == domain or hostname.endswith(f".{domain}") for domain in SAFE_DOMAINS
+    )
+
+
+def query_family_dns(
+    client: httpx.Client, domain: str, doh_url: str = FAMILY_DOH_URL
+) -> bool:
     response = client.get(
-        FAMILY_DOH_URL,
+        doh_url,
         params={"name": domain, "type": "A"},
         headers={"Accept": "application/dns-json"},
     )
@@ -78,6 +122,164 @@ def query_family_dns(client: httpx.Client, domain: str) -> bool:
     )
 
 
+def get_cached_verdicts(hostnames: set[str]) -> dict[str, bool]:
+    """Return the unexpired cached verdicts for hostnames."""
+    return dict(
+        HostnameVerdict.objects.filter(
+            hostname__in=hostnames,
+            expires_at__gt=timezone.now(),
+        ).values_list("hostname", "flagged")
+    )
+
+
+def cache_verdicts(verdicts: dict[str, bool], failed_hostnames: set[str]) -> None:
+    """Store freshly checked verdicts, replacing any expired ones."""
+    now = timezone.now()
+    cached_verdicts = []
+    for hostname, flagged in verdicts.items():
+        # longer than DNS allows, so it can't resolve and isn't worth a row
+        if len(hostname) > 253:
+            continue
+
+        if hostname in failed_hostnames:
+            ttl = FAILED_VERDICT_TTL
+        elif flagged:
+            ttl = FLAGGED_VERDICT_TTL
+        else:
+            ttl = CLEAN_VERDICT_TTL
+
+        cached_verdicts.append(
+            HostnameVerdict(
+                hostname=hostname,
+                flagged=flagged,
+                failed=hostname in failed_hostnames,
+                expires_at=now + ttl,
+            )
+        )
+
+    HostnameVerdict.objects.bulk_create(
+        cached_verdicts,
+        update_conflicts=True,
+        unique_fields=["hostname"],
+        update_fields=["flagged", "failed", "expires_at", "updated_at"],
+    )
+
+
+def query_hostnames(
+    hostnames: set[str],
+    deadline: float,
+    *,
+    doh_url: str,
+    concurrency: int,
+) -> tuple[dict[str, bool], set[str]]:
+    """Check hostnames against Family DNS concurrently until the deadline.
+
+    Returns the verdicts reached in time, and which of those are failed
+    checks flagged to fail closed. Hostnames still unresolved at the
+    deadline get no verdict.
+    """
+    verdicts: dict[str, bool] = {}
+    failed_hostnames: set[str] = set()
+    if not hostnames:
+        return verdicts, failed_hostnames
+
+    httpx_transport = RetryTransport(retry=Retry(total=3, backoff_factor=0.5))
+    client = httpx.Client(transport=httpx_transport, timeout=5)
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    futures = {
+        executor.submit(query_family_dns, client, hostname, doh_url): hostname
+        for hostname in hostnames
+    }
+    done, not_done = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+
+    if not_done:
+        # don't hold the reminder up for lookups past the deadline: queued
+        # ones are dropped and running ones end within the client timeout,
+        # leaving the client for garbage collection once they do
+        executor.shutdown(wait=False, cancel_futures=True)
+    else:
+        executor.shutdown()
+        client.close()
+
+    for future in done:
+        hostname = futures[future]
+        try:
+            verdicts[hostname] = future.result()
+        except Exception:
+            logger.exception(
+                f"Family DNS check failed for {hostname}, omitting from email"
+            )
+            verdicts[hostname] = True
+            failed_hostnames.add(hostname)
+
+    return verdicts, failed_hostnames
+
+
+def check_urls(
+    urls: list[str],
+    *,
+    doh_url: str,
+    concurrency: int,
+    time_budget: float,
+) -> LinkCheck:
+    """Check urls against Family DNS, failing closed, and report how it went.
+
+    Hostnames are normalized and deduplicated first, and hostnames under
+    SAFE_DOMAINS or with an unexpired cached verdict aren't queried.
+    """
+    if not urls:
+        return LinkCheck(set(), [], set())
+
+    deadline = time.monotonic() + time_budget
+
+    hostnames = {}
+    for url in urls:
+        hostname = extract_hostname(url)
+        hostnames[url] = normalize_hostname(hostname) if hostname else None
+
+    distinct_hostnames = {hostname for hostname in hostnames.values() if hostname}
+    safe_hostnames = {
+        hostname for hostname in distinct_hostnames if is_safe_hostname(hostname)
+    }
+    verdicts = dict.fromkeys(safe_hostnames, False)
+    verdicts.update(get_cached_verdicts(distinct_hostnames - safe_hostnames))
+
+    unchecked_hostnames = {
+        hostname
+        for hostname in hostnames.values()
+        if hostname and hostname not in verdicts
+    }
+    checked_verdicts, failed_hostnames = query_hostnames(
+        unchecked_hostnames, deadline, doh_url=doh_url, concurrency=concurrency
+    )
+    verdicts.update(checked_verdicts)
+
+    flagged_urls = set()
+    skipped_urls = []
+    for url in urls:
+        hostname = hostnames[url]
+
+        if hostname is None:
+            logger.warning(f"No hostname in {url}, omitting from email")
+            flagged_urls.add(url)
+            continue
+
+        if hostname not in verdicts:
+            logger.warning(f"DoH time budget exhausted, omitting {url} from email")
+            flagged_urls.add(url)
+            skipped_urls.append(url)
+            continue
+
+        if verdicts[hostname]:
+            logger.info(f"Omitting {url} from email (hostname {hostname})")
+            flagged_urls.add(url)
+
+    if checked_verdicts:
+        cache_verdicts(checked_verdicts, failed_hostnames)
+
+    return LinkCheck(flagged_urls, skipped_urls, unchecked_hostnames)
+
+
 def get_flagged_urls(urls: list[str]) -> set[str]:
     """Return the subset of urls considered unsafe for outgoing email.
 
@@ -85,52 +287,20 @@ def get_flagged_urls(urls: list[str]) -> set[str]:
     Family DNS, if no hostname can be extracted, if the check errors, or if
     the time budget runs out before it can be checked.
     """
-    if not urls:
-        return set()
-
-    flagged_urls = set()
-    verdicts: dict[str, bool] = {}
-    skipped_urls = []
-    deadline = time.monotonic() + DOH_TIME_BUDGET
+    link_check = check_urls(
+        urls,
+        doh_url=FAMILY_DOH_URL,
+        concurrency=DOH_CONCURRENCY,
+        time_budget=DOH_TIME_BUDGET,
+    )
 
-    httpx_transport = RetryTransport(retry=Retry(total=3, backoff_factor=0.5))
-    with httpx.Client(transport=httpx_transport, timeout=5) as client:
-        for url in urls:
-            hostname = extract_hostname(url)
-
-            if hostname is None:
-                logger.warning(f"No hostname in {url}, omitting from email")
-                flagged_urls.add(url)
-                continue
-
-            if hostname not in verdicts:
-                if time.monotonic() > deadline:
-                    logger.warning(
-                        f"DoH time budget exhausted, omitting {url} from email"
-                    )
-                    flagged_urls.add(url)
-                    skipped_urls.append(url)
-                    continue
-
-                try:
-                    verdicts[hostname] = query_family_dns(client, hostname)
-                except Exception:
-                    logger.exception(
-                        f"Family DNS check failed for {hostname}, omitting from email"
-                    )
-                    verdicts[hostname] = True
-
-            if verdicts[hostname]:
-                logger.info(f"Omitting {url} from email (hostname {hostname})")
-                flagged_urls.add(url)
-
-    if skipped_urls:
+    if link_check.skipped_urls:
         sentry_sdk.capture_exception(
             DohTimeBudgetExceededError(
                 f"DoH time budget ({DOH_TIME_BUDGET}s) exceeded, "
-                f"failed closed on {len(skipped_urls)} unchecked URLs"
+                f"failed closed on {len(link_check.skipped_urls)} unchecked URLs"
             ),
-            extras={"skipped_urls": skipped_urls},
+            extras={"skipped_urls": link_check.skipped_urls},
         )
 
-    return flagged_urls
+    return link_check.flagged_urls
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.6 on 2026-10-18 20:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("content", "0010_star_description_flagged_star_name_flagged_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HostnameVerdict",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("hostname", models.CharField(max_length=255, unique=True)),
+                ("flagged", models.BooleanField()),
+                ("failed", models.BooleanField(default=False)),
+                ("expires_at", models.DateTimeField()),
+            ],
+            options={
+                "verbose_name": "Hostname Verdict",
+            },
+        ),
+    ]
@@ -1,7 +1,14 @@
 from typing import ClassVar
 
 from django.conf import settings
-from django.db.models import BooleanField, CASCADE, ForeignKey, Manager
+from django.db.models import (
+    BooleanField,
+    CASCADE,
+    CharField,
+    DateTimeField,
+    ForeignKey,
+    Manager,
+)
 import emoji
 
 from starminder.core.models import StarFieldsBase, TimestampedModel
@@ -50,3 +57,21 @@ class Star(TimestampedModel, StarFieldsBase):
         if self.name_flagged:
             return self.name.replace(".", "[.]")
         return self.name
+
+
+class HostnameVerdict(TimestampedModel):
+    """Cached Family DNS verdict for a hostname, shared across reminders."""
+
+    objects: ClassVar["Manager[HostnameVerdict]"]
+
+    hostname = CharField(max_length=255, unique=True)
+    flagged = BooleanField()
+    # the check errored and the hostname was flagged to fail closed
+    failed = BooleanField(default=False)
+    expires_at = DateTimeField()
+
+    class Meta:
+        verbose_name = "Hostname Verdict"
+
+    def __str__(self) -> str:
+        return f"{self.hostname}, {'flagged' if self.flagged else 'clean'}"
@@ -0,0 +1,44 @@
+import httpx
+import pytest
+
+from starminder.content.dohstub import DohStubServer
+from starminder.content.linkcheck import query_family_dns
+
+
+@pytest.fixture
+def doh_stub():
+    def start(**kwargs) -> DohStubServer:
+        server = DohStubServer(latency=0, **kwargs)
+        server.start()
+        servers.append(server)
+        return server
+
+    servers: list[DohStubServer] = []
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def test_doh_stub_answers_clean_hostname(doh_stub) -> None:
+    server = doh_stub()
+
+    with httpx.Client() as client:
+        assert query_family_dns(client, "example.com", server.url) is False
+
+    assert server.request_count == 1
+
+
+def test_doh_stub_flags_blocked_domains(doh_stub) -> None:
+    server = doh_stub(blocked_domains=["example.com"])
+
+    with httpx.Client() as client:
+        assert query_family_dns(client, "example.com", server.url) is True
+        assert query_family_dns(client, "docs.example.com", server.url) is True
+        assert query_family_dns(client, "notexample.com", server.url) is False
+
+
+def test_doh_stub_fails_at_error_rate(doh_stub) -> None:
+    server = doh_stub(error_rate=1.0)
+
+    with httpx.Client() as client, pytest.raises(httpx.HTTPStatusError):
+        query_family_dns(client, "example.com", server.url)
@@ -1,15 +1,26 @@
+from datetime import timedelta
+import threading
+import time
 from unittest.mock import MagicMock, Mock, patch
 
+from django.utils import timezone
 import httpx
 import pytest
 
 from starminder.content.linkcheck import (
+    CLEAN_VERDICT_TTL,
     DohTimeBudgetExceededError,
+    FAILED_VERDICT_TTL,
+    FAMILY_DOH_URL,
+    FLAGGED_VERDICT_TTL,
     extract_hostname,
+    check_urls,
     extract_urls,
     get_flagged_urls,
+    normalize_hostname,
     query_family_dns,
 )
+from starminder.content.models import HostnameVerdict
 
 
 # extract_urls tests
@@ -110,6 +121,42 @@ def test_extract_hostname_bracket_full_url() -> None:
     assert extract_hostname("https://[your-domain]/api") is None
 
 
+# normalize_hostname tests
+
+
+def test_normalize_hostname_lowercases() -> None:
+    assert normalize_hostname("Example.COM") == "example.com"
+
+
+def test_normalize_hostname_strips_trailing_dot() -> None:
+    assert normalize_hostname("example.com.") == "example.com"
+
+
+def test_normalize_hostname_strips_www() -> None:
+    assert normalize_hostname("www.example.com") == "example.com"
+
+
+def test_normalize_hostname_keeps_www_domain() -> None:
+    assert normalize_hostname("www.com") == "www.com"
+
+
+def test_normalize_hostname_empty() -> None:
+    assert normalize_hostname(".") is None
+
+
+def test_normalize_hostname_punycodes_idn() -> None:
+    assert normalize_hostname("ドメイン.jp") == "xn--eckwd4c7c.jp"
+
+
+def test_normalize_hostname_uses_idna_2008() -> None:
+    # IDNA 2003 would mangle this to fass.de — the wrong domain
+    assert normalize_hostname("faß.de") == "xn--fa-hia.de"
+
+
+def test_normalize_hostname_passes_unencodable_hostname_raw() -> None:
+    assert normalize_hostname("bad..domain") == "bad..domain"
+
+
 # query_family_dns tests
 
 
@@ -194,36 +241,11 @@ def test_query_family_dns_queries_correct_endpoint() -> None:
     assert call_args[1]["headers"] == {"Accept": "application/dns-json"}
 
 
-def test_query_family_dns_punycodes_idn() -> None:
-    client = make_client({"Status": 0})
-
-    query_family_dns(client, "ドメイン.jp")
-
-    assert client.get.call_args[1]["params"]["name"] == "xn--eckwd4c7c.jp"
-
-
-def test_query_family_dns_uses_idna_2008() -> None:
-    client = make_client({"Status": 0})
-
-    query_family_dns(client, "faß.de")
-
-    # IDNA 2003 would mangle this to fass.de — the wrong domain
-    assert client.get.call_args[1]["params"]["name"] == "xn--fa-hia.de"
-
-
-def test_query_family_dns_passes_unencodable_domain_raw() -> None:
-    client = make_client({"Status": 0})
-
-    query_family_dns(client, "bad..domain")
-
-    assert client.get.call_args[1]["params"]["name"] == "bad..domain"
-
-
 # get_flagged_urls tests
 
 
 @pytest.fixture
-def mock_client():
+def mock_client(db):
     with patch("starminder.content.linkcheck.httpx.Client") as mock_client_class:
         client = MagicMock()
         client.__enter__.return_value = client
@@ -299,17 +321,22 @@ def test_get_flagged_urls_does_not_retry_errored_hostname(
     mock_query.assert_called_once()
 
 
+def slow_query(client, hostname, doh_url) -> bool:
+    time.sleep(0.5)
+    return False
+
+
 @patch("starminder.content.linkcheck.sentry_sdk")
 @patch("starminder.content.linkcheck.query_family_dns")
 def test_get_flagged_urls_budget_exhaustion(
     mock_query, mock_sentry, mock_client, monkeypatch
 ) -> None:
-    monkeypatch.setattr("starminder.content.linkcheck.DOH_TIME_BUDGET", -1)
+    monkeypatch.setattr("starminder.content.linkcheck.DOH_TIME_BUDGET", 0.05)
+    mock_query.side_effect = slow_query
 
     result = get_flagged_urls(["https://example.com", "https://cheat.sh"])
 
     assert result == {"https://example.com", "https://cheat.sh"}
-    mock_query.assert_not_called()
 
     mock_sentry.capture_exception.assert_called_once()
     call_args = mock_sentry.capture_exception.call_args
@@ -320,6 +347,29 @@ def test_get_flagged_urls_budget_exhaustion(
     }
 
 
+@patch("starminder.content.linkcheck.sentry_sdk")
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_check_urls_reports_skipped_urls_without_sentry(
+    mock_query, mock_sentry, mock_client
+) -> None:
+    mock_query.side_effect = slow_query
+
+    result = check_urls(
+        ["https://example.com", "https://github.com/owner/repo"],
+        doh_url="http://127.0.0.1:1/dns-query",
+        concurrency=1,
+        time_budget=0.05,
+    )
+
+    assert result.flagged_urls == {"https://example.com"}
+    assert result.skipped_urls == ["https://example.com"]
+    assert result.queried_hostnames == {"example.com"}
+    mock_query.assert_called_once_with(
+        mock_client, "example.com", "http://127.0.0.1:1/dns-query"
+    )
+    mock_sentry.capture_exception.assert_not_called()
+
+
 @patch("starminder.content.linkcheck.sentry_sdk")
 @patch("starminder.content.linkcheck.query_family_dns")
 def test_get_flagged_urls_no_sentry_within_budget(
@@ -340,3 +390,158 @@ def test_get_flagged_urls_empty_input(mock_query, mock_client) -> None:
 
     assert result == set()
     mock_query.assert_not_called()
+
+
+# verdict cache tests
+
+
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_get_flagged_urls_reuses_cached_verdicts(mock_query, mock_client) -> None:
+    mock_query.return_value = True
+
+    get_flagged_urls(["https://example.com/one"])
+    result = get_flagged_urls(["https://example.com/two"])
+
+    assert result == {"https://example.com/two"}
+    mock_query.assert_called_once()
+
+
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_get_flagged_urls_requeries_expired_verdicts(mock_query, mock_client) -> None:
+    HostnameVerdict.objects.create(
+        hostname="example.com",
+        flagged=True,
+        expires_at=timezone.now() - timedelta(seconds=1),
+    )
+    mock_query.return_value = False
+
+    result = get_flagged_urls(["https://example.com"])
+
+    assert result == set()
+    mock_query.assert_called_once()
+    verdict = HostnameVerdict.objects.get(hostname="example.com")
+    assert verdict.flagged is False
+    assert verdict.expires_at > timezone.now()
+
+
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_get_flagged_urls_caches_verdicts_with_ttls(mock_query, mock_client) -> None:
+    results = {
+        "wifiphisher.org": True,
+        "example.com": False,
+        "cheat.sh": httpx.ConnectError("boom"),
+    }
+
+    def query(client, hostname, doh_url) -> bool:
+        if isinstance(results[hostname], Exception):
+            raise results[hostname]
+        return results[hostname]
+
+    mock_query.side_effect = query
+    before = timezone.now()
+
+    get_flagged_urls(
+        ["https://wifiphisher.org", "https://example.com", "https://cheat.sh"]
+    )
+
+    verdicts = {verdict.hostname: verdict for verdict in HostnameVerdict.objects.all()}
+    assert verdicts["wifiphisher.org"].flagged is True
+    assert verdicts["wifiphisher.org"].expires_at >= before + FLAGGED_VERDICT_TTL
+    assert verdicts["example.com"].flagged is False
+    assert verdicts["example.com"].expires_at >= before + CLEAN_VERDICT_TTL
+    assert verdicts["cheat.sh"].flagged is True
+    assert verdicts["cheat.sh"].failed is True
+    assert verdicts["cheat.sh"].expires_at < before + CLEAN_VERDICT_TTL
+    assert verdicts["cheat.sh"].expires_at >= before + FAILED_VERDICT_TTL
+
+
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_get_flagged_urls_does_not_cache_skipped_hostnames(
+    mock_query, mock_client, monkeypatch
+) -> None:
+    monkeypatch.setattr("starminder.content.linkcheck.DOH_TIME_BUDGET", 0.05)
+    mock_query.side_effect = slow_query
+
+    get_flagged_urls(["https://example.com"])
+
+    assert not HostnameVerdict.objects.exists()
+
+
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_check_urls_queries_hostnames_concurrently(mock_query, mock_client) -> None:
+    # one at a time, the first lookup would break the barrier and be flagged
+    barrier = threading.Barrier(4, timeout=5)
+
+    def barrier_query(client, hostname, doh_url) -> bool:
+        barrier.wait()
+        return False
+
+    mock_query.side_effect = barrier_query
+
+    result = check_urls(
+        [f"https://example{i}.com" for i in range(4)],
+        doh_url=FAMILY_DOH_URL,
+        concurrency=4,
+        time_budget=30,
+    )
+
+    assert result.flagged_urls == set()
+    assert mock_query.call_count == 4
+
+
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_get_flagged_urls_concurrency_is_capped(
+    mock_query, mock_client, monkeypatch
+) -> None:
+    monkeypatch.setattr("starminder.content.linkcheck.DOH_CONCURRENCY", 2)
+    in_flight = []
+    peak_in_flight = []
+
+    def tracked_query(client, hostname, doh_url) -> bool:
+        in_flight.append(hostname)
+        peak_in_flight.append(len(in_flight))
+        time.sleep(0.05)
+        in_flight.remove(hostname)
+        return False
+
+    mock_query.side_effect = tracked_query
+
+    get_flagged_urls([f"https://example{i}.com" for i in range(6)])
+
+    assert mock_query.call_count == 6
+    assert max(peak_in_flight) <= 2
+
+
+# normalization and allowlist tests
+
+
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_get_flagged_urls_dedupes_normalized_hostnames(mock_query, mock_client) -> None:
+    mock_query.return_value = True
+    urls = ["https://Example.com", "example.com.", "https://www.example.com/docs"]
+
+    result = get_flagged_urls(urls)
+
+    assert result == set(urls)
+    mock_query.assert_called_once_with(mock_client, "example.com", FAMILY_DOH_URL)
+
+
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_get_flagged_urls_skips_safe_domains(mock_query, mock_client) -> None:
+    result = get_flagged_urls(["https://github.com/owner/repo", "docs.github.com"])
+
+    assert result == set()
+    mock_query.assert_not_called()
+    assert not HostnameVerdict.objects.exists()
+
+
+@patch("starminder.content.linkcheck.query_family_dns")
+def test_get_flagged_urls_safe_domain_is_not_a_suffix_match(
+    mock_query, mock_client
+) -> None:
+    mock_query.return_value = True
+
+    result = get_flagged_urls(["https://notgithub.com"])
+
+    assert result == {"https://notgithub.com"}
+    mock_query.assert_called_once()
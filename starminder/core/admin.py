@@ -42,6 +42,8 @@ class UserProfileAdmin(admin.ModelAdmin):
         "max_entries",
         "day_of_week",
         "hour_of_day",
+        "time_zone",
+        "next_run_at",
         "enabled",
     ]
     list_filter = ["enabled"]
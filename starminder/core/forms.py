@@ -1,3 +1,5 @@
+from zoneinfo import available_timezones
+
 from django import forms
 
 from starminder.core.models import UserProfile
@@ -21,6 +23,11 @@ class UserProfileConfigForm(forms.ModelForm):
         widget=forms.Select(),
     )
 
+    time_zone = forms.ChoiceField(
+        choices=[(name, name) for name in sorted(available_timezones())],
+        label="Time zone",
+    )
+
     class Meta:
         model = UserProfile
         fields = [
@@ -28,6 +35,7 @@ class UserProfileConfigForm(forms.ModelForm):
             "max_entries",
             "day_of_week",
             "hour_of_day",
+            "time_zone",
             "include_archived",
             "include_own",
         ]
@@ -0,0 +1,260 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from http import HTTPStatus
+import threading
+import time
+from typing import Any, NamedTuple
+
+from django.utils import timezone
+from django_q.tasks import schedule
+import httpx
+from httpx_retries import Retry, RetryTransport
+from loguru import logger
+
+from starminder.core.models import GrantRevocation
+
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_HEADERS = {
+    "Accept": "application/vnd.github+json",
+    "X-GitHub-Api-Version": "2022-11-28",
+}
+
+# requests left in a token's hourly budget below which work is deferred
+# until the budget resets, rather than spent on requests that may be refused
+RATE_LIMIT_RESERVE = 10
+# fallback wait for a rate limit that doesn't say when it lifts
+SECONDARY_RATE_LIMIT_WAIT = timedelta(minutes=1)
+
+
+class GitHubRateLimitedError(Exception):
+    def __init__(self, retry_at: datetime) -> None:
+        super().__init__(f"GitHub rate limit reached, retry at {retry_at}")
+        self.retry_at = retry_at
+
+
+class GitHubGraphQLError(Exception):
+    pass
+
+
+class RateLimit(NamedTuple):
+    remaining: int
+    reset_at: float  # epoch seconds
+
+
+_client: httpx.Client | None = None
+_client_lock = threading.Lock()
+_rate_limits: dict[str, RateLimit] = {}
+
+
+def get_client() -> httpx.Client:
+    """Return this process's GitHub client, creating it on first use."""
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            # transient server errors are retried in place; rate limits (403
+            # and 429) are not, since retrying those just burns more budget;
+            # POST is only used for GraphQL queries, which are safe to repeat
+            httpx_transport = RetryTransport(
+                retry=Retry(
+                    total=5,
+                    backoff_factor=0.5,
+                    allowed_methods=["GET", "POST", "DELETE"],
+                    status_forcelist=[
+                        HTTPStatus.BAD_GATEWAY,
+                        HTTPStatus.SERVICE_UNAVAILABLE,
+                        HTTPStatus.GATEWAY_TIMEOUT,
+                    ],
+                )
+            )
+            _client = httpx.Client(
+                base_url=GITHUB_API_URL,
+                transport=httpx_transport,
+                timeout=30,
+            )
+
+    return _client
+
+
+def check_rate_limit(key: str) -> None:
+    """Raise GitHubRateLimitedError if key's known budget is spent."""
+    rate_limit = _rate_limits.get(key)
+    if rate_limit is None:
+        return
+
+    if rate_limit.remaining < RATE_LIMIT_RESERVE and rate_limit.reset_at > time.time():
+        raise GitHubRateLimitedError(
+            datetime.fromtimestamp(rate_limit.reset_at, tz=UTC)
+        )
+
+
+def record_rate_limit(key: str, response: httpx.Response) -> None:
+    """Track key's remaining budget from the response's rate limit headers."""
+    try:
+        _rate_limits[key] = RateLimit(
+            remaining=int(response.headers["X-RateLimit-Remaining"]),
+            reset_at=float(response.headers["X-RateLimit-Reset"]),
+        )
+    except (KeyError, ValueError):
+        pass
+
+
+def get_reset_at(response: httpx.Response) -> datetime:
+    """Return when the response's rate limit budget resets."""
+    try:
+        reset_at = float(response.headers["X-RateLimit-Reset"])
+    except (KeyError, ValueError):
+        return timezone.now() + SECONDARY_RATE_LIMIT_WAIT
+    return datetime.fromtimestamp(reset_at, tz=UTC)
+
+
+def get_retry_at(response: httpx.Response) -> datetime | None:
+    """Return when to retry if the response is a rate limit refusal."""
+    if response.status_code not in (
+        HTTPStatus.FORBIDDEN,
+        HTTPStatus.TOO_MANY_REQUESTS,
+    ):
+        return None
+
+    # secondary rate limits say how long to back off
+    if retry_after := response.headers.get("Retry-After"):
+        try:
+            return timezone.now() + timedelta(seconds=int(retry_after))
+        except ValueError:
+            return timezone.now() + SECONDARY_RATE_LIMIT_WAIT
+
+    # primary rate limits say when the budget resets
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        return get_reset_at(response)
+
+    # a 429 is always a rate limit, even without any of the headers
+    if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+        return timezone.now() + SECONDARY_RATE_LIMIT_WAIT
+
+    # any other 403 is a real permission error
+    return None
+
+
+def request(
+    method: str,
+    url: str,
+    *,
+    token: str | None = None,
+    auth: tuple[str, str] | None = None,
+    headers: dict[str, str] | None = None,
+    **kwargs: Any,
+) -> httpx.Response:
+    """Make a GitHub API request over the shared client, minding rate limits.
+
+    Authenticates with a user token or with app credentials (auth), whose
+    budgets are tracked separately. Raises GitHubRateLimitedError instead
+    of sending a request that would exceed the budget, and when GitHub
+    refuses one for rate limiting.
+    """
+    with stream(
+        method, url, token=token, auth=auth, headers=headers, **kwargs
+    ) as response:
+        response.read()
+
+    return response
+
+
+@contextmanager
+def stream(
+    method: str,
+    url: str,
+    *,
+    token: str | None = None,
+    auth: tuple[str, str] | None = None,
+    headers: dict[str, str] | None = None,
+    **kwargs: Any,
+) -> Iterator[httpx.Response]:
+    """Like request, but leave the body unread for the caller to stream."""
+    key = token or (auth[0] if auth else "anonymous")
+    check_rate_limit(key)
+
+    headers = GITHUB_HEADERS | (headers or {})
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    with get_client().stream(
+        method,
+        url,
+        auth=auth,
+        headers=headers,
+        **kwargs,
+    ) as response:
+        record_rate_limit(key, response)
+
+        if retry_at := get_retry_at(response):
+            logger.warning(f"GitHub rate limit hit, retry at {retry_at}")
+            raise GitHubRateLimitedError(retry_at)
+
+        yield response
+
+
+def graphql(query: str, variables: dict[str, Any], *, token: str) -> dict[str, Any]:
+    """Run a GraphQL query as the token's owner and return its data."""
+    response = request(
+        "POST",
+        "/graphql",
+        token=token,
+        json={"query": query, "variables": variables},
+    )
+    response.raise_for_status()
+    payload = response.json()
+
+    # the GraphQL budget is points rather than requests, and running out of
+    # it is reported in the payload of a 200
+    if errors := payload.get("errors"):
+        if any(error.get("type") == "RATE_LIMITED" for error in errors):
+            raise GitHubRateLimitedError(get_reset_at(response))
+        raise GitHubGraphQLError(errors)
+
+    return payload["data"]
+
+
+def revoke_grant(client_id: str, client_secret: str, access_token: str) -> None:
+    """Revoke the app's authorization for the user owning access_token."""
+    response = request(
+        "DELETE",
+        f"/applications/{client_id}/grant",
+        auth=(client_id, client_secret),
+        json={"access_token": access_token},
+    )
+    logger.info(f"Revoked GitHub grant for app {client_id}: {response.status_code}")
+
+
+def revoke_pending_grant(revocation_id: int) -> None:
+    """Retry a grant revocation that was deferred by a rate limit.
+
+    The app secret and token are read from the GrantRevocation here, so
+    only its ID goes through django-q's schedule and task rows, and the row
+    is deleted as soon as it's no longer needed.
+    """
+    revocation = (
+        GrantRevocation.objects.select_related("app").filter(id=revocation_id).first()
+    )
+    if revocation is None:
+        logger.info(f"Grant revocation {revocation_id} already done, exiting")
+        return
+
+    try:
+        revoke_grant(
+            revocation.app.client_id, revocation.app.secret, revocation.access_token
+        )
+    except GitHubRateLimitedError as error:
+        schedule(
+            "starminder.core.github.revoke_pending_grant",
+            revocation.id,
+            next_run=error.retry_at,
+        )
+        return
+    except Exception:
+        # a failed revocation isn't retried, so its token has no further use
+        revocation.delete()
+        raise
+
+    revocation.delete()
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.6 on 2026-10-18 19:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0009_userprofile_include_own"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="full_sync_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.6 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0010_userprofile_full_sync_at"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="userprofile",
+            name="cycle_start",
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="cycle_cursor",
+            field=models.FloatField(blank=True, null=True),
+        ),
+    ]
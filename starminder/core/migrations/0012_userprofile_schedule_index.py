@@ -0,0 +1,20 @@
+# Generated by Django 6.0.6 on 2026-10-18 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0011_userprofile_cycle_cursor"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                condition=models.Q(("enabled", True)),
+                fields=["hour_of_day", "day_of_week"],
+                name="userprofile_schedule",
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 6.0.6 on 2026-10-18 20:50
+
+from datetime import timedelta
+
+import starminder.core.models
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def set_next_run_at(apps, schema_editor):
+    # every existing profile is on UTC, which schedules used to be read in
+    UserProfile = apps.get_model("core", "UserProfile")
+    now = timezone.now()
+
+    profiles = list(UserProfile.objects.filter(enabled=True))
+    for profile in profiles:
+        next_run_at = now.replace(
+            hour=profile.hour_of_day, minute=0, second=0, microsecond=0
+        )
+        while next_run_at <= now or profile.day_of_week not in (
+            -1,
+            next_run_at.weekday(),
+        ):
+            next_run_at += timedelta(days=1)
+        profile.next_run_at = next_run_at
+
+    UserProfile.objects.bulk_update(profiles, ["next_run_at"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0012_userprofile_schedule_index"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="userprofile",
+            name="userprofile_schedule",
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="next_run_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="time_zone",
+            field=models.CharField(
+                default="UTC",
+                max_length=64,
+                validators=[starminder.core.models.validate_time_zone],
+            ),
+        ),
+        migrations.RunPython(set_next_run_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="userprofile",
+            index=models.Index(
+                condition=models.Q(("enabled", True)),
+                fields=["next_run_at"],
+                name="userprofile_next_run",
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0.6 on 2026-10-18 21:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0013_userprofile_time_zone_next_run_at"),
+        ("socialaccount", "0006_alter_socialaccount_extra_data"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GrantRevocation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("access_token", models.TextField()),
+                (
+                    "app",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="socialaccount.socialapp",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Grant Revocation",
+            },
+        ),
+    ]
@@ -1,8 +1,9 @@
-from datetime import datetime, timedelta
+from datetime import UTC, datetime, time, timedelta
 from typing import Any, ClassVar
 from uuid import uuid4
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from allauth.socialaccount.models import SocialAccount
+from allauth.socialaccount.models import SocialAccount, SocialApp
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.exceptions import ValidationError
@@ -13,6 +14,9 @@ from django.db.models import (
     CharField,
     DateTimeField,
     EmailField,
+    FloatField,
+    ForeignKey,
+    Index,
     IntegerField,
     Manager,
     Model,
@@ -20,7 +24,6 @@ from django.db.models import (
     PositiveIntegerField,
     Q,
     QuerySet,
-    SET_NULL,
     TextField,
     URLField,
     UUIDField,
@@ -73,16 +76,16 @@ class CustomUser(AbstractUser):
         verbose_name = "Custom User"
 
 
+def validate_time_zone(value: str) -> None:
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"{value} is not a known time zone")
+
+
 class UserProfileManager(Manager["UserProfile"]):
-    def scheduled_for(self, now: datetime) -> "QuerySet[UserProfile]":
-        current_day = now.weekday()
-        current_hour = now.hour
-
-        return self.get_queryset().filter(
-            Q(day_of_week=current_day) | Q(day_of_week=UserProfile.EVERY_DAY),
-            hour_of_day=current_hour,
-            enabled=True,
-        )
+    def due(self, now: datetime) -> "QuerySet[UserProfile]":
+        return self.get_queryset().filter(next_run_at__lte=now, enabled=True)
 
 
 class UserProfile(TimestampedModel):
@@ -121,38 +124,93 @@ class UserProfile(TimestampedModel):
         default=0,
         validators=[MinValueValidator(0), MaxValueValidator(23)],
     )
+    time_zone = CharField(max_length=64, default="UTC", validators=[validate_time_zone])
     enabled = BooleanField(default=True)
+    # when the next reminder is due; save() keeps it in step with the
+    # schedule above, and start_jobs moves it on after each run
+    next_run_at = DateTimeField(null=True, blank=True)
 
     include_archived = BooleanField(default=True)
     include_own = BooleanField(default=True)
 
-    cycle_start = OneToOneField(
-        "content.Star",
-        on_delete=SET_NULL,
-        null=True,
-        blank=True,
-    )
+    # cycle_rank of the last star shown in the current reminder cycle; the
+    # stars shown so far this cycle are exactly those ranked at or below it,
+    # as stars added mid-cycle are always ranked above it
+    cycle_cursor = FloatField(null=True, blank=True)
+    full_sync_at = DateTimeField(null=True, blank=True)
 
     def __str__(self) -> str:
         return f"{self.user.username} (Profile)"
 
-    def clean(self) -> None:
-        super().clean()
-
-        if self.cycle_start is not None:
-            if self.cycle_start.reminder.user != self.user:
-                raise ValidationError(
-                    {
-                        "cycle_start": "Cycle start Star must belong to the same user as this profile."
-                    }
-                )
-
     def save(self, *args: Any, **kwargs: Any) -> None:
         self.full_clean()
+
+        if not self.enabled:
+            self.next_run_at = None
+        else:
+            next_run_at = self.get_next_run_at(timezone.now())
+            # a run that's due but not yet started is kept, as long as the
+            # schedule it was computed for hasn't changed
+            if not (
+                self.next_run_at
+                and self.next_run_at <= next_run_at
+                and self.is_scheduled_at(self.next_run_at)
+            ):
+                self.next_run_at = next_run_at
+
         super().save(*args, **kwargs)
 
+    def get_next_run_at(self, after: datetime) -> datetime:
+        """Return the first scheduled time strictly after the given one."""
+        local_after = after.astimezone(ZoneInfo(self.time_zone))
+        candidate = local_after.replace(
+            hour=self.hour_of_day, minute=0, second=0, microsecond=0
+        )
+
+        # a weekly schedule is at most a week away; adding days keeps the
+        # local hour across DST changes
+        while candidate <= local_after or not self.is_scheduled_at(candidate):
+            candidate += timedelta(days=1)
+
+        return candidate.astimezone(UTC)
+
+    def is_scheduled_at(self, moment: datetime) -> bool:
+        local_moment = moment.astimezone(ZoneInfo(self.time_zone))
+        return local_moment.time() == time(self.hour_of_day) and self.day_of_week in (
+            self.EVERY_DAY,
+            local_moment.weekday(),
+        )
+
     class Meta:
         verbose_name = "User Profile"
+        indexes = [
+            # covers UserProfileManager.due, which start_jobs runs every
+            # minute; disabled profiles are never due, so they're left out
+            Index(
+                fields=["next_run_at"],
+                condition=Q(enabled=True),
+                name="userprofile_next_run",
+            ),
+        ]
+
+
+class GrantRevocation(TimestampedModel):
+    """A GitHub grant revocation deferred by a rate limit.
+
+    Outlives the deleted account whose token it holds, until
+    github.revoke_pending_grant runs. Deliberately left out of the admin.
+    """
+
+    objects: ClassVar["Manager[GrantRevocation]"]
+
+    app = ForeignKey(SocialApp, on_delete=CASCADE)
+    access_token = TextField()
+
+    class Meta:
+        verbose_name = "Grant Revocation"
+
+    def __str__(self) -> str:
+        return f"grant revocation, {self.app.name}"
 
 
 @receiver(post_save, sender=CustomUser)
@@ -25,6 +25,7 @@ class TestUserProfileConfigForm:
             "max_entries": 10,
             "day_of_week": UserProfile.MONDAY,
             "hour_of_day": 12,
+            "time_zone": "UTC",
             "include_archived": True,
             "include_own": True,
         }
@@ -36,6 +37,7 @@ class TestUserProfileConfigForm:
             "max_entries": 5,
             "day_of_week": UserProfile.EVERY_DAY,
             "hour_of_day": 9,
+            "time_zone": "UTC",
             "include_archived": True,
             "include_own": True,
         }
@@ -47,6 +49,7 @@ class TestUserProfileConfigForm:
             "max_entries": 1,
             "day_of_week": UserProfile.TUESDAY,
             "hour_of_day": 0,
+            "time_zone": "UTC",
             "include_archived": True,
             "include_own": True,
         }
@@ -58,6 +61,7 @@ class TestUserProfileConfigForm:
             "max_entries": 5,
             "day_of_week": UserProfile.WEDNESDAY,
             "hour_of_day": 23,
+            "time_zone": "UTC",
             "include_archived": True,
             "include_own": True,
         }
@@ -69,6 +73,7 @@ class TestUserProfileConfigForm:
             "max_entries": 0,
             "day_of_week": UserProfile.MONDAY,
             "hour_of_day": 12,
+            "time_zone": "UTC",
         }
         form = UserProfileConfigForm(data=form_data, instance=user_profile)
         assert not form.is_valid()
@@ -79,6 +84,7 @@ class TestUserProfileConfigForm:
             "max_entries": -5,
             "day_of_week": UserProfile.MONDAY,
             "hour_of_day": 12,
+            "time_zone": "UTC",
         }
         form = UserProfileConfigForm(data=form_data, instance=user_profile)
         assert not form.is_valid()
@@ -89,6 +95,7 @@ class TestUserProfileConfigForm:
             "max_entries": 5,
             "day_of_week": 99,
             "hour_of_day": 12,
+            "time_zone": "UTC",
         }
         form = UserProfileConfigForm(data=form_data, instance=user_profile)
         assert not form.is_valid()
@@ -99,6 +106,7 @@ class TestUserProfileConfigForm:
             "max_entries": 5,
             "day_of_week": UserProfile.MONDAY,
             "hour_of_day": -1,
+            "time_zone": "UTC",
         }
         form = UserProfileConfigForm(data=form_data, instance=user_profile)
         assert not form.is_valid()
@@ -109,20 +117,33 @@ class TestUserProfileConfigForm:
             "max_entries": 5,
             "day_of_week": UserProfile.MONDAY,
             "hour_of_day": 24,
+            "time_zone": "UTC",
         }
         form = UserProfileConfigForm(data=form_data, instance=user_profile)
         assert not form.is_valid()
         assert "hour_of_day" in form.errors
 
+    def test_form_with_unknown_time_zone_invalid(self, user_profile):
+        form_data = {
+            "max_entries": 5,
+            "day_of_week": UserProfile.MONDAY,
+            "hour_of_day": 12,
+            "time_zone": "Mars/Olympus_Mons",
+        }
+        form = UserProfileConfigForm(data=form_data, instance=user_profile)
+        assert not form.is_valid()
+        assert "time_zone" in form.errors
+
     def test_form_has_correct_fields(self):
         form = UserProfileConfigForm()
         assert "reminder_email" in form.fields
         assert "max_entries" in form.fields
         assert "day_of_week" in form.fields
         assert "hour_of_day" in form.fields
+        assert "time_zone" in form.fields
         assert "include_archived" in form.fields
         assert "include_own" in form.fields
-        assert len(form.fields) == 6
+        assert len(form.fields) == 7
 
     def test_form_excludes_enabled_field(self):
         form = UserProfileConfigForm()
@@ -155,6 +176,7 @@ class TestUserProfileConfigForm:
             "max_entries": initial_max_entries + 5,
             "day_of_week": UserProfile.FRIDAY,
             "hour_of_day": 18,
+            "time_zone": "UTC",
             "include_archived": True,
             "include_own": True,
         }
@@ -183,6 +205,7 @@ class TestUserProfileConfigForm:
                 "max_entries": 5,
                 "day_of_week": day,
                 "hour_of_day": 12,
+                "time_zone": "UTC",
                 "include_archived": True,
                 "include_own": True,
             }
@@ -198,6 +221,7 @@ class TestUserProfileConfigForm:
         form_data = {
             "max_entries": 5,
             "hour_of_day": 12,
+            "time_zone": "UTC",
         }
         form = UserProfileConfigForm(data=form_data, instance=user_profile)
         assert not form.is_valid()
@@ -0,0 +1,249 @@
+from datetime import UTC, datetime
+import time
+from unittest.mock import patch
+
+from allauth.socialaccount.models import SocialApp
+import httpx
+import pytest
+
+from starminder.core import github
+from starminder.core.models import GrantRevocation
+
+
+@pytest.fixture(autouse=True)
+def clear_rate_limits():
+    github._rate_limits.clear()
+    yield
+    github._rate_limits.clear()
+
+
+class MockGitHub:
+    def __init__(self) -> None:
+        self.requests: list[httpx.Request] = []
+        self.responses: list[httpx.Response] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def mock_github():
+    mock = MockGitHub()
+    client = httpx.Client(
+        base_url=github.GITHUB_API_URL,
+        transport=httpx.MockTransport(mock.handle),
+    )
+    with patch("starminder.core.github.get_client", return_value=client):
+        yield mock
+
+
+def test_request_sends_token_and_api_headers(mock_github) -> None:
+    mock_github.responses.append(httpx.Response(200, json=[]))
+
+    github.request("GET", "/user/starred", token="secret")
+
+    assert mock_github.requests[0].url == "https://api.github.com/user/starred"
+    assert mock_github.requests[0].headers["Authorization"] == "Bearer secret"
+    assert mock_github.requests[0].headers["Accept"] == "application/vnd.github+json"
+    assert mock_github.requests[0].headers["X-GitHub-Api-Version"] == "2022-11-28"
+
+
+def test_request_tracks_rate_limit_per_token(mock_github) -> None:
+    reset_at = time.time() + 600
+    mock_github.responses.append(
+        httpx.Response(
+            200,
+            headers={
+                "X-RateLimit-Remaining": "4321",
+                "X-RateLimit-Reset": str(reset_at),
+            },
+        )
+    )
+
+    github.request("GET", "/user/starred", token="secret")
+
+    assert github._rate_limits["secret"] == github.RateLimit(4321, reset_at)
+    assert "other" not in github._rate_limits
+
+
+def test_request_defers_when_budget_spent(mock_github) -> None:
+    reset_at = time.time() + 600
+    github._rate_limits["secret"] = github.RateLimit(3, reset_at)
+
+    with pytest.raises(github.GitHubRateLimitedError) as error:
+        github.request("GET", "/user/starred", token="secret")
+
+    assert mock_github.requests == []
+    assert error.value.retry_at == datetime.fromtimestamp(reset_at, tz=UTC)
+
+
+def test_request_proceeds_once_budget_reset(mock_github) -> None:
+    github._rate_limits["secret"] = github.RateLimit(0, time.time() - 1)
+    mock_github.responses.append(httpx.Response(200))
+
+    github.request("GET", "/user/starred", token="secret")
+
+    assert len(mock_github.requests) == 1
+
+
+def test_request_raises_on_secondary_rate_limit(mock_github) -> None:
+    mock_github.responses.append(httpx.Response(403, headers={"Retry-After": "60"}))
+
+    with pytest.raises(github.GitHubRateLimitedError):
+        github.request("GET", "/user/starred", token="secret")
+
+
+def test_request_raises_on_primary_rate_limit(mock_github) -> None:
+    reset_at = time.time() + 600
+    mock_github.responses.append(
+        httpx.Response(
+            403,
+            headers={
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(reset_at),
+            },
+        )
+    )
+
+    with pytest.raises(github.GitHubRateLimitedError) as error:
+        github.request("GET", "/user/starred", token="secret")
+
+    assert error.value.retry_at == datetime.fromtimestamp(reset_at, tz=UTC)
+
+
+def test_request_returns_other_forbidden_responses(mock_github) -> None:
+    mock_github.responses.append(
+        httpx.Response(403, headers={"X-RateLimit-Remaining": "4000"})
+    )
+
+    response = github.request("GET", "/user/starred", token="secret")
+
+    assert response.status_code == 403
+
+
+def test_stream_yields_body_to_caller(mock_github) -> None:
+    mock_github.responses.append(httpx.Response(200, content=b"[1, 2, 3]"))
+
+    with github.stream("GET", "/user/starred", token="secret") as response:
+        assert b"".join(response.iter_bytes()) == b"[1, 2, 3]"
+
+    assert mock_github.requests[0].headers["Authorization"] == "Bearer secret"
+
+
+def test_stream_raises_on_rate_limit(mock_github) -> None:
+    mock_github.responses.append(httpx.Response(429))
+
+    with pytest.raises(github.GitHubRateLimitedError):
+        with github.stream("GET", "/user/starred", token="secret"):
+            pass
+
+
+def test_graphql_returns_data(mock_github) -> None:
+    mock_github.responses.append(httpx.Response(200, json={"data": {"viewer": {}}}))
+
+    data = github.graphql("query { viewer { login } }", {}, token="secret")
+
+    assert data == {"viewer": {}}
+    assert mock_github.requests[0].method == "POST"
+    assert mock_github.requests[0].url.path == "/graphql"
+
+
+def test_graphql_raises_on_errors(mock_github) -> None:
+    mock_github.responses.append(
+        httpx.Response(200, json={"errors": [{"message": "Field doesn't exist"}]})
+    )
+
+    with pytest.raises(github.GitHubGraphQLError):
+        github.graphql("query { nope }", {}, token="secret")
+
+
+def test_graphql_raises_on_rate_limit(mock_github) -> None:
+    reset_at = time.time() + 600
+    mock_github.responses.append(
+        httpx.Response(
+            200,
+            headers={"X-RateLimit-Reset": str(reset_at)},
+            json={"errors": [{"type": "RATE_LIMITED", "message": "API rate limit"}]},
+        )
+    )
+
+    with pytest.raises(github.GitHubRateLimitedError) as error:
+        github.graphql("query { viewer { login } }", {}, token="secret")
+
+    assert error.value.retry_at == datetime.fromtimestamp(reset_at, tz=UTC)
+
+
+def test_revoke_grant_uses_app_credentials(mock_github) -> None:
+    mock_github.responses.append(httpx.Response(204))
+
+    github.revoke_grant("client_id", "client_secret", "access_token")
+
+    request = mock_github.requests[0]
+    assert request.method == "DELETE"
+    assert request.url.path == "/applications/client_id/grant"
+    assert request.headers["Authorization"].startswith("Basic ")
+    assert request.content == b'{"access_token":"access_token"}'
+
+
+@pytest.fixture
+def grant_revocation(db):
+    return GrantRevocation.objects.create(
+        app=SocialApp.objects.create(
+            provider="github",
+            name="GitHub",
+            client_id="client_id",
+            secret="client_secret",
+        ),
+        access_token="access_token",
+    )
+
+
+def test_revoke_pending_grant_revokes_and_forgets_token(
+    mock_github, grant_revocation
+) -> None:
+    mock_github.responses.append(httpx.Response(204))
+
+    github.revoke_pending_grant(grant_revocation.id)
+
+    assert mock_github.requests[0].url.path == "/applications/client_id/grant"
+    assert mock_github.requests[0].content == b'{"access_token":"access_token"}'
+    assert not GrantRevocation.objects.exists()
+
+
+@patch("starminder.core.github.schedule")
+def test_revoke_pending_grant_defers_when_rate_limited(
+    mock_schedule, mock_github, grant_revocation
+) -> None:
+    mock_github.responses.append(httpx.Response(429, headers={"Retry-After": "60"}))
+
+    github.revoke_pending_grant(grant_revocation.id)
+
+    mock_schedule.assert_called_once()
+    assert mock_schedule.call_args[0] == (
+        "starminder.core.github.revoke_pending_grant",
+        grant_revocation.id,
+    )
+    assert GrantRevocation.objects.filter(id=grant_revocation.id).exists()
+
+
+def test_revoke_pending_grant_forgets_token_on_failure(
+    mock_github, grant_revocation
+) -> None:
+    with patch(
+        "starminder.core.github.revoke_grant", side_effect=httpx.ConnectError("down")
+    ):
+        with pytest.raises(httpx.ConnectError):
+            github.revoke_pending_grant(grant_revocation.id)
+
+    assert not GrantRevocation.objects.exists()
+
+
+def test_revoke_pending_grant_exits_when_done(mock_github, db) -> None:
+    github.revoke_pending_grant(12345)
+
+    assert mock_github.requests == []
+
+
+def test_get_client_is_shared() -> None:
+    assert github.get_client() is github.get_client()
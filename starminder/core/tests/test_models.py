@@ -0,0 +1,114 @@
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+from django.core.exceptions import ValidationError
+import pytest
+
+from starminder.core.models import CustomUser as User, UserProfile
+
+
+# Saturday
+NOW = datetime(2025, 10, 11, 11, 59, tzinfo=UTC)
+
+
+@pytest.fixture
+def user_profile(db):
+    with patch("django.utils.timezone.now", return_value=NOW):
+        user = User.objects.create_user(username="testuser")
+    return user.user_profile
+
+
+def test_get_next_run_at_later_today(user_profile) -> None:
+    user_profile.day_of_week = UserProfile.EVERY_DAY
+    user_profile.hour_of_day = 12
+
+    assert user_profile.get_next_run_at(NOW) == datetime(2025, 10, 11, 12, tzinfo=UTC)
+
+
+def test_get_next_run_at_is_strictly_after(user_profile) -> None:
+    user_profile.day_of_week = UserProfile.EVERY_DAY
+    user_profile.hour_of_day = 12
+
+    assert user_profile.get_next_run_at(
+        datetime(2025, 10, 11, 12, tzinfo=UTC)
+    ) == datetime(2025, 10, 12, 12, tzinfo=UTC)
+
+
+def test_get_next_run_at_weekly(user_profile) -> None:
+    user_profile.day_of_week = UserProfile.FRIDAY
+    user_profile.hour_of_day = 9
+
+    assert user_profile.get_next_run_at(NOW) == datetime(2025, 10, 17, 9, tzinfo=UTC)
+
+
+def test_get_next_run_at_uses_time_zone(user_profile) -> None:
+    user_profile.day_of_week = UserProfile.EVERY_DAY
+    user_profile.hour_of_day = 8
+    user_profile.time_zone = "America/New_York"
+
+    # 08:00 EDT, then 08:00 EST once the clocks go back on November 2nd
+    assert user_profile.get_next_run_at(NOW) == datetime(2025, 10, 11, 12, tzinfo=UTC)
+    assert user_profile.get_next_run_at(
+        datetime(2025, 11, 1, 13, tzinfo=UTC)
+    ) == datetime(2025, 11, 2, 13, tzinfo=UTC)
+
+
+def test_get_next_run_at_uses_local_day(user_profile) -> None:
+    user_profile.day_of_week = UserProfile.SUNDAY
+    user_profile.hour_of_day = 6
+    user_profile.time_zone = "Pacific/Auckland"
+
+    # 06:00 NZDT on Sunday is 17:00 UTC on Saturday
+    assert user_profile.get_next_run_at(NOW) == datetime(2025, 10, 11, 17, tzinfo=UTC)
+
+
+def test_save_sets_next_run_at(user_profile) -> None:
+    user_profile.day_of_week = UserProfile.EVERY_DAY
+    user_profile.hour_of_day = 12
+
+    with patch("django.utils.timezone.now", return_value=NOW):
+        user_profile.save()
+
+    assert user_profile.next_run_at == datetime(2025, 10, 11, 12, tzinfo=UTC)
+
+
+def test_save_keeps_pending_run(user_profile) -> None:
+    due_at = datetime(2025, 10, 11, 12, tzinfo=UTC)
+    user_profile.day_of_week = UserProfile.EVERY_DAY
+    user_profile.hour_of_day = 12
+    user_profile.next_run_at = due_at
+
+    # saved after the run fell due but before start_jobs picked it up
+    with patch(
+        "django.utils.timezone.now", return_value=due_at + timedelta(seconds=30)
+    ):
+        user_profile.save()
+
+    assert user_profile.next_run_at == due_at
+
+
+def test_save_recomputes_after_schedule_change(user_profile) -> None:
+    user_profile.day_of_week = UserProfile.EVERY_DAY
+    user_profile.hour_of_day = 12
+    user_profile.next_run_at = datetime(2025, 10, 11, 12, tzinfo=UTC)
+    user_profile.hour_of_day = 11
+
+    with patch("django.utils.timezone.now", return_value=NOW):
+        user_profile.save()
+
+    assert user_profile.next_run_at == datetime(2025, 10, 12, 11, tzinfo=UTC)
+
+
+def test_save_clears_next_run_at_when_disabled(user_profile) -> None:
+    user_profile.enabled = False
+
+    user_profile.save()
+
+    assert user_profile.next_run_at is None
+
+
+def test_save_rejects_unknown_time_zone(user_profile) -> None:
+    user_profile.time_zone = "Mars/Olympus_Mons"
+
+    with pytest.raises(ValidationError):
+        user_profile.save()
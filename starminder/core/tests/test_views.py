@@ -1,10 +1,15 @@
+from datetime import timedelta
+from unittest.mock import patch
+
 import pytest
-from allauth.socialaccount.models import SocialAccount, SocialApp
+from allauth.socialaccount.models import SocialAccount, SocialApp, SocialToken
 from django.contrib.sites.models import Site
 from django.test import Client
 from django.urls import reverse
+from django.utils import timezone
 
-from starminder.core.models import UserProfile
+from starminder.core.github import GitHubRateLimitedError
+from starminder.core.models import GrantRevocation, UserProfile
 
 
 @pytest.mark.django_db
@@ -181,6 +186,7 @@ def test_dashboard_form_submission_updates_profile(
         "max_entries": 10,
         "day_of_week": UserProfile.FRIDAY,
         "hour_of_day": 15,
+        "time_zone": "UTC",
         "include_archived": True,
         "include_own": True,
     }
@@ -211,6 +217,7 @@ def test_dashboard_form_submission_with_invalid_data(
         "max_entries": 0,
         "day_of_week": UserProfile.MONDAY,
         "hour_of_day": 12,
+        "time_zone": "UTC",
     }
     response = client.post(reverse("dashboard"), data=form_data)
 
@@ -302,3 +309,89 @@ def test_delete_account_view_deletes_social_accounts(
 
     assert response.status_code == 302
     assert not SocialAccount.objects.filter(id=social_account_id).exists()
+
+
+@pytest.mark.django_db
+@patch("starminder.core.views.github.revoke_grant")
+def test_delete_account_view_revokes_github_grant(
+    mock_revoke_grant,
+    client: Client,
+    django_user_model,
+) -> None:
+    user = django_user_model.objects.create_user(
+        username="testuser",
+        email="test@example.com",
+        password="testpass123",
+    )
+    github_app = SocialApp.objects.create(
+        provider="github",
+        name="GitHub",
+        client_id="test_client_id",
+        secret="test_secret",
+    )
+    SocialToken.objects.create(
+        app=github_app,
+        account=SocialAccount.objects.create(
+            user=user,
+            provider="github",
+            uid="test_github_id",
+        ),
+        token="test_token",
+    )
+    client.force_login(user)
+
+    client.post(reverse("delete_account"))
+
+    mock_revoke_grant.assert_called_once_with(
+        "test_client_id", "test_secret", "test_token"
+    )
+
+
+@pytest.mark.django_db
+@patch("starminder.core.views.schedule")
+@patch("starminder.core.views.github.revoke_grant")
+def test_delete_account_view_defers_rate_limited_revocation(
+    mock_revoke_grant,
+    mock_schedule,
+    client: Client,
+    django_user_model,
+) -> None:
+    retry_at = timezone.now() + timedelta(minutes=10)
+    mock_revoke_grant.side_effect = GitHubRateLimitedError(retry_at)
+
+    user = django_user_model.objects.create_user(
+        username="testuser",
+        email="test@example.com",
+        password="testpass123",
+    )
+    github_app = SocialApp.objects.create(
+        provider="github",
+        name="GitHub",
+        client_id="test_client_id",
+        secret="test_secret",
+    )
+    SocialToken.objects.create(
+        app=github_app,
+        account=SocialAccount.objects.create(
+            user=user,
+            provider="github",
+            uid="test_github_id",
+        ),
+        token="test_token",
+    )
+    user_id = user.id
+    client.force_login(user)
+
+    response = client.post(reverse("delete_account"))
+
+    assert response.status_code == 302
+    assert not django_user_model.objects.filter(id=user_id).exists()
+    revocation = GrantRevocation.objects.get()
+    assert revocation.app == github_app
+    assert revocation.access_token == "test_token"
+    # neither the secret nor the token goes into django-q's tables
+    mock_schedule.assert_called_once_with(
+        "starminder.core.github.revoke_pending_grant",
+        revocation.id,
+        next_run=retry_at,
+    )
@@ -1,8 +1,6 @@
-from http import HTTPMethod
 from typing import Any, cast
 
 from allauth.socialaccount.models import SocialAccount, SocialToken
-import httpx
 from django.contrib.auth import logout
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import HttpRequest, HttpResponse
@@ -10,9 +8,11 @@ from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.views import View
 from django.views.generic import FormView, TemplateView
+from django_q.tasks import schedule
 
+from starminder.core import github
 from starminder.core.forms import UserProfileConfigForm
-from starminder.core.models import CustomUser
+from starminder.core.models import CustomUser, GrantRevocation
 
 
 class HomepageView(TemplateView):
@@ -58,19 +58,27 @@ class DeleteAccountView(LoginRequiredMixin, View):
     def post(self, request: HttpRequest) -> HttpResponse:
         user = cast(CustomUser, request.user)
         for social_account in user.socialaccount_set.all():
-            for social_token in SocialToken.objects.filter(account=social_account):
-                app_client_id = social_token.app.client_id
-
-                httpx.request(
-                    method=HTTPMethod.DELETE,
-                    url=f"https://api.github.com/applications/{app_client_id}/grant",
-                    auth=(social_token.app.client_id, social_token.app.secret),
-                    headers={
-                        "Accept": "application/vnd.github+json",
-                        "X-GitHub-Api-Vesrion": "2022-11-28",
-                    },
-                    json={"access_token": social_token.token},
-                )
+            for social_token in SocialToken.objects.filter(
+                account=social_account
+            ).select_related("app"):
+                try:
+                    github.revoke_grant(
+                        social_token.app.client_id,
+                        social_token.app.secret,
+                        social_token.token,
+                    )
+                except github.GitHubRateLimitedError as error:
+                    # the task gets just an ID and looks up the secret and
+                    # token itself, keeping them out of django-q's tables
+                    revocation = GrantRevocation.objects.create(
+                        app=social_token.app,
+                        access_token=social_token.token,
+                    )
+                    schedule(
+                        "starminder.core.github.revoke_pending_grant",
+                        revocation.id,
+                        next_run=error.retry_at,
+                    )
 
         user.delete()
         logout(request)
@@ -1,5 +1,13 @@
 from django.contrib import admin
 
-from starminder.implementations.models import TempStar
+from starminder.implementations.models import (
+    PipelineRun,
+    Repository,
+    StarPage,
+    TempStar,
+)
 
+admin.site.register(PipelineRun)
+admin.site.register(Repository)
+admin.site.register(StarPage)
 admin.site.register(TempStar)
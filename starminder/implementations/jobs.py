@@ -1,102 +1,926 @@
-import random
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from http import HTTPStatus
+import json
+import random
+import re
+import time
+from typing import Any, NamedTuple
+from urllib.parse import parse_qs, urlsplit
+from uuid import UUID
 
 from allauth.socialaccount.models import SocialToken
-from django.db import transaction
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import QuerySet
+from django.db.models.functions import Random
 from django.template.loader import render_to_string
 from django.utils import timezone
-from django_q.tasks import async_task
+from django_q import humanhash
+from django_q.brokers import get_broker
+from django_q.brokers.orm import ORM
+from django_q.conf import Conf
+from django_q.models import OrmQ, Schedule
+from django_q.signals import pre_enqueue
+from django_q.signing import SignedPackage
+from django_q.tasks import async_task, schedule
 from loguru import logger
 import httpx
-from httpx_retries import Retry, RetryTransport
 import sentry_sdk
 
 from starminder.content.linkcheck import extract_urls, get_flagged_urls
 from starminder.content.models import Reminder, Star
+from starminder.core import github
 from starminder.core.models import CustomUser, UserProfile
-from starminder.implementations.models import TempStar
+from starminder.implementations.models import (
+    PipelineRun,
+    Repository,
+    StarPage,
+    TempStar,
+    random_cycle_rank,
+)
 
 
 # a task re-delivered by django-q after this long is assumed to be a
 # duplicate of an already-completed run rather than a legitimate new one
 RECENT_REMINDER_WINDOW = timedelta(hours=1)
 
+# a pipeline run only starts new stages within this long of its task
+# starting and hands the rest off to a fresh task after that; the longest
+# stage, a link check with its own 60s budget, still finishes inside
+# django-q's 3 minute timeout
+PIPELINE_TIME_BUDGET = timedelta(minutes=1)
+
+STARRED_PAGE_SIZE = 100
+# the parts of a starred repo item TempStar is built from; everything else
+# (dozens of URL templates, the owner's whole profile) is dropped as each
+# item is parsed
+STARRED_ITEM_FIELDS = (
+    "id",
+    "name",
+    "owner",
+    "description",
+    "stargazers_count",
+    "html_url",
+    "homepage",
+    "archived",
+)
+STARRED_OWNER_FIELDS = ("login", "id")
+# pages fetched at once per token; GitHub frowns on heavy concurrency from a
+# single token, so keep this small
+PAGE_FETCH_CONCURRENCY = 4
+
+# incremental syncs only see new stars, so unstarred repos linger in the
+# catalog until the next full sync
+FULL_SYNC_INTERVAL = timedelta(days=7)
+
+# GraphQL pages fetched per task during a full sync, well within Q_CLUSTER's
+# timeout; incremental syncs usually stop within the first page, so they
+# fetch one at a time
+GRAPHQL_PAGES_PER_TASK = 20
+# only the fields TempStar needs; owner IDs live on the concrete owner types
+STARRED_REPOSITORIES_QUERY = """
+query($cursor: String, $pageSize: Int!) {
+  viewer {
+    starredRepositories(
+      first: $pageSize
+      after: $cursor
+      orderBy: {field: STARRED_AT, direction: DESC}
+    ) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        databaseId
+        name
+        description
+        stargazerCount
+        url
+        homepageUrl
+        isArchived
+        owner {
+          login
+          ... on User {
+            databaseId
+          }
+          ... on Organization {
+            databaseId
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# spread for tasks deferred by GitHub rate limits
+RATE_LIMIT_JITTER = timedelta(minutes=5)
+
+_json_decoder = json.JSONDecoder()
+
+# what can still follow a decoded number's text and be part of it
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+# repo metadata is shared between users, so a popular repo synced by one of
+# them is left alone by the rest for this long
+REPOSITORY_REFRESH_INTERVAL = timedelta(hours=1)
+
+REPOSITORY_SYNCED_FIELDS = [
+    "name",
+    "owner",
+    "owner_id",
+    "description",
+    "star_count",
+    "repo_url",
+    "project_url",
+    "archived",
+    "updated_at",
+]
+
 
 def start_jobs() -> None:
-    """Find all profiles scheduled for current hour and queue user_job for each."""
+    """Find all profiles due a reminder and queue user_job for each.
+
+    With START_JOBS_SPREAD_MINUTES set, each job is scheduled at its
+    profile's offset into that window instead of queued right away, so the
+    hour's GitHub, DoH and email traffic doesn't all land at once. Either
+    way every job is written in one insert, and the profiles' next runs in
+    one update, so this runs in constant queries.
+    """
     logger.info("Scheduling all applicable jobs…")
 
-    scheduled_profiles = UserProfile.objects.scheduled_for(datetime.now())
-    logger.info(f"Found {len(scheduled_profiles)} scheduled profiles")
-
-    for profile in scheduled_profiles:
-        async_task(
-            "starminder.implementations.jobs.user_job",
-            profile.user.id,
+    started_at = timezone.now()
+    # queued jobs and next runs commit together, so a dispatcher dying in
+    # between can't queue the same users twice, and overlapping dispatchers
+    # skip profiles another one has locked
+    with transaction.atomic():
+        due_profiles = list(
+            UserProfile.objects.due(started_at)
+            .select_for_update(skip_locked=True)
+            .only(
+                "user_id",
+                "feed_id",
+                "day_of_week",
+                "hour_of_day",
+                "time_zone",
+                "next_run_at",
+            )
         )
+        logger.info(f"Found {len(due_profiles)} due profiles")
+
+        spread = timedelta(minutes=settings.START_JOBS_SPREAD_MINUTES)
+
+        if spread:
+            Schedule.objects.bulk_create(
+                Schedule(
+                    func="starminder.implementations.jobs.user_job",
+                    args=repr((profile.user_id,)),
+                    schedule_type=Schedule.ONCE,
+                    repeats=-1,
+                    next_run=started_at + get_start_offset(profile.feed_id, spread),
+                )
+                for profile in due_profiles
+            )
+        else:
+            bulk_async_task(
+                "starminder.implementations.jobs.user_job",
+                [(profile.user_id,) for profile in due_profiles],
+            )
+
+        # runs missed while the dispatcher was down are skipped, not caught up on
+        for profile in due_profiles:
+            profile.next_run_at = profile.get_next_run_at(started_at)
+        UserProfile.objects.bulk_update(due_profiles, ["next_run_at"])
 
     logger.info("Done!")
 
 
+def bulk_async_task(func: str, args_list: list[tuple]) -> None:
+    """Queue func once per args in args_list, in a single broker write.
+
+    Builds the same signed packages async_task does and inserts them into
+    the ORM broker's queue together. Other brokers, and sync or cached
+    mode, get one async_task call per task instead.
+    """
+    broker = get_broker()
+    if not isinstance(broker, ORM) or Conf.SYNC or Conf.CACHED:
+        for args in args_list:
+            async_task(func, *args)
+        return
+
+    now = timezone.now()
+    packages = []
+    for args in args_list:
+        name, task_id = humanhash.uuid()
+        task = {
+            "id": task_id,
+            "name": name,
+            "func": func,
+            "args": args,
+            "kwargs": {},
+            "started": now,
+        }
+        if Conf.ACK_FAILURES:
+            task["ack_failure"] = Conf.ACK_FAILURES
+        pre_enqueue.send(sender="django_q", task=task)
+
+        packages.append(
+            OrmQ(
+                key=broker.list_key or Conf.CLUSTER_NAME,
+                payload=SignedPackage.dumps(task),
+                lock=now,
+            )
+        )
+
+    OrmQ.objects.using(Conf.ORM).bulk_create(packages)
+    logger.info(f"Enqueued {len(packages)} {func} tasks")
+
+
+def get_start_offset(feed_id: UUID, spread: timedelta) -> timedelta:
+    """Return a profile's offset into the spread window, the same every run."""
+    # feed IDs are random UUIDs, so their offsets are uniformly spread
+    return timedelta(seconds=feed_id.int % int(spread.total_seconds()))
+
+
 def user_job(user_id: int) -> None:
-    """Fetch user and tokens, queue pager."""
+    """Start a user's reminder pipeline and run it.
+
+    A run started within RECENT_REMINDER_WINDOW is resumed instead, as
+    this is then django-q re-delivering a user_job that crashed or timed
+    out partway through.
+    """
     logger.info(f"Processing user job for {user_id=}")
 
     user = CustomUser.objects.get(id=user_id)
     logger.info(f"Found user {user.username}")
 
-    tokens = list(SocialToken.objects.filter(account__user=user))
+    recent_run = PipelineRun.objects.filter(
+        user=user,
+        created_at__gte=timezone.now() - RECENT_REMINDER_WINDOW,
+    ).first()
+    if recent_run:
+        logger.info(f"Resuming pipeline run {recent_run.id}")
+        run_pipeline(recent_run.id)
+        return
+
+    tokens = list(
+        SocialToken.objects.filter(account__user=user).values_list("id", "account__uid")
+    )
     logger.info(f"Found {len(tokens)} tokens for {user.username}")
 
     if not tokens:
         logger.info("No tokens found, exiting")
         return
 
-    # a previous run that died mid-chain leaves TempStars behind; start
-    # every run from a clean slate so retries can't pollute the sampling
-    deleted_count, _ = TempStar.objects.filter(user=user).delete()
-    if deleted_count:
-        logger.info(f"Deleted {deleted_count} leftover temp stars")
+    # the catalog is normally topped up incrementally, which never notices
+    # unstars; every so often sweep everything and prune what wasn't seen
+    full_sync_at = user.user_profile.full_sync_at
+    full_sync_started_at = None
+    if full_sync_at is None or full_sync_at < timezone.now() - FULL_SYNC_INTERVAL:
+        full_sync_started_at = timezone.now()
+        logger.info("Full catalog sync due")
 
-    async_task(
-        "starminder.implementations.jobs.pager",
-        user,
-        tokens,
+    # an older run still waiting out a rate limit is superseded; its
+    # deferred task finds its checkpoint gone and exits
+    with transaction.atomic():
+        PipelineRun.objects.filter(user=user).delete()
+        run = PipelineRun.objects.create(
+            user=user,
+            user_uid=tokens[-1][1],
+            token_ids=[token_id for token_id, _ in tokens],
+            full_sync_started_at=full_sync_started_at,
+        )
+
+    run_pipeline(run.id)
+
+
+def run_pipeline(run_id: int) -> None:
+    """Run a user's reminder pipeline from its last checkpoint.
+
+    Syncing stars, warming link checks and generating the reminder run one
+    after another in this task, with the checkpoint saved after each, rather
+    than as a chain of queued tasks. The run only goes back to the queue
+    when GitHub rate limits it, or when PIPELINE_TIME_BUDGET is spent and
+    stages are left.
+    """
+    run = PipelineRun.objects.filter(id=run_id).first()
+    if run is None:
+        logger.info(f"Pipeline run {run_id} finished or superseded, exiting")
+        return
+
+    deadline = time.monotonic() + PIPELINE_TIME_BUDGET.total_seconds()
+    logger.info(f"Pipeline run {run.id} for user_id={run.user_id} at {run.stage}")
+
+    while True:
+        if run.stage == PipelineRun.SYNC:
+            positions = None
+            if run.positions is not None:
+                positions = {
+                    int(token_id): position
+                    for token_id, position in run.positions.items()
+                }
+            progress = pager(
+                run.user_id, run.token_ids, run.full_sync_started_at, positions
+            )
+            if progress is None:
+                run.delete()
+                return
+
+            if progress.positions:
+                run.positions = progress.positions
+            else:
+                run.stage = PipelineRun.WARM_LINK_CHECKS
+            run.save()
+
+            if progress.retry_at:
+                logger.info("Rate limited, deferring pipeline")
+                defer_task(
+                    progress.retry_at,
+                    "starminder.implementations.jobs.run_pipeline",
+                    run.id,
+                )
+                return
+
+        elif run.stage == PipelineRun.WARM_LINK_CHECKS:
+            warm_link_checks(run.user_id, run.user_uid)
+            run.stage = PipelineRun.GENERATE_DATA
+            run.save()
+
+        else:
+            # generate_data skips a reminder made in the last hour, so a
+            # crash between it and this delete can't send a second one
+            generate_data(run.user_id, run.user_uid)
+            run.delete()
+            logger.info(f"Pipeline run {run_id} done")
+            return
+
+        # checked between stages, so every task gets at least one done
+        if time.monotonic() >= deadline:
+            logger.info(f"Time budget spent, handing off at {run.stage}")
+            async_task("starminder.implementations.jobs.run_pipeline", run.id)
+            return
+
+
+def defer_task(retry_at: datetime, func: str, *args: Any) -> None:
+    """Schedule func to run again once a rate limit has reset.
+
+    A random delay on top spreads out tasks that all hit their limits at
+    once, e.g. at the top of the hour, so they don't all come back at once.
+    """
+    next_run = retry_at + timedelta(
+        seconds=random.uniform(0, RATE_LIMIT_JITTER.total_seconds())
     )
+    schedule(func, *args, next_run=next_run)
+    logger.info(f"Deferred {func} until {next_run}")
+
+
+class SyncProgress(NamedTuple):
+    """Where a pager hop left the sync."""
+
+    # tokens with pages left, and where to resume each; empty once done
+    positions: dict[int, int | str | None]
+    # when to try again, if any token was rate limited
+    retry_at: datetime | None
+
+
+class StarredPage(NamedTuple):
+    not_modified: bool
+    etag: str | None
+    last_page: int | None
+    items: list[dict]
+
+
+def fetch_starred_page(
+    token: SocialToken,
+    page: int,
+    etag: str | None = None,
+) -> StarredPage:
+    """Fetch a single page of the token owner's starred repos.
+
+    With an etag, GitHub answers 304 Not Modified if the page is unchanged,
+    and such responses don't count against the rate limit. The body is
+    parsed as it streams in, so only the trimmed items are ever held.
+    """
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+
+    with github.stream(
+        "GET",
+        "/user/starred",
+        token=token.token,
+        headers=headers,
+        params={
+            "per_page": STARRED_PAGE_SIZE,
+            "page": page,
+            "sort": "created",
+            "direction": "desc",
+        },
+    ) as response:
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            return StarredPage(True, None, get_last_page(response), [])
+
+        response.raise_for_status()
+        return StarredPage(
+            False,
+            response.headers.get("ETag"),
+            get_last_page(response),
+            [trim_starred_item(item) for item in iter_json_array(response.iter_text())],
+        )
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[Any]:
+    """Decode a JSON array one element at a time as its text arrives.
+
+    Only the element being decoded and the unparsed rest of the latest
+    chunk are held, no matter how long the array is.
+    """
+    chunks = iter(chunks)
+    buffer = ""
+    started = expecting_separator = False
+
+    while True:
+        buffer = buffer.lstrip()
+
+        if buffer and not started:
+            if buffer[0] != "[":
+                raise ValueError("Expected a JSON array")
+            buffer = buffer[1:]
+            started = True
+
+        elif buffer and buffer[0] == "]":
+            return
+
+        elif buffer and expecting_separator:
+            if buffer[0] != ",":
+                raise ValueError(f"Expected ',' in JSON array, got {buffer[0]!r}")
+            buffer = buffer[1:]
+            expecting_separator = False
+
+        elif buffer:
+            try:
+                value, end = _json_decoder.raw_decode(buffer)
+                # a bare number whose text runs to the end may continue in the
+                # next chunk, even past a trailing "1." or "1e" it stopped short of
+                cut_off = (
+                    isinstance(value, (int, float))
+                    and not isinstance(value, bool)
+                    and _NUMBER_TAIL.fullmatch(buffer, end) is not None
+                )
+            except json.JSONDecodeError as error:
+                # or the element may just be cut off by the chunk boundary
+                cut_off, decode_error = True, error
+            else:
+                decode_error = None
+
+            if cut_off and (chunk := next(chunks, None)) is not None:
+                buffer += chunk
+                continue
+            if decode_error:
+                raise decode_error
+
+            yield value
+            buffer = buffer[end:]
+            expecting_separator = True
+
+        elif (chunk := next(chunks, None)) is not None:
+            buffer = chunk
+
+        else:
+            raise ValueError("Truncated JSON array")
+
+
+def trim_starred_item(item: Any) -> Any:
+    """Keep only the fields of a starred repo item that TempStar uses."""
+    if not isinstance(item, dict):
+        return item
+
+    trimmed = {field: item[field] for field in STARRED_ITEM_FIELDS if field in item}
+    if isinstance(owner := trimmed.get("owner"), dict):
+        trimmed["owner"] = {
+            field: owner[field] for field in STARRED_OWNER_FIELDS if field in owner
+        }
+    return trimmed
+
+
+def get_last_page(response: httpx.Response) -> int | None:
+    """Read the last page number from the response's Link header, if present."""
+    last_url = response.links.get("last", {}).get("url")
+    if not last_url:
+        return None
+
+    try:
+        return int(parse_qs(urlsplit(last_url).query)["page"][0])
+    except (KeyError, ValueError):
+        logger.warning(f"Unparseable last page link: {last_url}")
+        return None
 
 
 def pager(
+    user_id: int,
+    token_ids: list[int],
+    full_sync_started_at: datetime | None = None,
+    positions: dict[int, int | str | None] | None = None,
+) -> SyncProgress | None:
+    """Sync starred repos from GitHub into the user's TempStar catalog.
+
+    Stars come newest first. An incremental sync stops at the first page
+    containing an already-known star; a full sync (full_sync_started_at set)
+    fetches everything and, once every token is done, prunes whatever it
+    didn't see.
+
+    All tokens are synced at once, each from its position (a REST page or a
+    GraphQL cursor, None for the start), and dropped from positions when
+    done. Each call is one hop; run_pipeline calls it again with the
+    returned positions until none are left. Returns None once every token
+    has been unlinked.
+    """
+    tokens = get_tokens(user_id, token_ids)
+    if not tokens:
+        logger.info(f"No tokens left for {user_id=}, exiting")
+        return None
+
+    user = tokens[0].account.user
+    if positions is None:
+        positions = {token.id: None for token in tokens}
+    syncing_tokens = [token for token in tokens if token.id in positions]
+
+    logger.info(
+        f"Pager for {user.username}, {len(syncing_tokens)} of {len(tokens)} tokens, "
+        f"{'full' if full_sync_started_at else 'incremental'} sync"
+    )
+
+    use_graphql = settings.GITHUB_STAR_FETCHER == "graphql"
+    star_pages: dict[int, dict[int, StarPage]] = {
+        token.id: {} for token in syncing_tokens
+    }
+    if not use_graphql:
+        for star_page in StarPage.objects.filter(token__in=syncing_tokens):
+            star_pages[star_page.token_id][star_page.page] = star_page
+
+    def fetch(token: SocialToken) -> Any:
+        position = positions[token.id]
+        try:
+            if use_graphql:
+                return fetch_graphql_pages(
+                    token,
+                    position,
+                    GRAPHQL_PAGES_PER_TASK if full_sync_started_at else 1,
+                )
+            return fetch_rest_pages(
+                token,
+                position or 1,
+                full_sync_started_at,
+                star_pages[token.id],
+            )
+        except github.GitHubRateLimitedError as error:
+            return error
+
+    # every token has its own rate limit, so there's no reason to take turns
+    with ThreadPoolExecutor(max_workers=max(len(syncing_tokens), 1)) as executor:
+        fetched = list(executor.map(fetch, syncing_tokens))
+
+    token_syncs: dict[SocialToken, TokenSync] = {}
+    next_positions: dict[int, int | str | None] = {}
+    retry_ats = []
+
+    for token, result in zip(syncing_tokens, fetched):
+        if isinstance(result, github.GitHubRateLimitedError):
+            logger.info(f"Token {token.id} rate limited")
+            retry_ats.append(result.retry_at)
+            next_positions[token.id] = positions[token.id]
+            continue
+
+        if use_graphql:
+            token_sync = sync_graphql_token(user, full_sync_started_at, *result)
+        else:
+            token_sync = sync_rest_token(
+                user,
+                token,
+                positions[token.id] or 1,
+                full_sync_started_at,
+                star_pages[token.id],
+                *result,
+            )
+        token_syncs[token] = token_sync
+        if token_sync.next_position is not None:
+            next_positions[token.id] = token_sync.next_position
+
+    # known stars are all checked before anything is saved, so a repo starred
+    # from two accounts can't cut the second account's sync short, and
+    # ingesting every token's items together keeps one row per repo
+    ingest_items(
+        user,
+        [item for token_sync in token_syncs.values() for item in token_sync.items],
+    )
+    for token, token_sync in token_syncs.items():
+        save_star_pages(user, token, token_sync)
+
+    if retry_ats:
+        logger.info("Rate limited")
+        return SyncProgress(next_positions, max(retry_ats))
+
+    if next_positions:
+        logger.info(f"Next pages due for {len(next_positions)} tokens")
+        return SyncProgress(next_positions, None)
+
+    # no more pages for any token means the catalog is up to date
+    if full_sync_started_at:
+        prune_catalog(user, full_sync_started_at)
+
+    logger.info("All pages processed")
+    return SyncProgress({}, None)
+
+
+def get_tokens(user_id: int, token_ids: list[int]) -> list[SocialToken]:
+    """Load the user's tokens with their accounts and user, in token_ids order.
+
+    Tokens unlinked since the chain started are left out.
+    """
+    tokens = SocialToken.objects.filter(
+        id__in=token_ids,
+        account__user_id=user_id,
+    ).select_related("account__user")
+    tokens_by_id = {token.id: token for token in tokens}
+    return [
+        tokens_by_id[token_id] for token_id in token_ids if token_id in tokens_by_id
+    ]
+
+
+class TokenSync(NamedTuple):
+    """One token's share of a pager hop, ready to be saved."""
+
+    items: list[dict]
+    next_position: int | str | None
+    star_pages: list[StarPage]
+    unchanged_provider_ids: list[str]
+    last_page: int | None
+
+
+def fetch_rest_pages(
+    token: SocialToken,
+    page: int,
+    full_sync_started_at: datetime | None,
+    star_pages: dict[int, StarPage],
+) -> tuple[dict[int, StarredPage], int | None]:
+    """Fetch from page of the REST starred list; return pages and last page.
+
+    A full sync from the first page fetches every page at once.
+    """
+    last_page = None
+
+    def fetch_page(page_number: int) -> StarredPage:
+        star_page = star_pages.get(page_number)
+        return fetch_starred_page(
+            token,
+            page_number,
+            etag=star_page.etag if star_page else None,
+        )
+
+    starred_pages = {page: fetch_page(page)}
+
+    # the first page tells us how many there are, so fetch the rest of them
+    # at once over the shared client instead of one task per page; an
+    # unchanged first page means no new stars, so the stored pages are still
+    # the right count
+    if full_sync_started_at and page == 1:
+        if starred_pages[page].not_modified:
+            last_page = max(star_pages)
+        else:
+            last_page = starred_pages[page].last_page
+    if last_page:
+        logger.info(f"Fetching pages 2 through {last_page} concurrently")
+        page_numbers = range(2, last_page + 1)
+        with ThreadPoolExecutor(max_workers=PAGE_FETCH_CONCURRENCY) as executor:
+            starred_pages.update(
+                zip(page_numbers, executor.map(fetch_page, page_numbers))
+            )
+
+    return starred_pages, last_page
+
+
+def sync_rest_token(
     user: CustomUser,
-    tokens: list[SocialToken],
-    page: int = 1,
+    token: SocialToken,
+    page: int,
+    full_sync_started_at: datetime | None,
+    star_pages: dict[int, StarPage],
+    starred_pages: dict[int, StarredPage],
+    last_page: int | None,
+) -> TokenSync:
+    """Work out what fetched REST pages add to the catalog and where to resume."""
+    items = []
+    page_provider_ids = {}
+    unchanged_pages = []
+    updated_star_pages = []
+
+    for page_number, starred_page in starred_pages.items():
+        if starred_page.not_modified:
+            unchanged_pages.append(page_number)
+            page_provider_ids[page_number] = star_pages[page_number].provider_ids
+            continue
+
+        items.extend(starred_page.items)
+        page_provider_ids[page_number] = [
+            str(item["id"]) for item in starred_page.items if "id" in item
+        ]
+
+        if etag := starred_page.etag:
+            updated_star_pages.append(
+                StarPage(
+                    user=user,
+                    token=token,
+                    page=page_number,
+                    etag=etag,
+                    provider_ids=page_provider_ids[page_number],
+                )
+            )
+
+    logger.info(
+        f"Received {len(items)} items from GitHub API, "
+        f"{len(unchanged_pages)} pages unchanged"
+    )
+
+    # an unchanged first page means nothing was starred since the last run
+    reached_known_stars = False
+    if not full_sync_started_at:
+        reached_known_stars = bool(unchanged_pages) or has_known_stars(
+            user, page_provider_ids[page]
+        )
+
+    # without a Link header there's no way to know if there are more pages
+    # without trying
+    next_page = None
+    if (
+        not last_page
+        and not reached_known_stars
+        and len(page_provider_ids[page]) == STARRED_PAGE_SIZE
+    ):
+        next_page = page + 1
+
+    return TokenSync(
+        items=items,
+        next_position=next_page,
+        star_pages=updated_star_pages,
+        unchanged_provider_ids=[
+            provider_id
+            for page_number in unchanged_pages
+            for provider_id in page_provider_ids[page_number]
+        ],
+        last_page=last_page,
+    )
+
+
+def save_star_pages(
+    user: CustomUser, token: SocialToken, token_sync: TokenSync
 ) -> None:
-    """Fetch starred repos from GitHub API and create TempStar objects."""
-    logger.info(f"Pager for {user.username}, page {page}, {len(tokens)} tokens")
-
-    current_token = tokens[0]
-
-    httpx_transport = RetryTransport(retry=Retry(total=5, backoff_factor=0.5))
-    with httpx.Client(transport=httpx_transport, timeout=30) as client:
-        response = client.get(
-            "https://api.github.com/user/starred",
-            headers={
-                "Accept": "application/vnd.github+json",
-                "Authorization": f"Bearer {current_token.token}",
-            },
-            params={
-                "per_page": 100,
-                "page": page,
-            },
+    """Record a token's fetched pages, once its items are in the catalog."""
+    # unchanged pages' stars are already in the catalog; mark them as seen so
+    # a full sync doesn't prune them
+    if token_sync.unchanged_provider_ids:
+        TempStar.objects.filter(
+            user=user,
+            repository__provider="github",
+            repository__provider_id__in=token_sync.unchanged_provider_ids,
+        ).update(updated_at=timezone.now())
+
+    if token_sync.star_pages:
+        StarPage.objects.bulk_create(
+            token_sync.star_pages,
+            update_conflicts=True,
+            unique_fields=["token", "page"],
+            update_fields=["etag", "provider_ids", "updated_at"],
         )
-    response.raise_for_status()
-    items = response.json()
+    if token_sync.last_page:
+        StarPage.objects.filter(token=token, page__gt=token_sync.last_page).delete()
+
+
+def fetch_graphql_pages(
+    token: SocialToken,
+    cursor: str | None,
+    page_count: int,
+) -> tuple[list[dict], str | None]:
+    """Fetch up to page_count pages of the GraphQL starred list from cursor.
+
+    Returns the items and the cursor to resume from, None at the end.
+    Cursors can't be fetched ahead, so pages come one after another.
+    """
+    items = []
+
+    for _ in range(page_count):
+        data = github.graphql(
+            STARRED_REPOSITORIES_QUERY,
+            {"cursor": cursor, "pageSize": STARRED_PAGE_SIZE},
+            token=token.token,
+        )
+        starred_repositories = data["viewer"]["starredRepositories"]
+        items.extend(
+            graphql_node_to_item(node) for node in starred_repositories["nodes"] if node
+        )
+
+        page_info = starred_repositories["pageInfo"]
+        if not page_info["hasNextPage"]:
+            return items, None
+        cursor = page_info["endCursor"]
+
+    return items, cursor
+
+
+def sync_graphql_token(
+    user: CustomUser,
+    full_sync_started_at: datetime | None,
+    items: list[dict],
+    cursor: str | None,
+) -> TokenSync:
+    """Work out what fetched GraphQL pages add to the catalog and where to resume."""
+    logger.info(f"Received {len(items)} items from GitHub GraphQL API")
+
+    # incremental syncs fetch a page at a time, so this is the page just seen
+    if not full_sync_started_at and has_known_stars(
+        user, [str(item["id"]) for item in items]
+    ):
+        cursor = None
+
+    return TokenSync(
+        items=items,
+        next_position=cursor,
+        star_pages=[],
+        unchanged_provider_ids=[],
+        last_page=None,
+    )
+
+
+def graphql_node_to_item(node: dict) -> dict:
+    """Reshape a GraphQL repository node like a REST API item."""
+    owner = node.get("owner")
+    return {
+        "id": node["databaseId"],
+        "name": node["name"],
+        "owner": {"login": owner["login"], "id": owner["databaseId"]}
+        if owner
+        else None,
+        "description": node.get("description"),
+        "stargazers_count": node["stargazerCount"],
+        "html_url": node["url"],
+        "homepage": node.get("homepageUrl"),
+        "archived": node.get("isArchived", False),
+    }
+
+
+def has_known_stars(user: CustomUser, provider_ids: list[str]) -> bool:
+    """Return whether any of provider_ids is already in the user's catalog."""
+    return TempStar.objects.filter(
+        user=user,
+        repository__provider="github",
+        repository__provider_id__in=provider_ids,
+    ).exists()
+
 
-    logger.info(f"Received {len(items)} items from GitHub API")
+def prune_catalog(user: CustomUser, full_sync_started_at: datetime) -> None:
+    """Delete stars a completed full sync didn't see, i.e. unstarred repos."""
+    # every star seen during the sweep was upserted, bumping updated_at
+    unstarred = TempStar.objects.filter(
+        user=user,
+        updated_at__lt=full_sync_started_at,
+    )
+    repository_ids = list(unstarred.values_list("repository_id", flat=True))
+    deleted_count, _ = unstarred.delete()
+    logger.info(f"Pruned {deleted_count} unstarred repos from catalog")
+
+    # repos nobody else has starred either; recently refreshed ones are left
+    # alone, as another user's sync may be about to star them
+    Repository.objects.filter(
+        id__in=repository_ids,
+        tempstar__isnull=True,
+        updated_at__lt=timezone.now() - REPOSITORY_REFRESH_INTERVAL,
+    ).delete()
+
+    UserProfile.objects.filter(user=user).update(full_sync_at=full_sync_started_at)
+
+
+def ingest_items(user: CustomUser, items: list[dict]) -> None:
+    """Upsert GitHub API items into the shared repos and the user's catalog.
+
+    Repos refreshed within REPOSITORY_REFRESH_INTERVAL aren't written again;
+    the user's TempStar edges are always upserted, marking them as seen.
+    """
+    # new stars join the current cycle somewhere after the cursor, so they're
+    # still to come rather than counted as already shown
+    cycle_cursor = (
+        UserProfile.objects.filter(user=user)
+        .values_list("cycle_cursor", flat=True)
+        .first()
+    )
+
+    # keyed by provider_id: a star can show up on two pages if the list
+    # shifts mid-sweep, and one upsert can't touch the same row twice
+    repositories: dict[str, tuple[Repository, dict]] = {}
 
     for item in items:
         try:
-            TempStar.objects.create(
-                user=user,
+            repository = Repository(
                 provider="github",
                 provider_id=str(item["id"]),
                 name=item["name"],
@@ -108,6 +932,7 @@ def pager(
                 project_url=item.get("homepage"),
                 archived=item.get("archived", False),
             )
+            repositories[repository.provider_id] = (repository, item)
         except TypeError:
             if not item.get("owner"):
                 logger.info(
@@ -118,38 +943,165 @@ def pager(
         except Exception as error:
             sentry_sdk.capture_exception(error, extras={"item": item})
 
-    # no way to know if there are more pages without trying
-    if len(items) == 100:
-        logger.info("Scheduling next page")
-        async_task(
-            "starminder.implementations.jobs.pager",
-            user,
-            tokens,
-            page + 1,
-        )
+    repository_ids = dict(
+        Repository.objects.filter(
+            provider="github",
+            provider_id__in=repositories,
+            updated_at__gte=timezone.now() - REPOSITORY_REFRESH_INTERVAL,
+        ).values_list("provider_id", "id")
+    )
+    stale_repositories = [
+        repository
+        for provider_id, (repository, _) in repositories.items()
+        if provider_id not in repository_ids
+    ]
+
+    # one statement per table for the whole batch; if the database rejects
+    # them, fall back to row-by-row so a single bad item can't take the rest
+    # down with it
+    try:
+        with transaction.atomic():
+            Repository.objects.bulk_create(
+                stale_repositories,
+                update_conflicts=True,
+                unique_fields=["provider", "provider_id"],
+                update_fields=REPOSITORY_SYNCED_FIELDS,
+            )
+            for repository in stale_repositories:
+                repository_ids[repository.provider_id] = repository.id
+
+            TempStar.objects.bulk_create(
+                [
+                    TempStar(
+                        user=user,
+                        repository_id=repository_id,
+                        cycle_rank=random_cycle_rank(cycle_cursor),
+                    )
+                    for repository_id in repository_ids.values()
+                ],
+                update_conflicts=True,
+                unique_fields=["user", "repository"],
+                update_fields=["updated_at"],
+            )
+    except DatabaseError:
+        logger.exception("Bulk upsert failed, falling back to per-item upserts")
+        for repository, item in repositories.values():
+            try:
+                with transaction.atomic():
+                    repository, _ = Repository.objects.update_or_create(
+                        provider=repository.provider,
+                        provider_id=repository.provider_id,
+                        defaults={
+                            field: getattr(repository, field)
+                            for field in REPOSITORY_SYNCED_FIELDS
+                            if field != "updated_at"
+                        },
+                    )
+                    temp_star, created = TempStar.objects.get_or_create(
+                        user=user,
+                        repository=repository,
+                        defaults={"cycle_rank": random_cycle_rank(cycle_cursor)},
+                    )
+                    if not created:
+                        temp_star.save(update_fields=["updated_at"])
+            except DatabaseError as error:
+                sentry_sdk.capture_exception(error, extras={"item": item})
+
+    logger.info(
+        f"Upserted temp stars for {len(repositories)} items, "
+        f"{len(stale_repositories)} repos refreshed"
+    )
 
-    # partial page means no more pages for this token
-    elif len(tokens) > 1:
-        logger.info("Scheduling next token")
-        async_task(
-            "starminder.implementations.jobs.pager",
-            user,
-            tokens[1:],
-            1,
-        )
 
-    # no more tokens means we're done, queue generate_data
-    else:
-        logger.info("All pages processed, scheduling generate_data")
-        async_task(
-            "starminder.implementations.jobs.generate_data",
-            user.id,
-            current_token.account.uid,
-        )
+def reshuffle_cycle(
+    user: CustomUser, leading_temp_stars: list[TempStar]
+) -> float | None:
+    """Start a new reminder cycle over a fresh permutation of the user's stars.
+
+    leading_temp_stars open the new cycle, in order, ranked below the rest.
+    Returns the cursor just past them. Run it in the same transaction as
+    the reminder that shows them, so a crash keeps the old cycle intact.
+    """
+    TempStar.objects.filter(user=user).update(cycle_rank=Random())
+
+    # Random() ranks are in [0, 1), so negative ones sort first
+    for position, temp_star in enumerate(leading_temp_stars):
+        temp_star.cycle_rank = position - len(leading_temp_stars)
+    TempStar.objects.bulk_update(leading_temp_stars, ["cycle_rank"])
+
+    return leading_temp_stars[-1].cycle_rank if leading_temp_stars else None
+
+
+def get_cycle_candidates(user: CustomUser, user_uid: str) -> QuerySet[TempStar]:
+    """Return the user's reminder-eligible TempStars in cycle order."""
+    profile = user.user_profile
+
+    temp_stars_kwargs: dict[str, Any] = {"user": user}
+    if not profile.include_archived:
+        temp_stars_kwargs["repository__archived"] = False
+        logger.info("Filtering out archived repositories")
+
+    candidates_qs = TempStar.objects.filter(**temp_stars_kwargs).select_related(
+        "repository"
+    )
+    if not profile.include_own:
+        candidates_qs = candidates_qs.exclude(repository__owner_id=user_uid)
+    return candidates_qs.order_by("cycle_rank")
+
+
+def get_link_check_urls(
+    repositories: list[Repository],
+) -> tuple[list[str], dict[int, list[str]], dict[int, list[str]]]:
+    """Return the URLs to check for repositories, with those found per field."""
+    description_urls = {
+        repository.id: extract_urls(repository.description or "")
+        for repository in repositories
+    }
+    name_urls = {
+        repository.id: extract_urls(repository.name) for repository in repositories
+    }
+    checked_urls = (
+        [
+            repository.project_url
+            for repository in repositories
+            if repository.project_url
+        ]
+        + [url for urls in description_urls.values() for url in urls]
+        + [url for urls in name_urls.values() for url in urls]
+    )
+    return checked_urls, description_urls, name_urls
+
+
+def warm_link_checks(user_id: int, user_uid: str) -> None:
+    """Resolve link check verdicts for the next reminder.
+
+    The verdicts are cached, so generate_data reads them back instead of
+    waiting on Family DNS, even if the run hands off in between. Stars that
+    only a cycle wrap would pick aren't known until generate_data
+    reshuffles, and are checked there.
+    """
+    user = CustomUser.objects.get(id=user_id)
+    profile = user.user_profile
+
+    candidates_qs = get_cycle_candidates(user, user_uid)
+    if profile.cycle_cursor is not None:
+        candidates_qs = candidates_qs.filter(cycle_rank__gt=profile.cycle_cursor)
+    repositories = [
+        temp_star.repository for temp_star in candidates_qs[: profile.max_entries]
+    ]
+    checked_urls, _, _ = get_link_check_urls(repositories)
+
+    logger.info(f"Warming link checks for {len(checked_urls)} URLs")
+    try:
+        get_flagged_urls(checked_urls)
+    except Exception as error:
+        # generate_data checks whatever isn't cached, so this is only lost time
+        logger.exception("Link check warm-up failed")
+        sentry_sdk.capture_exception(error)
 
 
 def generate_data(user_id: int, user_uid: str) -> None:
-    """Sample TempStars, create Reminder and Stars, queue email sending, clean up."""
+    """Pick the next TempStars, create Reminder and Stars, queue email sending."""
     logger.info(f"Generating data for user_id={user_id}")
 
     user = CustomUser.objects.get(id=user_id)
@@ -166,163 +1118,111 @@ def generate_data(user_id: int, user_uid: str) -> None:
         )
         return
 
-    previously_shown_ids = set()
-
-    if cycle_start := user.user_profile.cycle_start:
-        logger.info(f"Current cycle started at Star ID: {cycle_start.id}")
-
-        previously_shown_ids = set(
-            Star.objects.filter(reminder__user=user, id__gte=cycle_start.id)
-            .values_list("provider_id", flat=True)
-            .distinct()
-        )
-        logger.info(f"Found {len(previously_shown_ids)} repos shown in current cycle")
+    profile = user.user_profile
+    archive_label = "unarchived" if profile.include_archived else "archived"
+    candidates_qs = get_cycle_candidates(user, user_uid)
 
+    # the cycle is the user's stars in cycle_rank order, and the cursor marks
+    # how far into it previous reminders got, so picking the next stars is a
+    # short index range scan however many stars and reminders there are
+    if profile.cycle_cursor is None:
+        logger.info("No cycle cursor found, starting fresh cycle")
+        picked_temp_stars = list(candidates_qs[: profile.max_entries])
     else:
-        logger.info("No cycle start found, starting fresh cycle")
-
-    temp_stars_kwargs = {"user": user}
-    archive_label = "unarchived"
-    if not user.user_profile.include_archived:
-        temp_stars_kwargs["archived"] = False
-        archive_label = "archived"
-        logger.info("Filtering out archived repositories")
-
-    unshown_temp_stars_qs = TempStar.objects.filter(**temp_stars_kwargs).exclude(
-        provider_id__in=previously_shown_ids,
-    )
-
-    if not user.user_profile.include_own:
-        unshown_temp_stars_qs = unshown_temp_stars_qs.exclude(owner_id=user_uid)
-
-    unshown_temp_stars = list(unshown_temp_stars_qs)
-
-    logger.info(f"Found {len(unshown_temp_stars)} unshown {archive_label} temp stars")
+        picked_temp_stars = list(
+            candidates_qs.filter(cycle_rank__gt=profile.cycle_cursor)[
+                : profile.max_entries
+            ]
+        )
+    logger.info(f"Picked {len(picked_temp_stars)} {archive_label} temp stars")
 
-    if len(unshown_temp_stars) < user.user_profile.max_entries:
+    new_cycle_temp_stars: list[TempStar] | None = None
+    if (
+        len(picked_temp_stars) < profile.max_entries
+        and profile.cycle_cursor is not None
+    ):
         logger.info(
-            f"Only {len(unshown_temp_stars)} unshown repos, "
-            f"but need {user.user_profile.max_entries}. Querying all repos."
+            f"Only {len(picked_temp_stars)} repos left in cycle, "
+            f"but need {profile.max_entries}. Starting a new cycle."
         )
 
-        all_temp_stars_qs = TempStar.objects.filter(**temp_stars_kwargs)
-
-        if not user.user_profile.include_own:
-            all_temp_stars_qs = all_temp_stars_qs.exclude(owner_id=user_uid)
+        # the new cycle's opening stars are picked at random now, but its
+        # ranks are only written with the reminder, further down
+        new_cycle_temp_stars = list(
+            candidates_qs.exclude(
+                id__in=[temp_star.id for temp_star in picked_temp_stars]
+            ).order_by("?")[: profile.max_entries - len(picked_temp_stars)]
+        )
+        picked_temp_stars += new_cycle_temp_stars
+        cycle_cursor = None
 
-        all_temp_stars = list(all_temp_stars_qs)
+    elif len(picked_temp_stars) < profile.max_entries:
+        # a fresh cycle that fits in one reminder; the next one starts over
+        cycle_cursor = None
 
-        if not all_temp_stars:
-            logger.info("No temp stars found, exiting")
-            return
+    else:
+        cycle_cursor = picked_temp_stars[-1].cycle_rank
 
-        logger.info(
-            f"Cycle will reset with this reminder "
-            f"({len(unshown_temp_stars)} unshown, {len(all_temp_stars)} total)."
-        )
+    if not picked_temp_stars:
+        logger.info("No temp stars found, exiting")
+        return
 
-        temp_stars_to_sample = all_temp_stars
-        total_repos_available = len(all_temp_stars)
+    sampled_repositories = [temp_star.repository for temp_star in picked_temp_stars]
 
-    else:
-        temp_stars_to_sample = unshown_temp_stars
-        total_repos_available = TempStar.objects.filter(**temp_stars_kwargs).count()
+    checked_urls, description_urls, name_urls = get_link_check_urls(
+        sampled_repositories
+    )
 
-    sample_size = min(user.user_profile.max_entries, len(temp_stars_to_sample))
-    sampled_temp_stars = random.sample(temp_stars_to_sample, sample_size)
+    # the link check can take up to its 60s budget, so it runs before the
+    # transaction rather than holding a connection and locks open meanwhile;
+    # warm_link_checks has usually cached its verdicts already
+    with sentry_sdk.new_scope() as scope:
+        scope.set_extra("user_id", user_id)
+        scope.set_extra("recipient", profile.reminder_email)
 
-    logger.info(f"Sampled {sample_size} temp stars")
+        try:
+            flagged_urls = get_flagged_urls(checked_urls)
+        except Exception as error:
+            logger.exception("Link check failed entirely, failing closed on all URLs")
+            sentry_sdk.capture_exception(error)
+            flagged_urls = set(checked_urls)
 
     # everything from the Reminder to the queued email (an ORM-broker row)
     # commits or rolls back as one unit, so a crash anywhere leaves no
-    # partial state and django-q's re-delivery can start completely fresh;
-    # the link check runs inside it too, holding the transaction open for up
-    # to its 60s budget — hoist it above the block if that ever hurts
+    # partial state and django-q's re-delivery can start completely fresh
     with transaction.atomic():
-        reminder = Reminder.objects.create(user_id=user_id)
+        if new_cycle_temp_stars is not None:
+            cycle_cursor = reshuffle_cycle(user, new_cycle_temp_stars)
 
-        description_urls = {
-            temp_star.id: extract_urls(temp_star.description or "")
-            for temp_star in sampled_temp_stars
-        }
-        name_urls = {
-            temp_star.id: extract_urls(temp_star.name)
-            for temp_star in sampled_temp_stars
-        }
-        checked_urls = (
-            [
-                temp_star.project_url
-                for temp_star in sampled_temp_stars
-                if temp_star.project_url
-            ]
-            + [url for urls in description_urls.values() for url in urls]
-            + [url for urls in name_urls.values() for url in urls]
-        )
-        with sentry_sdk.new_scope() as scope:
-            scope.set_extra("reminder_id", reminder.id)
-            scope.set_extra(
-                "reminder_url",
-                f"https://starminder.dev/reminders/"
-                f"{user.user_profile.feed_id}/{reminder.id}/",
-            )
-            scope.set_extra("recipient", user.user_profile.reminder_email)
-
-            try:
-                flagged_urls = get_flagged_urls(checked_urls)
-            except Exception as error:
-                logger.exception(
-                    "Link check failed entirely, failing closed on all URLs"
-                )
-                sentry_sdk.capture_exception(error)
-                flagged_urls = set(checked_urls)
-
-        cutoff_index = total_repos_available - len(previously_shown_ids)
-        logger.info(
-            f"Cutoff index: {cutoff_index} "
-            f"(total: {total_repos_available}, shown: {len(previously_shown_ids)})"
-        )
+        reminder = Reminder.objects.create(user_id=user_id)
 
-        for idx, temp_star in enumerate(sampled_temp_stars):
-            star = Star.objects.create(
+        stars = Star.objects.bulk_create(
+            Star(
                 reminder=reminder,
-                provider=temp_star.provider,
-                provider_id=temp_star.provider_id,
-                owner=temp_star.owner,
-                owner_id=temp_star.owner_id,
-                name=temp_star.name,
+                provider=repository.provider,
+                provider_id=repository.provider_id,
+                owner=repository.owner,
+                owner_id=repository.owner_id,
+                name=repository.name,
                 name_flagged=any(
-                    url in flagged_urls for url in name_urls[temp_star.id]
+                    url in flagged_urls for url in name_urls[repository.id]
                 ),
-                description=temp_star.description,
+                description=repository.description,
                 description_flagged=any(
-                    url in flagged_urls for url in description_urls[temp_star.id]
+                    url in flagged_urls for url in description_urls[repository.id]
                 ),
-                star_count=temp_star.star_count,
-                repo_url=temp_star.repo_url,
-                project_url=temp_star.project_url,
-                project_url_flagged=temp_star.project_url in flagged_urls,
-                archived=temp_star.archived,
+                star_count=repository.star_count,
+                repo_url=repository.repo_url,
+                project_url=repository.project_url,
+                project_url_flagged=repository.project_url in flagged_urls,
+                archived=repository.archived,
             )
+            for repository in sampled_repositories
+        )
 
-            if idx == cutoff_index or (
-                idx == 0 and user.user_profile.cycle_start is None
-            ):
-                user.user_profile.cycle_start = star
-                user.user_profile.save()
-                logger.info(
-                    f"Cycle start set to Star ID {star.id} "
-                    f"(star {idx + 1} of {len(sampled_temp_stars)} in this reminder)"
-                )
-
-        logger.info(f"Created reminder and {len(sampled_temp_stars)} stars")
+        logger.info(f"Created reminder and {len(stars)} stars")
 
-        if cutoff_index == len(sampled_temp_stars):
-            user.user_profile.cycle_start = None
-            user.user_profile.save()
-            logger.info(
-                "Cycle completed exactly with this reminder. "
-                "Next reminder starts fresh."
-            )
+        UserProfile.objects.filter(user=user).update(cycle_cursor=cycle_cursor)
 
         if user.user_profile.reminder_email:
             logger.info(f"Found email for {user}, queuing email send…")
@@ -343,17 +1243,4 @@ def generate_data(user_id: int, user_uid: str) -> None:
         else:
             logger.info(f"No email found for {user}")
 
-        async_task(
-            "starminder.implementations.jobs.cleanup_temp_stars",
-            user_id,
-        )
-
     logger.info("Done!")
-
-
-def cleanup_temp_stars(user_id: int) -> None:
-    """Delete all temporary stars for a specific user."""
-    logger.info(f"Cleaning up temp stars for {user_id=}")
-
-    deleted_count, _ = TempStar.objects.filter(user_id=user_id).delete()
-    logger.info(f"Deleted {deleted_count} temp stars")
@@ -0,0 +1,175 @@
+from argparse import ArgumentTypeError
+import math
+import random
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import transaction
+from loguru import logger
+
+from starminder.content import linkcheck
+from starminder.content.dohstub import DohStubServer
+from starminder.content.models import HostnameVerdict
+from starminder.implementations.jobs import get_link_check_urls
+from starminder.implementations.models import Repository
+
+
+SYNTHETIC_WORDS = ["async", "config", "graph", "markdown", "parser", "terminal"]
+
+
+def synthetic_repository(index: int) -> Repository:
+    """Return an unsaved repository with a typical mix of links."""
+    word = SYNTHETIC_WORDS[index % len(SYNTHETIC_WORDS)]
+    return Repository(
+        id=-index - 1,
+        name=f"{word}-{index}",
+        description=random.choice(
+            [
+                f"A tiny {word} library",
+                f"Fast {word} toolkit. Docs at https://{word}{index}.readthedocs.io",
+                f"{word.title()} CLI, mirrored at {word}{index}.dev and "
+                f"https://{word}.example.org/{index}",
+            ]
+        ),
+        project_url=random.choice(
+            ["", f"https://{word}{index}.github.io", f"https://{word}{index}.dev"]
+        ),
+    )
+
+
+def positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f"{value!r} is not an integer") from None
+    if number < 1:
+        raise ArgumentTypeError(f"{value!r} is not a positive integer")
+    return number
+
+
+def non_negative_float(value: str) -> float:
+    try:
+        number = float(value)
+    except ValueError:
+        raise ArgumentTypeError(f"{value!r} is not a number") from None
+    if not math.isfinite(number) or number < 0:
+        raise ArgumentTypeError(f"{value!r} is not a non-negative number")
+    return number
+
+
+def fraction(value: str) -> float:
+    number = non_negative_float(value)
+    if number > 1:
+        raise ArgumentTypeError(f"{value!r} is not between 0 and 1")
+    return number
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the link checker against a local Family DNS stand-in"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--reminders", type=positive_int, default=50)
+        parser.add_argument("--max-entries", type=positive_int, default=10)
+        parser.add_argument(
+            "--latency",
+            type=non_negative_float,
+            default=0.05,
+            help="Mean stand-in response time in seconds",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=fraction,
+            default=0.0,
+            help="Share of stand-in responses that are 503s",
+        )
+        parser.add_argument(
+            "--blocked",
+            nargs="*",
+            default=[],
+            help="Domains the stand-in flags, along with their subdomains",
+        )
+        parser.add_argument(
+            "--concurrency", type=positive_int, default=linkcheck.DOH_CONCURRENCY
+        )
+        parser.add_argument(
+            "--budget", type=non_negative_float, default=linkcheck.DOH_TIME_BUDGET
+        )
+        parser.add_argument(
+            "--keep-cache",
+            action="store_true",
+            help="Reuse verdicts between reminders, as production does",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        reminders = options["reminders"]
+        max_entries = options["max_entries"]
+
+        # real descriptions where the catalog has them, synthetic ones after
+        needed = reminders * max_entries
+        repositories = list(Repository.objects.order_by("?")[:needed])
+        repositories += [
+            synthetic_repository(index) for index in range(len(repositories), needed)
+        ]
+
+        server = DohStubServer(
+            latency=options["latency"],
+            error_rate=options["error_rate"],
+            blocked_domains=options["blocked"],
+        )
+        server.start()
+
+        budget_exhaustions = 0
+        hostnames = 0
+        latencies = []
+
+        logger.disable("starminder.content.linkcheck")
+        try:
+            with transaction.atomic():
+                for start in range(0, needed, max_entries):
+                    if not options["keep_cache"]:
+                        HostnameVerdict.objects.all().delete()
+
+                    checked_urls, _, _ = get_link_check_urls(
+                        repositories[start : start + max_entries]
+                    )
+                    started_at = time.perf_counter()
+                    link_check = linkcheck.check_urls(
+                        checked_urls,
+                        doh_url=server.url,
+                        concurrency=options["concurrency"],
+                        time_budget=options["budget"],
+                    )
+                    latencies.append(time.perf_counter() - started_at)
+
+                    hostnames += len(link_check.queried_hostnames)
+                    if link_check.skipped_urls:
+                        budget_exhaustions += 1
+
+                # the stand-in's verdicts must never reach the real cache
+                transaction.set_rollback(True)
+        finally:
+            logger.enable("starminder.content.linkcheck")
+            server.stop()
+
+        elapsed = sum(latencies)
+        throughput = hostnames / elapsed if elapsed else 0.0
+
+        self.stdout.write(f"Reminders: {reminders} of {max_entries} repositories")
+        self.stdout.write(
+            f"Uncached hostnames: {hostnames} in {elapsed:.2f}s "
+            f"({throughput:.1f}/s, {server.request_count} DoH requests)"
+        )
+        self.stdout.write(
+            f"Budget exhausted: {budget_exhaustions} reminders "
+            f"({budget_exhaustions / reminders:.1%})"
+        )
+        self.stdout.write(
+            f"Reminder latency: p50 {percentile(latencies, 0.5):.3f}s, "
+            f"p99 {percentile(latencies, 0.99):.3f}s"
+        )
@@ -9,12 +9,16 @@ class Command(BaseCommand):
     help = "Set up django-q schedules for recurring jobs"
 
     def handle(self, *args: Any, **options: Any) -> None:
+        # start_jobs only picks up profiles whose next run has come, so it's
+        # cheap enough to run every minute; this replaces the hourly schedule
+        Schedule.objects.filter(name="start_jobs_hourly").delete()
+
         schedule, created = Schedule.objects.get_or_create(
-            name="start_jobs_hourly",
+            name="start_jobs_every_minute",
             defaults={
                 "func": "starminder.implementations.jobs.start_jobs",
                 "schedule_type": Schedule.CRON,
-                "cron": "5 * * * *",
+                "cron": "* * * * *",
             },
         )
 
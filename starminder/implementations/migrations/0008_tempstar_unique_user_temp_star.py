@@ -0,0 +1,29 @@
+# Generated by Django 6.0.6 on 2026-10-18 19:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def delete_temp_stars(apps, schema_editor):
+    # leftovers from the old rebuild-every-run scheme may hold duplicates
+    # (e.g. a repo starred from two accounts); the catalog is rebuilt by the
+    # next run's full sync anyway
+    TempStar = apps.get_model("implementations", "TempStar")
+    TempStar.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("implementations", "0007_tempstar_archived"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_temp_stars, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="tempstar",
+            constraint=models.UniqueConstraint(
+                fields=("user", "provider", "provider_id"), name="unique_user_temp_star"
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.6 on 2026-10-18 19:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("implementations", "0008_tempstar_unique_user_temp_star"),
+        ("socialaccount", "0006_alter_socialaccount_extra_data"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StarPage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("page", models.PositiveIntegerField()),
+                ("etag", models.CharField(max_length=255)),
+                ("provider_ids", models.JSONField(default=list)),
+                (
+                    "token",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="socialaccount.socialtoken",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Star Page",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("token", "page"), name="unique_token_star_page"
+                    )
+                ],
+            },
+        ),
+    ]
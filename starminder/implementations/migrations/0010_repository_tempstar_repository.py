@@ -0,0 +1,60 @@
+# Generated by Django 6.0.6 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("implementations", "0009_starpage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Repository",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("provider", models.CharField(max_length=255)),
+                ("provider_id", models.CharField(max_length=255)),
+                ("name", models.CharField(max_length=255)),
+                ("owner", models.CharField(max_length=255)),
+                ("owner_id", models.CharField(max_length=255)),
+                ("description", models.TextField(blank=True, null=True)),
+                ("star_count", models.IntegerField()),
+                ("repo_url", models.URLField(max_length=1024)),
+                (
+                    "project_url",
+                    models.URLField(blank=True, max_length=1024, null=True),
+                ),
+                ("archived", models.BooleanField(default=False)),
+            ],
+            options={
+                "verbose_name": "Repository",
+                "verbose_name_plural": "Repositories",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("provider", "provider_id"), name="unique_repository"
+                    )
+                ],
+            },
+        ),
+        migrations.AddField(
+            model_name="tempstar",
+            name="repository",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="implementations.repository",
+            ),
+        ),
+    ]
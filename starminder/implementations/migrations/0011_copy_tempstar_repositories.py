@@ -0,0 +1,53 @@
+# Generated by Django 6.0.6 on 2026-10-18 19:45
+
+from django.db import migrations
+
+
+REPOSITORY_FIELDS = [
+    "provider",
+    "provider_id",
+    "name",
+    "owner",
+    "owner_id",
+    "description",
+    "star_count",
+    "repo_url",
+    "project_url",
+    "archived",
+]
+
+
+def copy_tempstar_repositories(apps, schema_editor):
+    TempStar = apps.get_model("implementations", "TempStar")
+    Repository = apps.get_model("implementations", "Repository")
+
+    # the most recently synced copy of each repo wins
+    repositories = {}
+    for temp_star in TempStar.objects.order_by("updated_at").iterator():
+        repositories[(temp_star.provider, temp_star.provider_id)] = Repository(
+            **{field: getattr(temp_star, field) for field in REPOSITORY_FIELDS}
+        )
+    Repository.objects.bulk_create(repositories.values(), batch_size=1000)
+
+    repository_ids = {
+        (provider, provider_id): repository_id
+        for repository_id, provider, provider_id in Repository.objects.values_list(
+            "id", "provider", "provider_id"
+        )
+    }
+    temp_stars = list(TempStar.objects.only("id", "provider", "provider_id"))
+    for temp_star in temp_stars:
+        temp_star.repository_id = repository_ids[
+            (temp_star.provider, temp_star.provider_id)
+        ]
+    TempStar.objects.bulk_update(temp_stars, ["repository"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("implementations", "0010_repository_tempstar_repository"),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_tempstar_repositories),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 6.0.6 on 2026-10-18 19:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("implementations", "0011_copy_tempstar_repositories"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="tempstar",
+            name="unique_user_temp_star",
+        ),
+        migrations.AlterField(
+            model_name="tempstar",
+            name="repository",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                to="implementations.repository",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="tempstar",
+            constraint=models.UniqueConstraint(
+                fields=("user", "repository"), name="unique_user_temp_star"
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="archived",
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="description",
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="name",
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="owner",
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="owner_id",
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="project_url",
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="provider",
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="provider_id",
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="repo_url",
+        ),
+        migrations.RemoveField(
+            model_name="tempstar",
+            name="star_count",
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.6 on 2026-10-18 19:57
+
+import starminder.implementations.models
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Random
+
+
+def shuffle_cycle_ranks(apps, schema_editor):
+    # the default is evaluated once for every existing row
+    TempStar = apps.get_model("implementations", "TempStar")
+    TempStar.objects.update(cycle_rank=Random())
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("implementations", "0012_remove_tempstar_repository_fields"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tempstar",
+            name="cycle_rank",
+            field=models.FloatField(
+                default=starminder.implementations.models.random_cycle_rank
+            ),
+        ),
+        migrations.RunPython(shuffle_cycle_ranks, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="tempstar",
+            index=models.Index(
+                fields=["user", "cycle_rank"], name="tempstar_user_cycle_rank"
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.6 on 2026-10-18 20:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("implementations", "0013_tempstar_cycle_rank"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PipelineRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "stage",
+                    models.CharField(
+                        choices=[
+                            ("sync", "Sync stars"),
+                            ("warm_link_checks", "Warm link checks"),
+                            ("generate_data", "Generate reminder"),
+                        ],
+                        default="sync",
+                        max_length=32,
+                    ),
+                ),
+                ("user_uid", models.CharField(max_length=255)),
+                ("token_ids", models.JSONField(default=list)),
+                ("full_sync_started_at", models.DateTimeField(blank=True, null=True)),
+                ("positions", models.JSONField(blank=True, null=True)),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Pipeline Run",
+            },
+        ),
+    ]
@@ -1,18 +1,132 @@
+import random
 from typing import ClassVar
 
+from allauth.socialaccount.models import SocialToken
 from django.conf import settings
-from django.db.models import CASCADE, ForeignKey, Manager
+from django.db.models import (
+    CASCADE,
+    CharField,
+    DateTimeField,
+    FloatField,
+    ForeignKey,
+    Index,
+    JSONField,
+    Manager,
+    OneToOneField,
+    PositiveIntegerField,
+    UniqueConstraint,
+)
 
 from starminder.core.models import StarFieldsBase, TimestampedModel
 
 
-class TempStar(TimestampedModel, StarFieldsBase):
+def random_cycle_rank(after: float | None = None) -> float:
+    """Return a random cycle rank, above after if given."""
+    if after is None:
+        return random.random()
+    # in (after, 1], so never at or below the cursor it's placed after; a
+    # cycle's opening stars rank below 0, and the rest sit in [0, 1)
+    after = max(after, 0.0)
+    return 1 - (1 - after) * random.random()
+
+
+class Repository(TimestampedModel, StarFieldsBase):
+    """A starred repo's metadata, shared by every user who starred it."""
+
+    objects: ClassVar["Manager[Repository]"]
+
+    class Meta:
+        verbose_name = "Repository"
+        verbose_name_plural = "Repositories"
+        constraints = [
+            UniqueConstraint(
+                fields=["provider", "provider_id"],
+                name="unique_repository",
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.owner}/{self.name}, {self.provider}"
+
+
+class TempStar(TimestampedModel):
+    """A repo in a user's star catalog, kept in sync with GitHub between runs."""
+
     objects: ClassVar["Manager[TempStar]"]
 
     user = ForeignKey(settings.AUTH_USER_MODEL, on_delete=CASCADE)
+    repository = ForeignKey(Repository, on_delete=CASCADE)
+    # position in the user's reminder cycle, a random permutation of their
+    # stars; new stars land at a random point in what's left of it
+    cycle_rank = FloatField(default=random_cycle_rank)
 
     class Meta:
         verbose_name = "Temporary Star"
+        constraints = [
+            UniqueConstraint(
+                fields=["user", "repository"],
+                name="unique_user_temp_star",
+            ),
+        ]
+        indexes = [
+            Index(fields=["user", "cycle_rank"], name="tempstar_user_cycle_rank"),
+        ]
+
+    def __str__(self) -> str:
+        return f"tmp: {self.repository}, {self.user.username}"
+
+
+class StarPage(TimestampedModel):
+    """ETag and contents of a previously fetched page of a token's stars."""
+
+    objects: ClassVar["Manager[StarPage]"]
+
+    user = ForeignKey(settings.AUTH_USER_MODEL, on_delete=CASCADE)
+    token = ForeignKey(SocialToken, on_delete=CASCADE)
+    page = PositiveIntegerField()
+    etag = CharField(max_length=255)
+    provider_ids = JSONField(default=list)
+
+    class Meta:
+        verbose_name = "Star Page"
+        constraints = [
+            UniqueConstraint(fields=["token", "page"], name="unique_token_star_page"),
+        ]
+
+    def __str__(self) -> str:
+        return f"page {self.page}, {self.user.username}"
+
+
+class PipelineRun(TimestampedModel):
+    """Checkpoint of a user's in-progress reminder pipeline, one per user.
+
+    Updated after every stage, so a run that crashes or times out picks up
+    from its last completed stage when django-q re-delivers it.
+    """
+
+    objects: ClassVar["Manager[PipelineRun]"]
+
+    SYNC = "sync"
+    WARM_LINK_CHECKS = "warm_link_checks"
+    GENERATE_DATA = "generate_data"
+
+    STAGE_CHOICES = [
+        (SYNC, "Sync stars"),
+        (WARM_LINK_CHECKS, "Warm link checks"),
+        (GENERATE_DATA, "Generate reminder"),
+    ]
+
+    user = OneToOneField(settings.AUTH_USER_MODEL, on_delete=CASCADE)
+    stage = CharField(max_length=32, choices=STAGE_CHOICES, default=SYNC)
+    user_uid = CharField(max_length=255)
+    token_ids = JSONField(default=list)
+    full_sync_started_at = DateTimeField(null=True, blank=True)
+    # each token's REST page or GraphQL cursor, as pager takes them; None
+    # until the first hop, and keyed by token ID strings once stored as JSON
+    positions = JSONField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Pipeline Run"
 
     def __str__(self) -> str:
-        return f"tmp: {self.owner}/{self.name}, {self.provider}, {self.user.username}"
+        return f"{self.stage}, {self.user.username}"
@@ -0,0 +1,75 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+import pytest
+
+from starminder.content.models import HostnameVerdict
+from starminder.implementations.models import Repository
+
+
+@pytest.mark.django_db
+def test_benchmark_linkcheck_reports_and_leaves_cache_alone() -> None:
+    out = StringIO()
+
+    call_command(
+        "benchmark_linkcheck",
+        "--reminders=3",
+        "--max-entries=4",
+        "--latency=0",
+        stdout=out,
+    )
+
+    output = out.getvalue()
+    assert "Reminders: 3 of 4 repositories" in output
+    assert "Budget exhausted: 0 reminders" in output
+    assert "Reminder latency: p50" in output
+    assert not HostnameVerdict.objects.exists()
+
+
+@pytest.mark.django_db
+def test_benchmark_linkcheck_counts_budget_exhaustion() -> None:
+    for index in range(4):
+        Repository.objects.create(
+            provider="github",
+            provider_id=str(index),
+            name=f"repo-{index}",
+            owner="owner",
+            owner_id="1",
+            star_count=0,
+            repo_url=f"https://github.com/owner/repo-{index}",
+            project_url=f"https://repo-{index}.example.com",
+        )
+    out = StringIO()
+
+    call_command(
+        "benchmark_linkcheck",
+        "--reminders=2",
+        "--max-entries=2",
+        "--latency=0.5",
+        "--budget=0",
+        stdout=out,
+    )
+
+    assert "Budget exhausted: 2 reminders (100.0%)" in out.getvalue()
+
+
+@pytest.mark.parametrize("argument", ["--reminders=0", "--max-entries=0"])
+def test_benchmark_linkcheck_rejects_non_positive_counts(argument: str) -> None:
+    with pytest.raises(CommandError, match="is not a positive integer"):
+        call_command("benchmark_linkcheck", argument)
+
+
+@pytest.mark.parametrize(
+    ("argument", "message"),
+    [
+        ("--latency=-0.1", "is not a non-negative number"),
+        ("--budget=nan", "is not a non-negative number"),
+        ("--error-rate=-0.5", "is not a non-negative number"),
+        ("--error-rate=1.5", "is not between 0 and 1"),
+    ],
+)
+def test_benchmark_linkcheck_rejects_out_of_range_floats(
+    argument: str, message: str
+) -> None:
+    with pytest.raises(CommandError, match=message):
+        call_command("benchmark_linkcheck", argument)
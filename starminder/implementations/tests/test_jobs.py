@@ -1,20 +1,42 @@
-from datetime import datetime, timedelta
-from unittest.mock import MagicMock, Mock, patch
-
+import ast
+from datetime import UTC, datetime, timedelta
+import json
+from unittest.mock import MagicMock, patch
+from uuid import UUID
+
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+import httpx
 import pytest
 from allauth.socialaccount.models import SocialAccount, SocialToken
+from django_q.models import OrmQ, Schedule
+from django_q.signing import SignedPackage
 
 from starminder.content.models import Reminder, Star
 from starminder.core.models import UserProfile
 from starminder.implementations.jobs import (
-    cleanup_temp_stars,
+    fetch_starred_page,
     generate_data,
+    get_last_page,
+    get_start_offset,
+    get_tokens,
+    ingest_items,
+    iter_json_array,
     pager,
+    prune_catalog,
+    run_pipeline,
     start_jobs,
+    SyncProgress,
     user_job,
+    warm_link_checks,
+)
+from starminder.implementations.models import (
+    PipelineRun,
+    Repository,
+    StarPage,
+    TempStar,
 )
-from starminder.implementations.models import TempStar
 
 
 @pytest.fixture
@@ -52,6 +74,44 @@ def social_token(social_account):
     )
 
 
+def github_response(
+    items: list[dict],
+    headers: dict | None = None,
+    status_code: int = 200,
+) -> httpx.Response:
+    return httpx.Response(
+        status_code,
+        json=items,
+        headers=headers,
+        request=httpx.Request("GET", "https://api.github.com/user/starred"),
+    )
+
+
+def mock_github(mock_get_client: MagicMock, handler) -> list[httpx.Request]:
+    """Serve GitHub API requests from handler, returning the requests made."""
+    requests = []
+
+    def record(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return handler(request)
+
+    mock_get_client.return_value = httpx.Client(
+        base_url="https://api.github.com",
+        transport=httpx.MockTransport(record),
+    )
+    return requests
+
+
+def create_temp_star(user, provider_id: str, provider: str = "github", **fields):
+    """Add a repo to user's catalog, creating or updating the shared repo."""
+    repository, _ = Repository.objects.update_or_create(
+        provider=provider,
+        provider_id=provider_id,
+        defaults=fields,
+    )
+    return TempStar.objects.create(user=user, repository=repository)
+
+
 def backdate_reminders() -> None:
     """Age existing reminders past the duplicate-delivery guard window."""
     Reminder.objects.update(created_at=timezone.now() - timedelta(hours=2))
@@ -68,7 +128,7 @@ def mock_get_flagged_urls():
 
 @pytest.fixture
 def temp_star(user):
-    return TempStar.objects.create(
+    return create_temp_star(
         user=user,
         provider="github",
         provider_id="12345",
@@ -84,15 +144,53 @@ def temp_star(user):
 
 # start_jobs tests
 
+BEFORE_NOON = datetime(2025, 10, 11, 11, 59, tzinfo=UTC)
+NOON = datetime(2025, 10, 11, 12, 0, tzinfo=UTC)
+
+
+@pytest.fixture
+def clock():
+    """Patch timezone.now, starting a minute before noon UTC on a Saturday."""
+    mock_now = MagicMock(return_value=BEFORE_NOON)
+    with patch("django.utils.timezone.now", mock_now):
+        yield mock_now
+
+
+def queued_user_ids() -> list[int]:
+    """Return the user IDs of queued user_job tasks, in queue order."""
+    tasks = [
+        SignedPackage.loads(package.payload) for package in OrmQ.objects.order_by("id")
+    ]
+    assert all(
+        task["func"] == "starminder.implementations.jobs.user_job" for task in tasks
+    )
+    return [task["args"][0] for task in tasks]
+
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.datetime")
-def test_start_jobs_schedules_matching_profiles(
-    mock_datetime, mock_async_task, user, user2
+def test_start_jobs_queries_are_constant(
+    clock, django_user_model, django_assert_num_queries
 ) -> None:
-    now = datetime(2025, 10, 11, 12, 0)
-    mock_datetime.now.return_value = now
+    now = NOON
+
+    for i in range(10):
+        user = django_user_model.objects.create_user(username=f"user{i}")
+        user.user_profile.day_of_week = UserProfile.EVERY_DAY
+        user.user_profile.hour_of_day = now.hour
+        user.user_profile.save()
+
+    clock.return_value = NOON
+    # savepoint, one to find and lock the profiles, one to queue every job,
+    # one to move them on, release
+    with django_assert_num_queries(5):
+        start_jobs()
+
+    assert len(queued_user_ids()) == 10
+
+
+@pytest.mark.django_db
+def test_start_jobs_schedules_matching_profiles(clock, user, user2) -> None:
+    now = NOON
 
     user.user_profile.day_of_week = now.weekday()
     user.user_profile.hour_of_day = now.hour
@@ -102,102 +200,176 @@ def test_start_jobs_schedules_matching_profiles(
     user2.user_profile.hour_of_day = now.hour
     user2.user_profile.save()
 
+    clock.return_value = NOON
     start_jobs()
 
-    assert mock_async_task.call_count == 2
-    scheduled_user_ids = {call[0][1] for call in mock_async_task.call_args_list}
-    assert scheduled_user_ids == {user.id, user2.id}
+    assert sorted(queued_user_ids()) == sorted([user.id, user2.id])
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.datetime")
-def test_start_jobs_does_not_schedule_non_matching_profiles(
-    mock_datetime, mock_async_task, user
-) -> None:
-    now = datetime(2025, 10, 11, 12, 0)
-    mock_datetime.now.return_value = now
+def test_start_jobs_does_not_schedule_non_matching_profiles(clock, user) -> None:
+    now = NOON
 
     user.user_profile.day_of_week = (now.weekday() + 1) % 7
     user.user_profile.hour_of_day = now.hour
     user.user_profile.save()
 
+    clock.return_value = NOON
     start_jobs()
 
-    mock_async_task.assert_not_called()
+    assert queued_user_ids() == []
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.datetime")
-def test_start_jobs_schedules_every_day_profiles(
-    mock_datetime, mock_async_task, user
-) -> None:
-    now = datetime(2025, 10, 11, 12, 0)
-    mock_datetime.now.return_value = now
+def test_start_jobs_schedules_every_day_profiles(clock, user) -> None:
+    now = NOON
 
     user.user_profile.day_of_week = UserProfile.EVERY_DAY
     user.user_profile.hour_of_day = now.hour
     user.user_profile.save()
 
+    clock.return_value = NOON
     start_jobs()
 
-    mock_async_task.assert_called_once_with(
-        "starminder.implementations.jobs.user_job",
-        user.id,
+    assert queued_user_ids() == [user.id]
+
+
+@pytest.mark.django_db
+def test_start_jobs_spreads_jobs_over_window(clock, user, user2, settings) -> None:
+    settings.START_JOBS_SPREAD_MINUTES = 50
+    now = NOON
+
+    for profile in (user.user_profile, user2.user_profile):
+        profile.day_of_week = UserProfile.EVERY_DAY
+        profile.hour_of_day = now.hour
+        profile.save()
+
+    clock.return_value = NOON
+    start_jobs()
+
+    assert queued_user_ids() == []
+    schedules = {
+        ast.literal_eval(schedule.args)[0]: schedule
+        for schedule in Schedule.objects.all()
+    }
+    assert set(schedules) == {user.id, user2.id}
+    for profile in (user.user_profile, user2.user_profile):
+        schedule = schedules[profile.user_id]
+        assert schedule.func == "starminder.implementations.jobs.user_job"
+        assert schedule.schedule_type == Schedule.ONCE
+        offset = get_start_offset(profile.feed_id, timedelta(minutes=50))
+        assert timedelta(0) <= offset < timedelta(minutes=50)
+        assert schedule.next_run == NOON + offset
+
+
+def test_get_start_offset_wraps_feed_id_into_window() -> None:
+    assert get_start_offset(UUID(int=3601), timedelta(minutes=50)) == timedelta(
+        seconds=601
     )
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.datetime")
-def test_start_jobs_calls_correct_function_name(
-    mock_datetime, mock_async_task, user
-) -> None:
-    now = datetime(2025, 10, 11, 12, 0)
-    mock_datetime.now.return_value = now
+def test_start_jobs_calls_correct_function_name(clock, user) -> None:
+    now = NOON
 
     user.user_profile.day_of_week = now.weekday()
     user.user_profile.hour_of_day = now.hour
     user.user_profile.save()
 
+    clock.return_value = NOON
     start_jobs()
 
-    mock_async_task.assert_called_once_with(
-        "starminder.implementations.jobs.user_job",
-        user.id,
-    )
+    assert queued_user_ids() == [user.id]
+
+
+@pytest.mark.django_db
+def test_start_jobs_moves_next_run_on(clock, user) -> None:
+    user.user_profile.day_of_week = UserProfile.EVERY_DAY
+    user.user_profile.hour_of_day = 12
+    user.user_profile.save()
+
+    clock.return_value = NOON
+    start_jobs()
+    start_jobs()
+
+    user.user_profile.refresh_from_db()
+    assert user.user_profile.next_run_at == NOON + timedelta(days=1)
+    assert queued_user_ids() == [user.id]
+
+
+@pytest.mark.django_db
+def test_start_jobs_rolls_back_queued_jobs_on_failure(clock, user) -> None:
+    user.user_profile.day_of_week = UserProfile.EVERY_DAY
+    user.user_profile.hour_of_day = 12
+    user.user_profile.save()
+    next_run_at = user.user_profile.next_run_at
+
+    clock.return_value = NOON
+    with (
+        patch.object(
+            UserProfile.objects, "bulk_update", side_effect=DatabaseError("boom")
+        ),
+        pytest.raises(DatabaseError),
+    ):
+        start_jobs()
+
+    assert queued_user_ids() == []
+    user.user_profile.refresh_from_db()
+    assert user.user_profile.next_run_at == next_run_at
+
+    start_jobs()
+
+    assert queued_user_ids() == [user.id]
+
+
+@pytest.mark.django_db
+def test_start_jobs_uses_profile_time_zone(clock, user) -> None:
+    user.user_profile.day_of_week = UserProfile.EVERY_DAY
+    user.user_profile.hour_of_day = 8
+    user.user_profile.time_zone = "America/New_York"
+    user.user_profile.save()
+
+    # 08:00 EDT
+    clock.return_value = NOON
+    start_jobs()
+
+    assert queued_user_ids() == [user.id]
 
 
 # user_job tests
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_user_job_queues_pager_with_user_and_tokens(
-    mock_async_task, user, social_token
+@patch("starminder.implementations.jobs.run_pipeline")
+def test_user_job_starts_pipeline_with_tokens(
+    mock_run_pipeline, user, social_token
 ) -> None:
     user_job(user.id)
 
-    mock_async_task.assert_called_once()
-    call_args = mock_async_task.call_args
-    assert call_args[0][0] == "starminder.implementations.jobs.pager"
-    assert call_args[0][1] == user
-    assert len(call_args[0][2]) == 1
-    assert call_args[0][2][0] == social_token
+    run = PipelineRun.objects.get(user=user)
+    assert run.stage == PipelineRun.SYNC
+    assert run.token_ids == [social_token.id]
+    assert run.user_uid == "test_uid"
+    assert run.positions is None
+    mock_run_pipeline.assert_called_once_with(run.id)
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_user_job_does_not_queue_when_no_tokens(mock_async_task, user) -> None:
+@patch("starminder.implementations.jobs.run_pipeline")
+def test_user_job_does_not_start_pipeline_when_no_tokens(
+    mock_run_pipeline, user
+) -> None:
     user_job(user.id)
 
-    mock_async_task.assert_not_called()
+    assert not PipelineRun.objects.exists()
+    mock_run_pipeline.assert_not_called()
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_user_job_handles_multiple_tokens(mock_async_task, user, social_token) -> None:
+@patch("starminder.implementations.jobs.run_pipeline")
+def test_user_job_handles_multiple_tokens(
+    mock_run_pipeline, user, social_token
+) -> None:
     # Create second social account and token
     social_account2 = SocialAccount.objects.create(
         user=user,
@@ -211,456 +383,787 @@ def test_user_job_handles_multiple_tokens(mock_async_task, user, social_token) -
 
     user_job(user.id)
 
-    mock_async_task.assert_called_once()
-    tokens = mock_async_task.call_args[0][2]
-    assert len(tokens) == 2
-    assert social_token in tokens
-    assert social_token2 in tokens
+    run = PipelineRun.objects.get(user=user)
+    assert sorted(run.token_ids) == sorted([social_token.id, social_token2.id])
+    # the last token's account, as in the previous chain
+    assert run.user_uid == (
+        "test_uid_2" if run.token_ids[-1] == social_token2.id else "test_uid"
+    )
 
 
-# pager tests
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.run_pipeline")
+def test_user_job_requests_full_sync_when_never_synced(
+    mock_run_pipeline, user, social_token
+) -> None:
+    user_job(user.id)
+
+    assert PipelineRun.objects.get(user=user).full_sync_started_at is not None
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.httpx.Client")
-def test_pager_creates_temp_stars_from_api_response(
-    mock_client_class, mock_async_task, user, social_token
+@patch("starminder.implementations.jobs.run_pipeline")
+def test_user_job_requests_incremental_sync_when_recently_synced(
+    mock_run_pipeline, user, social_token
 ) -> None:
-    mock_response = Mock()
-    mock_response.json.return_value = [
-        {
-            "id": 123,
-            "name": "repo1",
-            "owner": {"login": "owner1", "id": 456},
-            "description": "Test repo",
-            "stargazers_count": 100,
-            "html_url": "https://github.com/owner1/repo1",
-            "homepage": "https://example.com",
-        }
-    ]
-    mock_client = MagicMock()
-    mock_client.get.return_value = mock_response
-    mock_client.__enter__.return_value = mock_client
-    mock_client.__exit__.return_value = None
-    mock_client_class.return_value = mock_client
+    UserProfile.objects.filter(user=user).update(full_sync_at=timezone.now())
 
-    pager(user, [social_token])
+    user_job(user.id)
 
-    assert TempStar.objects.filter(user=user).count() == 1
-    temp_star = TempStar.objects.get(user=user)
-    assert temp_star.provider == "github"
-    assert temp_star.provider_id == "123"
-    assert temp_star.name == "repo1"
-    assert temp_star.owner == "owner1"
-    assert temp_star.owner_id == "456"
-    assert temp_star.description == "Test repo"
-    assert temp_star.star_count == 100
-    assert temp_star.repo_url == "https://github.com/owner1/repo1"
-    assert temp_star.project_url == "https://example.com"
+    assert PipelineRun.objects.get(user=user).full_sync_started_at is None
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.httpx.Client")
-def test_pager_schedules_next_page_when_100_items(
-    mock_client_class, mock_async_task, user, social_token
+@patch("starminder.implementations.jobs.run_pipeline")
+def test_user_job_requests_full_sync_when_interval_elapsed(
+    mock_run_pipeline, user, social_token
 ) -> None:
-    mock_response = Mock()
-    mock_response.json.return_value = [
-        {
-            "id": i,
-            "name": f"repo{i}",
-            "owner": {"login": "owner", "id": 1},
-            "stargazers_count": 10,
-            "html_url": "https://github.com/owner/repo",
-        }
-        for i in range(100)
-    ]
-    mock_client = MagicMock()
-    mock_client.get.return_value = mock_response
-    mock_client.__enter__.return_value = mock_client
-    mock_client.__exit__.return_value = None
-    mock_client_class.return_value = mock_client
+    UserProfile.objects.filter(user=user).update(
+        full_sync_at=timezone.now() - timedelta(days=8)
+    )
 
-    pager(user, [social_token], page=1)
+    user_job(user.id)
 
-    mock_async_task.assert_called_once()
-    call_args = mock_async_task.call_args
-    assert call_args[0][0] == "starminder.implementations.jobs.pager"
-    assert call_args[0][1] == user
-    assert call_args[0][2] == [social_token]
-    assert call_args[0][3] == 2
+    assert PipelineRun.objects.get(user=user).full_sync_started_at is not None
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.httpx.Client")
-def test_pager_schedules_next_token_when_partial_page(
-    mock_client_class, mock_async_task, user
-) -> None:
-    token1 = SocialToken.objects.create(
-        account=SocialAccount.objects.create(user=user, provider="github", uid="uid1"),
-        token="token1",
-    )
-    token2 = SocialToken.objects.create(
-        account=SocialAccount.objects.create(user=user, provider="github", uid="uid2"),
-        token="token2",
+@patch("starminder.implementations.jobs.run_pipeline")
+def test_user_job_resumes_recent_run(mock_run_pipeline, user, social_token) -> None:
+    run = PipelineRun.objects.create(
+        user=user,
+        stage=PipelineRun.GENERATE_DATA,
+        user_uid="test_uid",
+        token_ids=[social_token.id],
     )
 
-    mock_response = Mock()
-    mock_response.json.return_value = [
-        {
-            "id": 1,
-            "name": "repo1",
-            "owner": {"login": "owner", "id": 1},
-            "stargazers_count": 10,
-            "html_url": "https://github.com/owner/repo",
-        }
-    ]
-    mock_client = MagicMock()
-    mock_client.get.return_value = mock_response
-    mock_client.__enter__.return_value = mock_client
-    mock_client.__exit__.return_value = None
-    mock_client_class.return_value = mock_client
-
-    pager(user, [token1, token2], page=1)
+    user_job(user.id)
 
-    mock_async_task.assert_called_once()
-    call_args = mock_async_task.call_args
-    assert call_args[0][0] == "starminder.implementations.jobs.pager"
-    assert call_args[0][1] == user
-    assert call_args[0][2] == [token2]
-    assert call_args[0][3] == 1
+    assert list(PipelineRun.objects.all()) == [run]
+    mock_run_pipeline.assert_called_once_with(run.id)
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.httpx.Client")
-def test_pager_schedules_generate_data_when_last_token(
-    mock_client_class, mock_async_task, user, social_token
-) -> None:
-    mock_response = Mock()
-    mock_response.json.return_value = [
-        {
-            "id": 1,
-            "name": "repo1",
-            "owner": {"login": "owner", "id": 1},
-            "stargazers_count": 10,
-            "html_url": "https://github.com/owner/repo",
-        }
-    ]
-    mock_client = MagicMock()
-    mock_client.get.return_value = mock_response
-    mock_client.__enter__.return_value = mock_client
-    mock_client.__exit__.return_value = None
-    mock_client_class.return_value = mock_client
+@patch("starminder.implementations.jobs.run_pipeline")
+def test_user_job_supersedes_stale_run(mock_run_pipeline, user, social_token) -> None:
+    stale_run = PipelineRun.objects.create(
+        user=user,
+        stage=PipelineRun.SYNC,
+        user_uid="test_uid",
+        token_ids=[social_token.id],
+        positions={str(social_token.id): 7},
+    )
+    PipelineRun.objects.update(created_at=timezone.now() - timedelta(days=1))
 
-    pager(user, [social_token], page=1)
+    user_job(user.id)
 
-    mock_async_task.assert_called_once()
-    call_args = mock_async_task.call_args
-    assert call_args[0][0] == "starminder.implementations.jobs.generate_data"
-    assert call_args[0][1] == user.id
-    assert call_args[0][2] == "test_uid"
+    run = PipelineRun.objects.get(user=user)
+    assert run.id != stale_run.id
+    assert run.positions is None
+    mock_run_pipeline.assert_called_once_with(run.id)
 
 
-@pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.httpx.Client")
-def test_pager_calls_github_api_with_correct_headers(
-    mock_client_class, mock_async_task, user, social_token
-) -> None:
-    mock_response = Mock()
-    mock_response.json.return_value = []
-    mock_client = MagicMock()
-    mock_client.get.return_value = mock_response
-    mock_client.__enter__.return_value = mock_client
-    mock_client.__exit__.return_value = None
-    mock_client_class.return_value = mock_client
+# run_pipeline tests
 
-    pager(user, [social_token], page=1)
 
-    mock_client.get.assert_called_once()
-    call_args = mock_client.get.call_args
-    assert call_args[0][0] == "https://api.github.com/user/starred"
-    assert call_args[1]["headers"]["Accept"] == "application/vnd.github+json"
-    assert call_args[1]["headers"]["Authorization"] == f"Bearer {social_token.token}"
-    assert call_args[1]["params"]["per_page"] == 100
-    assert call_args[1]["params"]["page"] == 1
+@pytest.fixture
+def pipeline_run(user, social_token):
+    return PipelineRun.objects.create(
+        user=user,
+        user_uid="test_uid",
+        token_ids=[social_token.id],
+    )
 
 
 @pytest.mark.django_db
 @patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.httpx.Client")
-def test_pager_handles_null_description_and_project_url(
-    mock_client_class, mock_async_task, user, social_token
+@patch("starminder.core.github.get_client")
+def test_user_job_runs_whole_pipeline_in_one_task(
+    mock_get_client, mock_async_task, user, social_token
 ) -> None:
-    mock_response = Mock()
-    mock_response.json.return_value = [
-        {
-            "id": 123,
-            "name": "repo1",
-            "owner": {"login": "owner1", "id": 456},
-            "description": None,
-            "stargazers_count": 100,
-            "html_url": "https://github.com/owner1/repo1",
-            "homepage": None,
-        }
-    ]
-    mock_client = MagicMock()
-    mock_client.get.return_value = mock_response
-    mock_client.__enter__.return_value = mock_client
-    mock_client.__exit__.return_value = None
-    mock_client_class.return_value = mock_client
+    UserProfile.objects.filter(user=user).update(reminder_email="test@example.com")
+
+    def handler(request):
+        page = int(request.url.params["page"])
+        return github_response(
+            [
+                {
+                    "id": page * 100 + i,
+                    "name": f"repo{page}-{i}",
+                    "owner": {"login": "owner", "id": 1},
+                    "stargazers_count": 10,
+                    "html_url": f"https://github.com/owner/repo{page}-{i}",
+                }
+                for i in range(100 if page == 1 else 5)
+            ]
+        )
 
-    pager(user, [social_token])
+    mock_github(mock_get_client, handler)
+    UserProfile.objects.filter(user=user).update(full_sync_at=timezone.now())
 
-    temp_star = TempStar.objects.get(user=user)
-    assert temp_star.description is None
-    assert temp_star.project_url is None
+    user_job(user.id)
+
+    assert TempStar.objects.filter(user=user).count() == 105
+    assert Reminder.objects.filter(user=user).count() == 1
+    assert not PipelineRun.objects.exists()
+    # only the email, queued with the reminder, leaves the task
+    mock_async_task.assert_called_once()
+    assert mock_async_task.call_args[0][0] == "starminder.content.email.send_email"
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.httpx.Client")
-def test_pager_skips_repos_with_deleted_owner(
-    mock_client_class, mock_async_task, user, social_token
+@patch("starminder.implementations.jobs.generate_data")
+@patch("starminder.implementations.jobs.warm_link_checks")
+@patch("starminder.implementations.jobs.pager")
+def test_run_pipeline_checkpoints_each_stage(
+    mock_pager, mock_warm_link_checks, mock_generate_data, pipeline_run, social_token
 ) -> None:
-    mock_response = Mock()
-    mock_response.json.return_value = [
-        {
-            "id": 123,
-            "name": "repo1",
-            "owner": {"login": "owner1", "id": 456},
-            "stargazers_count": 100,
-            "html_url": "https://github.com/owner1/repo1",
-        },
-        {
-            "id": 124,
-            "name": "deleted-repo",
-            "owner": None,
-            "stargazers_count": 50,
-            "html_url": "https://github.com/deleted-user/deleted-repo",
-        },
-        {
-            "id": 125,
-            "name": "repo2",
-            "owner": {"login": "owner2", "id": 789},
-            "stargazers_count": 200,
-            "html_url": "https://github.com/owner2/repo2",
-        },
-    ]
-    mock_client = MagicMock()
-    mock_client.get.return_value = mock_response
-    mock_client.__enter__.return_value = mock_client
-    mock_client.__exit__.return_value = None
-    mock_client_class.return_value = mock_client
+    stages = []
 
-    pager(user, [social_token])
+    def record_stage(*args):
+        stages.append(PipelineRun.objects.get(id=pipeline_run.id).stage)
 
-    assert TempStar.objects.filter(user=user).count() == 2
-    temp_stars = TempStar.objects.filter(user=user).order_by("provider_id")
-    assert temp_stars[0].name == "repo1"
-    assert temp_stars[1].name == "repo2"
+    mock_pager.side_effect = [
+        SyncProgress({social_token.id: 2}, None),
+        SyncProgress({}, None),
+    ]
+    mock_warm_link_checks.side_effect = record_stage
+    mock_generate_data.side_effect = record_stage
 
+    run_pipeline(pipeline_run.id)
 
-# generate_data tests
+    assert mock_pager.call_args_list[0][0][3] is None
+    assert mock_pager.call_args_list[1][0][3] == {social_token.id: 2}
+    assert stages == [PipelineRun.WARM_LINK_CHECKS, PipelineRun.GENERATE_DATA]
+    mock_generate_data.assert_called_once_with(pipeline_run.user_id, "test_uid")
+    assert not PipelineRun.objects.exists()
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_generate_data_creates_reminder(mock_async_task, user, temp_star) -> None:
-    generate_data(user.id, "irrelevant")
+@patch("starminder.implementations.jobs.generate_data")
+@patch("starminder.implementations.jobs.warm_link_checks")
+@patch("starminder.implementations.jobs.pager")
+def test_run_pipeline_resumes_sync_from_stored_positions(
+    mock_pager, mock_warm_link_checks, mock_generate_data, pipeline_run, social_token
+) -> None:
+    PipelineRun.objects.filter(id=pipeline_run.id).update(
+        positions={str(social_token.id): 3}
+    )
+    mock_pager.return_value = SyncProgress({}, None)
 
-    assert Reminder.objects.filter(user=user).count() == 1
+    run_pipeline(pipeline_run.id)
+
+    mock_pager.assert_called_once_with(
+        pipeline_run.user_id, [social_token.id], None, {social_token.id: 3}
+    )
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_generate_data_creates_stars_from_temp_stars(
-    mock_async_task, user, temp_star
+@patch("starminder.implementations.jobs.generate_data")
+@patch("starminder.implementations.jobs.warm_link_checks")
+@patch("starminder.implementations.jobs.pager")
+def test_run_pipeline_resumes_from_stage(
+    mock_pager, mock_warm_link_checks, mock_generate_data, pipeline_run
 ) -> None:
-    generate_data(user.id, "irrelevant")
+    PipelineRun.objects.update(stage=PipelineRun.GENERATE_DATA)
 
-    reminder = Reminder.objects.get(user=user)
-    assert Star.objects.filter(reminder=reminder).count() == 1
+    run_pipeline(pipeline_run.id)
 
-    star = Star.objects.get(reminder=reminder)
-    assert star.provider == temp_star.provider
-    assert star.provider_id == temp_star.provider_id
-    assert star.name == temp_star.name
-    assert star.owner == temp_star.owner
-    assert star.owner_id == temp_star.owner_id
-    assert star.description == temp_star.description
-    assert star.star_count == temp_star.star_count
-    assert star.repo_url == temp_star.repo_url
-    assert star.project_url == temp_star.project_url
+    mock_pager.assert_not_called()
+    mock_warm_link_checks.assert_not_called()
+    mock_generate_data.assert_called_once()
+    assert not PipelineRun.objects.exists()
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_generate_data_respects_max_entries_limit(mock_async_task, user) -> None:
-    # Create 10 temp stars
-    for i in range(10):
-        TempStar.objects.create(
-            user=user,
-            provider="github",
-            provider_id=str(i),
-            name=f"repo{i}",
-            owner="owner",
-            owner_id="123",
-            star_count=10,
-            repo_url=f"https://github.com/owner/repo{i}",
-        )
+@patch("starminder.implementations.jobs.schedule")
+@patch("starminder.implementations.jobs.warm_link_checks")
+@patch("starminder.implementations.jobs.pager")
+def test_run_pipeline_defers_when_rate_limited(
+    mock_pager, mock_warm_link_checks, mock_schedule, pipeline_run, social_token
+) -> None:
+    retry_at = timezone.now() + timedelta(minutes=10)
+    mock_pager.return_value = SyncProgress({social_token.id: None}, retry_at)
 
-    user.user_profile.max_entries = 3
-    user.user_profile.save()
+    run_pipeline(pipeline_run.id)
 
-    generate_data(user.id, "irrelevant")
+    mock_warm_link_checks.assert_not_called()
+    mock_schedule.assert_called_once()
+    assert mock_schedule.call_args[0] == (
+        "starminder.implementations.jobs.run_pipeline",
+        pipeline_run.id,
+    )
+    assert mock_schedule.call_args[1]["next_run"] >= retry_at
 
-    reminder = Reminder.objects.get(user=user)
-    assert Star.objects.filter(reminder=reminder).count() == 3
+    pipeline_run.refresh_from_db()
+    assert pipeline_run.stage == PipelineRun.SYNC
+    assert pipeline_run.positions == {str(social_token.id): None}
 
 
 @pytest.mark.django_db
+@patch("starminder.implementations.jobs.PIPELINE_TIME_BUDGET", timedelta(0))
 @patch("starminder.implementations.jobs.async_task")
-def test_generate_data_does_not_create_reminder_when_no_temp_stars(
-    mock_async_task, user
+@patch("starminder.implementations.jobs.warm_link_checks")
+@patch("starminder.implementations.jobs.pager")
+def test_run_pipeline_hands_off_when_budget_spent(
+    mock_pager, mock_warm_link_checks, mock_async_task, pipeline_run
 ) -> None:
-    generate_data(user.id, "irrelevant")
+    mock_pager.return_value = SyncProgress({}, None)
 
-    assert Reminder.objects.filter(user=user).count() == 0
+    run_pipeline(pipeline_run.id)
+
+    mock_pager.assert_called_once()
+    mock_warm_link_checks.assert_not_called()
+    mock_async_task.assert_called_once_with(
+        "starminder.implementations.jobs.run_pipeline", pipeline_run.id
+    )
+    pipeline_run.refresh_from_db()
+    assert pipeline_run.stage == PipelineRun.WARM_LINK_CHECKS
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.render_to_string")
-def test_generate_data_queues_email_when_email_configured(
-    mock_render, mock_async_task, user, temp_star
+@patch("starminder.implementations.jobs.warm_link_checks")
+@patch("starminder.implementations.jobs.pager")
+def test_run_pipeline_stops_when_tokens_unlinked(
+    mock_pager, mock_warm_link_checks, pipeline_run
 ) -> None:
-    mock_render.return_value = "rendered content"
+    mock_pager.return_value = None
 
-    user.user_profile.reminder_email = "user@example.com"
-    user.user_profile.save()
+    run_pipeline(pipeline_run.id)
 
-    generate_data(user.id, "irrelevant")
+    mock_warm_link_checks.assert_not_called()
+    assert not PipelineRun.objects.exists()
 
-    # Should have 2 calls: one for email send, one for cleanup
-    assert mock_async_task.call_count == 2
 
-    # Check email send call
-    email_call = mock_async_task.call_args_list[0]
-    assert email_call[0][0] == "starminder.content.email.send_email"
-    assert email_call[1]["recipient"] == "user@example.com"
-    assert "☆ Starminder ☆" in email_call[1]["subject"]
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.pager")
+def test_run_pipeline_exits_when_run_superseded(mock_pager, pipeline_run) -> None:
+    run_id = pipeline_run.id
+    pipeline_run.delete()
 
+    run_pipeline(run_id)
 
-@pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_generate_data_does_not_queue_email_when_no_email(
-    mock_async_task, user, temp_star
-) -> None:
-    user.user_profile.reminder_email = None
-    user.user_profile.save()
+    mock_pager.assert_not_called()
 
-    generate_data(user.id, "irrelevant")
 
-    # Should only have 1 call for cleanup
-    assert mock_async_task.call_count == 1
-    assert (
-        mock_async_task.call_args[0][0]
-        == "starminder.implementations.jobs.cleanup_temp_stars"
-    )
+# pager tests
 
 
 @pytest.mark.django_db
 @patch("starminder.implementations.jobs.async_task")
-def test_generate_data_queues_cleanup(mock_async_task, user, temp_star) -> None:
-    generate_data(user.id, "irrelevant")
+@patch("starminder.core.github.get_client")
+def test_pager_creates_temp_stars_from_api_response(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    mock_response = github_response(
+        [
+            {
+                "id": 123,
+                "name": "repo1",
+                "owner": {"login": "owner1", "id": 456},
+                "description": "Test repo",
+                "stargazers_count": 100,
+                "html_url": "https://github.com/owner1/repo1",
+                "homepage": "https://example.com",
+            }
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
 
-    # Get the last call (cleanup should be last)
-    cleanup_call = mock_async_task.call_args_list[-1]
-    assert cleanup_call[0][0] == "starminder.implementations.jobs.cleanup_temp_stars"
-    assert cleanup_call[0][1] == user.id
+    pager(user.id, [social_token.id])
+
+    assert TempStar.objects.filter(user=user).count() == 1
+    temp_star = TempStar.objects.get(user=user)
+    assert temp_star.repository.provider == "github"
+    assert temp_star.repository.provider_id == "123"
+    assert temp_star.repository.name == "repo1"
+    assert temp_star.repository.owner == "owner1"
+    assert temp_star.repository.owner_id == "456"
+    assert temp_star.repository.description == "Test repo"
+    assert temp_star.repository.star_count == 100
+    assert temp_star.repository.repo_url == "https://github.com/owner1/repo1"
+    assert temp_star.repository.project_url == "https://example.com"
 
 
 @pytest.mark.django_db
 @patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.random.sample")
-def test_generate_data_samples_randomly(mock_sample, mock_async_task, user) -> None:
-    temp_stars = []
-    for i in range(10):
-        temp_stars.append(
-            TempStar.objects.create(
-                user=user,
-                provider="github",
-                provider_id=str(i),
-                name=f"repo{i}",
-                owner="owner",
-                owner_id="123",
-                star_count=10,
-                repo_url=f"https://github.com/owner/repo{i}",
-            )
+@patch("starminder.core.github.get_client")
+def test_pager_schedules_next_page_when_100_items(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    mock_response = github_response(
+        [
+            {
+                "id": i,
+                "name": f"repo{i}",
+                "owner": {"login": "owner", "id": 1},
+                "stargazers_count": 10,
+                "html_url": "https://github.com/owner/repo",
+            }
+            for i in range(100)
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
+
+    progress = pager(user.id, [social_token.id])
+
+    assert progress == SyncProgress({social_token.id: 2}, None)
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_fetches_all_tokens_in_one_task(
+    mock_get_client, mock_async_task, user
+) -> None:
+    token1 = SocialToken.objects.create(
+        account=SocialAccount.objects.create(user=user, provider="github", uid="uid1"),
+        token="token1",
+    )
+    token2 = SocialToken.objects.create(
+        account=SocialAccount.objects.create(user=user, provider="github", uid="uid2"),
+        token="token2",
+    )
+
+    def handler(request):
+        repo_id = 1 if request.headers["Authorization"] == "Bearer token1" else 2
+        return github_response(
+            [
+                {
+                    "id": repo_id,
+                    "name": f"repo{repo_id}",
+                    "owner": {"login": "owner", "id": 1},
+                    "stargazers_count": 10,
+                    "html_url": f"https://github.com/owner/repo{repo_id}",
+                }
+            ]
         )
 
-    user.user_profile.max_entries = 5
-    user.user_profile.save()
+    requests = mock_github(mock_get_client, handler)
 
-    mock_sample.return_value = temp_stars[:5]
+    progress = pager(user.id, [token1.id, token2.id])
 
-    generate_data(user.id, "irrelevant")
+    assert sorted(request.headers["Authorization"] for request in requests) == [
+        "Bearer token1",
+        "Bearer token2",
+    ]
+    assert set(
+        TempStar.objects.filter(user=user).values_list(
+            "repository__provider_id", flat=True
+        )
+    ) == {"1", "2"}
+    assert progress == SyncProgress({}, None)
 
-    mock_sample.assert_called_once()
-    assert len(mock_sample.call_args[0][0]) == 10
-    assert mock_sample.call_args[0][1] == 5
 
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_dedupes_repos_starred_from_several_accounts(
+    mock_get_client, mock_async_task, user
+) -> None:
+    tokens = [
+        SocialToken.objects.create(
+            account=SocialAccount.objects.create(
+                user=user, provider="github", uid=f"uid{i}"
+            ),
+            token=f"token{i}",
+        )
+        for i in range(2)
+    ]
+    mock_response = github_response(
+        [
+            {
+                "id": i,
+                "name": f"repo{i}",
+                "owner": {"login": "owner", "id": 1},
+                "stargazers_count": 10,
+                "html_url": f"https://github.com/owner/repo{i}",
+            }
+            for i in range(100)
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
+
+    progress = pager(user.id, [token.id for token in tokens])
 
-# cleanup_temp_stars tests
+    assert TempStar.objects.filter(user=user).count() == 100
+    # neither account's new stars count as known because of the other's
+    assert progress.positions == {token.id: 2 for token in tokens}
 
 
 @pytest.mark.django_db
-def test_cleanup_temp_stars_deletes_user_temp_stars(user, temp_star) -> None:
-    assert TempStar.objects.filter(user=user).count() == 1
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_finishes_when_last_token_done(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    mock_response = github_response(
+        [
+            {
+                "id": 1,
+                "name": "repo1",
+                "owner": {"login": "owner", "id": 1},
+                "stargazers_count": 10,
+                "html_url": "https://github.com/owner/repo",
+            }
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
 
-    cleanup_temp_stars(user.id)
+    progress = pager(user.id, [social_token.id])
 
-    assert TempStar.objects.filter(user=user).count() == 0
+    assert progress == SyncProgress({}, None)
+    mock_async_task.assert_not_called()
 
 
 @pytest.mark.django_db
-def test_cleanup_temp_stars_only_deletes_specific_user(user, user2) -> None:
-    TempStar.objects.create(
-        user=user,
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_calls_github_api_with_correct_headers(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    mock_response = github_response([])
+    requests = mock_github(mock_get_client, lambda request: mock_response)
+
+    pager(user.id, [social_token.id])
+
+    assert len(requests) == 1
+    request = requests[0]
+    assert request.url.host == "api.github.com"
+    assert request.url.path == "/user/starred"
+    assert request.headers["Accept"] == "application/vnd.github+json"
+    assert request.headers["Authorization"] == f"Bearer {social_token.token}"
+    assert request.url.params["per_page"] == "100"
+    assert request.url.params["page"] == "1"
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_handles_null_description_and_project_url(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    mock_response = github_response(
+        [
+            {
+                "id": 123,
+                "name": "repo1",
+                "owner": {"login": "owner1", "id": 456},
+                "description": None,
+                "stargazers_count": 100,
+                "html_url": "https://github.com/owner1/repo1",
+                "homepage": None,
+            }
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
+
+    pager(user.id, [social_token.id])
+
+    temp_star = TempStar.objects.get(user=user)
+    assert temp_star.repository.description is None
+    assert temp_star.repository.project_url is None
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_skips_repos_with_deleted_owner(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    mock_response = github_response(
+        [
+            {
+                "id": 123,
+                "name": "repo1",
+                "owner": {"login": "owner1", "id": 456},
+                "stargazers_count": 100,
+                "html_url": "https://github.com/owner1/repo1",
+            },
+            {
+                "id": 124,
+                "name": "deleted-repo",
+                "owner": None,
+                "stargazers_count": 50,
+                "html_url": "https://github.com/deleted-user/deleted-repo",
+            },
+            {
+                "id": 125,
+                "name": "repo2",
+                "owner": {"login": "owner2", "id": 789},
+                "stargazers_count": 200,
+                "html_url": "https://github.com/owner2/repo2",
+            },
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
+
+    pager(user.id, [social_token.id])
+
+    assert TempStar.objects.filter(user=user).count() == 2
+    temp_stars = TempStar.objects.filter(user=user).order_by("repository__provider_id")
+    assert temp_stars[0].repository.name == "repo1"
+    assert temp_stars[1].repository.name == "repo2"
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_fetches_remaining_pages_from_link_header(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    def handler(request):
+        url = request.url.copy_with(query=None)
+        page = int(request.url.params["page"])
+        response = github_response(
+            [
+                {
+                    "id": page * 1000 + i,
+                    "name": f"repo{page}-{i}",
+                    "owner": {"login": "owner", "id": 1},
+                    "stargazers_count": 10,
+                    "html_url": "https://github.com/owner/repo",
+                }
+                for i in range(100 if page < 3 else 7)
+            ],
+            headers={
+                "Link": (
+                    f'<{url}?per_page=100&page={page + 1}>; rel="next", '
+                    f'<{url}?per_page=100&page=3>; rel="last"'
+                )
+            },
+        )
+        return response
+
+    requests = mock_github(mock_get_client, handler)
+
+    progress = pager(user.id, [social_token.id], timezone.now())
+
+    fetched_pages = sorted(int(request.url.params["page"]) for request in requests)
+    assert fetched_pages == [1, 2, 3]
+    assert TempStar.objects.filter(user=user).count() == 207
+
+    assert progress == SyncProgress({}, None)
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_incremental_sync_stops_at_known_stars(
+    mock_get_client, mock_async_task, user, social_token, temp_star
+) -> None:
+    Repository.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+    mock_response = github_response(
+        [
+            {
+                "id": i,
+                "name": f"repo{i}",
+                "owner": {"login": "owner", "id": 1},
+                "stargazers_count": 10,
+                "html_url": "https://github.com/owner/repo",
+            }
+            for i in range(99)
+        ]
+        + [
+            {
+                "id": int(temp_star.repository.provider_id),
+                "name": temp_star.repository.name,
+                "owner": {
+                    "login": temp_star.repository.owner,
+                    "id": int(temp_star.repository.owner_id),
+                },
+                "stargazers_count": 500,
+                "html_url": temp_star.repository.repo_url,
+            }
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
+
+    progress = pager(user.id, [social_token.id])
+
+    assert TempStar.objects.filter(user=user).count() == 100
+    temp_star.refresh_from_db()
+    assert temp_star.repository.star_count == 500
+
+    assert progress == SyncProgress({}, None)
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_full_sync_prunes_unstarred_repos(
+    mock_get_client, mock_async_task, user, user2, social_token, temp_star
+) -> None:
+    create_temp_star(
+        user=user2,
         provider="github",
         provider_id="1",
-        name="repo1",
+        name="repo",
         owner="owner",
         owner_id="123",
         star_count=10,
-        repo_url="https://github.com/owner/repo1",
+        repo_url="https://github.com/owner/repo",
     )
-    TempStar.objects.create(
-        user=user2,
-        provider="github",
+    TempStar.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+    mock_response = github_response(
+        [
+            {
+                "id": 999,
+                "name": "still-starred",
+                "owner": {"login": "owner", "id": 1},
+                "stargazers_count": 10,
+                "html_url": "https://github.com/owner/still-starred",
+            }
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
+
+    full_sync_started_at = timezone.now()
+    pager(user.id, [social_token.id], full_sync_started_at)
+
+    assert list(
+        TempStar.objects.filter(user=user).values_list("repository__name", flat=True)
+    ) == ["still-starred"]
+    assert TempStar.objects.filter(user=user2).count() == 1
+
+    user.user_profile.refresh_from_db()
+    assert user.user_profile.full_sync_at == full_sync_started_at
+
+
+@pytest.mark.django_db
+def test_prune_catalog_deletes_repos_nobody_stars(user, user2) -> None:
+    shared = create_temp_star(
+        user,
+        provider_id="1",
+        name="shared",
+        owner="owner",
+        owner_id="1",
+        star_count=10,
+        repo_url="https://github.com/owner/shared",
+    )
+    TempStar.objects.create(user=user2, repository=shared.repository)
+    create_temp_star(
+        user,
         provider_id="2",
-        name="repo2",
+        name="orphan",
         owner="owner",
-        owner_id="123",
+        owner_id="1",
         star_count=10,
-        repo_url="https://github.com/owner/repo2",
+        repo_url="https://github.com/owner/orphan",
     )
+    TempStar.objects.update(updated_at=timezone.now() - timedelta(days=1))
+    Repository.objects.update(updated_at=timezone.now() - timedelta(days=1))
 
-    cleanup_temp_stars(user.id)
+    prune_catalog(user, timezone.now())
 
-    assert TempStar.objects.filter(user=user).count() == 0
-    assert TempStar.objects.filter(user=user2).count() == 1
+    assert not TempStar.objects.filter(user=user).exists()
+    assert list(Repository.objects.values_list("name", flat=True)) == ["shared"]
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_full_sync_prunes_only_after_last_token(
+    mock_get_client, mock_async_task, user, temp_star
+) -> None:
+    token1 = SocialToken.objects.create(
+        account=SocialAccount.objects.create(user=user, provider="github", uid="uid1"),
+        token="token1",
+    )
+    token2 = SocialToken.objects.create(
+        account=SocialAccount.objects.create(user=user, provider="github", uid="uid2"),
+        token="token2",
+    )
+    TempStar.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+    def handler(request):
+        if request.headers["Authorization"] == "Bearer token2":
+            return github_response([])
+        return github_response(
+            [
+                {
+                    "id": i,
+                    "name": f"repo{i}",
+                    "owner": {"login": "owner", "id": 1},
+                    "stargazers_count": 10,
+                    "html_url": f"https://github.com/owner/repo{i}",
+                }
+                for i in range(100)
+            ]
+        )
+
+    mock_github(mock_get_client, handler)
+
+    progress = pager(user.id, [token1.id, token2.id], timezone.now())
+
+    assert TempStar.objects.filter(id=temp_star.id).exists()
+    assert progress == SyncProgress({token1.id: 2}, None)
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_stores_page_etag(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    mock_response = github_response(
+        [
+            {
+                "id": 123,
+                "name": "repo1",
+                "owner": {"login": "owner1", "id": 456},
+                "stargazers_count": 100,
+                "html_url": "https://github.com/owner1/repo1",
+            }
+        ],
+        headers={"ETag": 'W/"abc"'},
+    )
+    requests = mock_github(mock_get_client, lambda request: mock_response)
+
+    pager(user.id, [social_token.id])
+
+    assert "If-None-Match" not in requests[0].headers
+    star_page = StarPage.objects.get(token=social_token)
+    assert star_page.page == 1
+    assert star_page.etag == 'W/"abc"'
+    assert star_page.provider_ids == ["123"]
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_incremental_sync_reuses_unchanged_first_page(
+    mock_get_client, mock_async_task, user, social_token, temp_star
+) -> None:
+    StarPage.objects.create(
+        user=user,
+        token=social_token,
+        page=1,
+        etag='W/"abc"',
+        provider_ids=[temp_star.repository.provider_id],
+    )
+
+    requests = mock_github(
+        mock_get_client, lambda request: github_response([], status_code=304)
+    )
+
+    progress = pager(user.id, [social_token.id])
+
+    assert requests[0].headers["If-None-Match"] == 'W/"abc"'
+    assert TempStar.objects.filter(user=user).count() == 1
+
+    assert progress == SyncProgress({}, None)
 
 
 @pytest.mark.django_db
-def test_cleanup_temp_stars_deletes_multiple_temp_stars(user) -> None:
-    for i in range(5):
-        TempStar.objects.create(
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_full_sync_keeps_stars_from_unchanged_pages(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    for i in range(3):
+        create_temp_star(
             user=user,
             provider="github",
             provider_id=str(i),
@@ -670,93 +1173,769 @@ def test_cleanup_temp_stars_deletes_multiple_temp_stars(user) -> None:
             star_count=10,
             repo_url=f"https://github.com/owner/repo{i}",
         )
+        StarPage.objects.create(
+            user=user,
+            token=social_token,
+            page=i + 1,
+            etag=f'W/"page{i + 1}"',
+            provider_ids=[str(i)],
+        )
+    TempStar.objects.update(updated_at=timezone.now() - timedelta(days=1))
 
-    assert TempStar.objects.filter(user=user).count() == 5
+    def handler(request):
+        # page 3's star was unstarred, everything else is unchanged
+        if request.url.params["page"] == "3":
+            return github_response([], headers={"ETag": 'W/"empty"'})
+        return github_response([], status_code=304)
 
-    cleanup_temp_stars(user.id)
+    mock_github(mock_get_client, handler)
 
-    assert TempStar.objects.filter(user=user).count() == 0
+    pager(user.id, [social_token.id], timezone.now())
+
+    assert set(
+        TempStar.objects.filter(user=user).values_list(
+            "repository__provider_id", flat=True
+        )
+    ) == {"0", "1"}
+    assert StarPage.objects.get(token=social_token, page=3).provider_ids == []
 
 
 @pytest.mark.django_db
-def test_cleanup_temp_stars_handles_no_temp_stars(user) -> None:
-    cleanup_temp_stars(user.id)
+@patch("starminder.core.github.get_client")
+def test_pager_reports_rate_limit(mock_get_client, user, social_token) -> None:
+    mock_github(
+        mock_get_client,
+        lambda request: github_response([], status_code=429),
+    )
+
+    progress = pager(user.id, [social_token.id], timezone.now())
 
     assert TempStar.objects.filter(user=user).count() == 0
+    assert progress.positions == {social_token.id: None}
+    assert progress.retry_at > timezone.now()
 
 
-# archived repository tests
+@pytest.mark.django_db
+@patch("starminder.core.github.get_client")
+def test_pager_saves_other_tokens_when_one_is_rate_limited(
+    mock_get_client, user
+) -> None:
+    token1 = SocialToken.objects.create(
+        account=SocialAccount.objects.create(user=user, provider="github", uid="uid1"),
+        token="token1",
+    )
+    token2 = SocialToken.objects.create(
+        account=SocialAccount.objects.create(user=user, provider="github", uid="uid2"),
+        token="token2",
+    )
+
+    def handler(request):
+        if request.headers["Authorization"] == "Bearer token1":
+            return github_response([], status_code=429)
+        return github_response(
+            [
+                {
+                    "id": 1,
+                    "name": "repo1",
+                    "owner": {"login": "owner", "id": 1},
+                    "stargazers_count": 10,
+                    "html_url": "https://github.com/owner/repo1",
+                }
+            ]
+        )
+
+    mock_github(mock_get_client, handler)
+
+    progress = pager(
+        user.id, [token1.id, token2.id], None, {token1.id: 3, token2.id: None}
+    )
+
+    assert TempStar.objects.filter(user=user).count() == 1
+    assert progress.positions == {token1.id: 3}
+    assert progress.retry_at is not None
+
+
+def graphql_response(
+    nodes: list[dict], end_cursor: str | None = None
+) -> httpx.Response:
+    return httpx.Response(
+        200,
+        json={
+            "data": {
+                "viewer": {
+                    "starredRepositories": {
+                        "pageInfo": {
+                            "hasNextPage": end_cursor is not None,
+                            "endCursor": end_cursor,
+                        },
+                        "nodes": nodes,
+                    }
+                }
+            }
+        },
+    )
+
+
+def graphql_node(repo_id: int) -> dict:
+    return {
+        "databaseId": repo_id,
+        "name": f"repo{repo_id}",
+        "description": "Test repo",
+        "stargazerCount": 100,
+        "url": f"https://github.com/owner1/repo{repo_id}",
+        "homepageUrl": "https://example.com",
+        "isArchived": False,
+        "owner": {"login": "owner1", "databaseId": 456},
+    }
 
 
 @pytest.mark.django_db
 @patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.httpx.Client")
-def test_pager_captures_archived_status(
-    mock_client_class, mock_async_task, user, social_token
+@patch("starminder.core.github.get_client")
+def test_pager_graphql_creates_temp_stars(
+    mock_get_client, mock_async_task, user, social_token, settings
 ) -> None:
-    """Test that pager captures archived field from GitHub API."""
-    mock_response = Mock()
-    mock_response.json.return_value = [
+    settings.GITHUB_STAR_FETCHER = "graphql"
+    requests = mock_github(
+        mock_get_client,
+        lambda request: graphql_response(
+            [graphql_node(123), None, {**graphql_node(124), "owner": None}]
+        ),
+    )
+
+    progress = pager(user.id, [social_token.id])
+
+    assert len(requests) == 1
+    assert requests[0].method == "POST"
+    assert requests[0].url.path == "/graphql"
+    assert requests[0].headers["Authorization"] == f"Bearer {social_token.token}"
+    assert json.loads(requests[0].content)["variables"] == {
+        "cursor": None,
+        "pageSize": 100,
+    }
+
+    temp_star = TempStar.objects.get(user=user)
+    assert temp_star.repository.provider == "github"
+    assert temp_star.repository.provider_id == "123"
+    assert temp_star.repository.name == "repo123"
+    assert temp_star.repository.owner == "owner1"
+    assert temp_star.repository.owner_id == "456"
+    assert temp_star.repository.description == "Test repo"
+    assert temp_star.repository.star_count == 100
+    assert temp_star.repository.repo_url == "https://github.com/owner1/repo123"
+    assert temp_star.repository.project_url == "https://example.com"
+    assert temp_star.repository.archived is False
+
+    assert progress == SyncProgress({}, None)
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.GRAPHQL_PAGES_PER_TASK", 2)
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_graphql_follows_cursor_and_hands_off(
+    mock_get_client, mock_async_task, user, social_token, settings
+) -> None:
+    settings.GITHUB_STAR_FETCHER = "graphql"
+
+    def handler(request):
+        cursor = json.loads(request.content)["variables"]["cursor"]
+        page = 0 if cursor is None else int(cursor)
+        return graphql_response([graphql_node(page)], end_cursor=str(page + 1))
+
+    requests = mock_github(mock_get_client, handler)
+
+    progress = pager(user.id, [social_token.id], timezone.now())
+
+    assert len(requests) == 2
+    assert TempStar.objects.filter(user=user).count() == 2
+    assert progress == SyncProgress({social_token.id: "2"}, None)
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_graphql_incremental_sync_stops_at_known_stars(
+    mock_get_client, mock_async_task, user, social_token, temp_star, settings
+) -> None:
+    settings.GITHUB_STAR_FETCHER = "graphql"
+    requests = mock_github(
+        mock_get_client,
+        lambda request: graphql_response(
+            [graphql_node(1), graphql_node(int(temp_star.repository.provider_id))],
+            end_cursor="next",
+        ),
+    )
+
+    progress = pager(user.id, [social_token.id])
+
+    assert len(requests) == 1
+    assert TempStar.objects.filter(user=user).count() == 2
+    assert progress == SyncProgress({}, None)
+
+
+@pytest.mark.django_db
+def test_ingest_items_dedupes_repeated_items(user) -> None:
+    item = {
+        "id": 1,
+        "name": "repo1",
+        "owner": {"login": "owner", "id": 1},
+        "stargazers_count": 10,
+        "html_url": "https://github.com/owner/repo1",
+    }
+
+    ingest_items(user, [item, item])
+
+    assert TempStar.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.django_db
+def test_get_tokens_loads_tokens_in_one_query(
+    user, social_token, django_assert_num_queries
+) -> None:
+    social_account2 = SocialAccount.objects.create(
+        user=user, provider="github", uid="test_uid_2"
+    )
+    social_token2 = SocialToken.objects.create(
+        account=social_account2, token="test_token_2"
+    )
+
+    with django_assert_num_queries(1):
+        tokens = get_tokens(user.id, [social_token2.id, social_token.id])
+        assert [token.account.user for token in tokens] == [user, user]
+
+    assert tokens == [social_token2, social_token]
+
+
+@pytest.mark.django_db
+def test_get_tokens_ignores_other_users_tokens(user2, social_token) -> None:
+    assert get_tokens(user2.id, [social_token.id]) == []
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_exits_when_tokens_unlinked(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    requests = mock_github(mock_get_client, lambda request: github_response([]))
+    token_id = social_token.id
+    social_token.delete()
+
+    pager(user.id, [token_id])
+
+    assert requests == []
+    mock_async_task.assert_not_called()
+
+
+def test_get_last_page_reads_link_header() -> None:
+    response = httpx.Response(
+        200,
+        headers={
+            "Link": (
+                '<https://api.github.com/user/starred?per_page=100&page=2>; rel="next", '
+                '<https://api.github.com/user/starred?per_page=100&page=42>; rel="last"'
+            )
+        },
+    )
+
+    assert get_last_page(response) == 42
+
+
+def test_get_last_page_without_link_header() -> None:
+    assert get_last_page(httpx.Response(200)) is None
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 1000])
+def test_iter_json_array_decodes_across_chunk_boundaries(chunk_size) -> None:
+    items = [
+        {"id": 1, "name": "repo1", "description": "Has [brackets], commas"},
+        {"id": 2, "name": "repo2", "owner": {"login": "owner", "id": 456}},
+        12345,
+        -1.5e3,
+        0.25,
+        None,
+    ]
+    text = " [\n" + ",\n  ".join(json.dumps(item) for item in items) + "\n] "
+    chunks = [text[i : i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+    assert list(iter_json_array(chunks)) == items
+
+
+@pytest.mark.parametrize(
+    "chunks, expected",
+    [
+        (["[1.", "5]"], [1.5]),
+        (["[1e", "3]"], [1000.0]),
+        (["[1e+", "3, 2]"], [1000.0, 2]),
+        (["[-", "12]"], [-12]),
+        (["[12", "34]"], [1234]),
+    ],
+)
+def test_iter_json_array_decodes_numbers_split_mid_token(chunks, expected) -> None:
+    assert list(iter_json_array(chunks)) == expected
+
+
+def test_iter_json_array_decodes_empty_array() -> None:
+    assert list(iter_json_array(["[", " ", "]"])) == []
+
+
+def test_iter_json_array_rejects_truncated_array() -> None:
+    with pytest.raises(ValueError):
+        list(iter_json_array(['[{"id": 1}, {"id"']))
+
+
+def test_iter_json_array_rejects_non_array() -> None:
+    with pytest.raises(ValueError):
+        list(iter_json_array(['{"message": "Bad credentials"}']))
+
+
+@pytest.mark.django_db
+@patch("starminder.core.github.get_client")
+def test_fetch_starred_page_keeps_only_needed_fields(
+    mock_get_client, social_token
+) -> None:
+    mock_github(
+        mock_get_client,
+        lambda request: github_response(
+            [
+                {
+                    "id": 123,
+                    "name": "repo1",
+                    "full_name": "owner1/repo1",
+                    "owner": {
+                        "login": "owner1",
+                        "id": 456,
+                        "avatar_url": "https://avatars.githubusercontent.com/u/456",
+                    },
+                    "description": "Test repo",
+                    "stargazers_count": 100,
+                    "html_url": "https://github.com/owner1/repo1",
+                    "homepage": None,
+                    "archived": False,
+                    "forks_url": "https://api.github.com/repos/owner1/repo1/forks",
+                }
+            ],
+            headers={"ETag": '"abc"'},
+        ),
+    )
+
+    starred_page = fetch_starred_page(social_token, 1)
+
+    assert starred_page.etag == '"abc"'
+    assert starred_page.items == [
         {
             "id": 123,
-            "name": "active-repo",
+            "name": "repo1",
             "owner": {"login": "owner1", "id": 456},
-            "description": "Active repo",
+            "description": "Test repo",
             "stargazers_count": 100,
-            "html_url": "https://github.com/owner1/active-repo",
+            "html_url": "https://github.com/owner1/repo1",
+            "homepage": None,
             "archived": False,
-        },
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_ingest_items_inserts_page_in_one_query(
+    user, django_assert_num_queries
+) -> None:
+    items = [
         {
-            "id": 124,
-            "name": "archived-repo",
-            "owner": {"login": "owner2", "id": 789},
-            "description": "Archived repo",
-            "stargazers_count": 50,
-            "html_url": "https://github.com/owner2/archived-repo",
-            "archived": True,
+            "id": i,
+            "name": f"repo{i}",
+            "owner": {"login": "owner", "id": 1},
+            "stargazers_count": 10,
+            "html_url": f"https://github.com/owner/repo{i}",
+        }
+        for i in range(100)
+    ]
+
+    # cursor SELECT, fresh repos SELECT, savepoint, repo INSERT, star INSERT,
+    # release
+    with django_assert_num_queries(6):
+        ingest_items(user, items)
+
+    assert TempStar.objects.filter(user=user).count() == 100
+    assert Repository.objects.count() == 100
+
+
+@pytest.mark.django_db
+def test_ingest_items_shares_repos_between_users(user, user2) -> None:
+    item = {
+        "id": 1,
+        "name": "repo1",
+        "owner": {"login": "owner", "id": 1},
+        "stargazers_count": 10,
+        "html_url": "https://github.com/owner/repo1",
+    }
+
+    ingest_items(user, [item])
+    ingest_items(user2, [{**item, "stargazers_count": 11}])
+
+    repository = Repository.objects.get()
+    assert set(TempStar.objects.values_list("user", "repository")) == {
+        (user.id, repository.id),
+        (user2.id, repository.id),
+    }
+    # refreshed by the first sync, so the second leaves it alone
+    assert repository.star_count == 10
+
+
+@pytest.mark.django_db
+def test_ingest_items_refreshes_stale_repos(user, temp_star) -> None:
+    Repository.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+    TempStar.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+
+    ingest_items(
+        user,
+        [
+            {
+                "id": int(temp_star.repository.provider_id),
+                "name": "renamed",
+                "owner": {"login": "owner", "id": 1},
+                "stargazers_count": 500,
+                "html_url": "https://github.com/owner/renamed",
+            }
+        ],
+    )
+
+    temp_star.refresh_from_db()
+    assert temp_star.repository.name == "renamed"
+    assert temp_star.repository.star_count == 500
+    assert temp_star.updated_at > timezone.now() - timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.sentry_sdk")
+def test_ingest_items_reports_malformed_item_and_keeps_rest(mock_sentry, user) -> None:
+    items = [
+        {
+            "id": 1,
+            "name": "repo1",
+            "owner": {"login": "owner", "id": 1},
+            "stargazers_count": 10,
+            "html_url": "https://github.com/owner/repo1",
         },
+        {"id": 2, "name": "repo2", "owner": {"login": "owner", "id": 1}},
+    ]
+
+    ingest_items(user, items)
+
+    assert list(TempStar.objects.values_list("repository__name", flat=True)) == [
+        "repo1"
+    ]
+    mock_sentry.capture_exception.assert_called_once()
+    assert mock_sentry.capture_exception.call_args[1]["extras"] == {"item": items[1]}
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.sentry_sdk")
+def test_ingest_items_falls_back_to_per_item_inserts(mock_sentry, user) -> None:
+    items = [
+        {
+            "id": i,
+            "name": f"repo{i}",
+            "owner": {"login": "owner", "id": 1},
+            "stargazers_count": 10,
+            "html_url": f"https://github.com/owner/repo{i}",
+        }
+        for i in range(3)
     ]
-    mock_client = MagicMock()
-    mock_client.get.return_value = mock_response
-    mock_client.__enter__.return_value = mock_client
-    mock_client.__exit__.return_value = None
-    mock_client_class.return_value = mock_client
+    original_save = Repository.save
+
+    def save(self, *args, **kwargs):
+        if self.name == "repo1":
+            raise DatabaseError("value too long")
+        original_save(self, *args, **kwargs)
+
+    with (
+        patch.object(
+            Repository.objects, "bulk_create", side_effect=DatabaseError("batch")
+        ),
+        patch.object(Repository, "save", save),
+    ):
+        ingest_items(user, items)
+
+    assert set(TempStar.objects.values_list("repository__name", flat=True)) == {
+        "repo0",
+        "repo2",
+    }
+    mock_sentry.capture_exception.assert_called_once()
+    assert mock_sentry.capture_exception.call_args[1]["extras"] == {"item": items[1]}
+
+
+# generate_data tests
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_creates_reminder(mock_async_task, user, temp_star) -> None:
+    generate_data(user.id, "irrelevant")
+
+    assert Reminder.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_creates_stars_from_temp_stars(
+    mock_async_task, user, temp_star
+) -> None:
+    generate_data(user.id, "irrelevant")
+
+    reminder = Reminder.objects.get(user=user)
+    assert Star.objects.filter(reminder=reminder).count() == 1
+
+    star = Star.objects.get(reminder=reminder)
+    assert star.provider == temp_star.repository.provider
+    assert star.provider_id == temp_star.repository.provider_id
+    assert star.name == temp_star.repository.name
+    assert star.owner == temp_star.repository.owner
+    assert star.owner_id == temp_star.repository.owner_id
+    assert star.description == temp_star.repository.description
+    assert star.star_count == temp_star.repository.star_count
+    assert star.repo_url == temp_star.repository.repo_url
+    assert star.project_url == temp_star.repository.project_url
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_respects_max_entries_limit(mock_async_task, user) -> None:
+    # Create 10 temp stars
+    for i in range(10):
+        create_temp_star(
+            user=user,
+            provider="github",
+            provider_id=str(i),
+            name=f"repo{i}",
+            owner="owner",
+            owner_id="123",
+            star_count=10,
+            repo_url=f"https://github.com/owner/repo{i}",
+        )
+
+    user.user_profile.max_entries = 3
+    user.user_profile.save()
+
+    generate_data(user.id, "irrelevant")
+
+    reminder = Reminder.objects.get(user=user)
+    assert Star.objects.filter(reminder=reminder).count() == 3
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_does_not_create_reminder_when_no_temp_stars(
+    mock_async_task, user
+) -> None:
+    generate_data(user.id, "irrelevant")
+
+    assert Reminder.objects.filter(user=user).count() == 0
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.implementations.jobs.render_to_string")
+def test_generate_data_queues_email_when_email_configured(
+    mock_render, mock_async_task, user, temp_star
+) -> None:
+    mock_render.return_value = "rendered content"
+
+    user.user_profile.reminder_email = "user@example.com"
+    user.user_profile.save()
+
+    generate_data(user.id, "irrelevant")
+
+    mock_async_task.assert_called_once()
+
+    # Check email send call
+    email_call = mock_async_task.call_args
+    assert email_call[0][0] == "starminder.content.email.send_email"
+    assert email_call[1]["recipient"] == "user@example.com"
+    assert "☆ Starminder ☆" in email_call[1]["subject"]
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_does_not_queue_email_when_no_email(
+    mock_async_task, user, temp_star
+) -> None:
+    user.user_profile.reminder_email = None
+    user.user_profile.save()
+
+    generate_data(user.id, "irrelevant")
+
+    mock_async_task.assert_not_called()
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_keeps_catalog(mock_async_task, user, temp_star) -> None:
+    generate_data(user.id, "irrelevant")
+
+    assert TempStar.objects.filter(user=user).count() == 1
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_picks_next_stars_in_cycle(mock_async_task, user) -> None:
+    for i in range(10):
+        temp_star = create_temp_star(
+            user=user,
+            provider_id=str(i),
+            name=f"repo{i}",
+            owner="owner",
+            owner_id="123",
+            star_count=10,
+            repo_url=f"https://github.com/owner/repo{i}",
+        )
+        TempStar.objects.filter(id=temp_star.id).update(cycle_rank=(9 - i) / 10)
+
+    user.user_profile.max_entries = 3
+    user.user_profile.save()
+    UserProfile.objects.filter(user=user).update(cycle_cursor=0.45)
+
+    generate_data(user.id, "irrelevant")
+
+    assert list(
+        Star.objects.filter(reminder__user=user)
+        .order_by("id")
+        .values_list("provider_id", flat=True)
+    ) == ["4", "3", "2"]
+    user.user_profile.refresh_from_db()
+    assert user.user_profile.cycle_cursor == 0.7
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_loads_only_sampled_rows(mock_async_task, user) -> None:
+    for i in range(50):
+        create_temp_star(
+            user=user,
+            provider_id=str(i),
+            name=f"repo{i}",
+            owner="owner",
+            owner_id="123",
+            star_count=10,
+            repo_url=f"https://github.com/owner/repo{i}",
+        )
+    user.user_profile.max_entries = 5
+    user.user_profile.save()
+
+    with patch.object(
+        TempStar, "__init__", side_effect=TempStar.__init__, autospec=True
+    ) as mock_init:
+        generate_data(user.id, "irrelevant")
+
+    assert mock_init.call_count == 5
+    assert Star.objects.filter(reminder__user=user).count() == 5
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_cost_independent_of_history(
+    mock_async_task, user, django_assert_max_num_queries
+) -> None:
+    create_catalog(user, 40)
+    user.user_profile.max_entries = 5
+    user.user_profile.save()
+
+    generate_data(user.id, "irrelevant")
+    with CaptureQueriesContext(connection) as first_run:
+        backdate_reminders()
+        generate_data(user.id, "irrelevant")
+
+    for _ in range(5):
+        backdate_reminders()
+        generate_data(user.id, "irrelevant")
+
+    backdate_reminders()
+    with django_assert_max_num_queries(len(first_run.captured_queries)):
+        generate_data(user.id, "irrelevant")
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_creates_stars_in_bulk(
+    mock_async_task, user, django_assert_num_queries
+) -> None:
+    create_catalog(user, 50)
+    user.user_profile.max_entries = 50
+    user.user_profile.save()
+
+    with django_assert_num_queries(11):
+        generate_data(user.id, "irrelevant")
+
+    assert Star.objects.filter(reminder__user=user).count() == 50
+
+
+# archived repository tests
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+@patch("starminder.core.github.get_client")
+def test_pager_captures_archived_status(
+    mock_get_client, mock_async_task, user, social_token
+) -> None:
+    """Test that pager captures archived field from GitHub API."""
+    mock_response = github_response(
+        [
+            {
+                "id": 123,
+                "name": "active-repo",
+                "owner": {"login": "owner1", "id": 456},
+                "description": "Active repo",
+                "stargazers_count": 100,
+                "html_url": "https://github.com/owner1/active-repo",
+                "archived": False,
+            },
+            {
+                "id": 124,
+                "name": "archived-repo",
+                "owner": {"login": "owner2", "id": 789},
+                "description": "Archived repo",
+                "stargazers_count": 50,
+                "html_url": "https://github.com/owner2/archived-repo",
+                "archived": True,
+            },
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
 
-    pager(user, [social_token])
+    pager(user.id, [social_token.id])
 
-    temp_stars = TempStar.objects.filter(user=user).order_by("provider_id")
+    temp_stars = TempStar.objects.filter(user=user).order_by("repository__provider_id")
     assert temp_stars.count() == 2
-    assert temp_stars[0].archived is False
-    assert temp_stars[1].archived is True
+    assert temp_stars[0].repository.archived is False
+    assert temp_stars[1].repository.archived is True
 
 
 @pytest.mark.django_db
 @patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.httpx.Client")
+@patch("starminder.core.github.get_client")
 def test_pager_defaults_archived_to_false_when_missing(
-    mock_client_class, mock_async_task, user, social_token
+    mock_get_client, mock_async_task, user, social_token
 ) -> None:
     """Test that pager defaults archived to False if not in API response."""
-    mock_response = Mock()
-    mock_response.json.return_value = [
-        {
-            "id": 123,
-            "name": "repo-without-archived",
-            "owner": {"login": "owner1", "id": 456},
-            "stargazers_count": 100,
-            "html_url": "https://github.com/owner1/repo-without-archived",
-        }
-    ]
-    mock_client = MagicMock()
-    mock_client.get.return_value = mock_response
-    mock_client.__enter__.return_value = mock_client
-    mock_client.__exit__.return_value = None
-    mock_client_class.return_value = mock_client
+    mock_response = github_response(
+        [
+            {
+                "id": 123,
+                "name": "repo-without-archived",
+                "owner": {"login": "owner1", "id": 456},
+                "stargazers_count": 100,
+                "html_url": "https://github.com/owner1/repo-without-archived",
+            }
+        ]
+    )
+    mock_github(mock_get_client, lambda request: mock_response)
 
-    pager(user, [social_token])
+    pager(user.id, [social_token.id])
 
     temp_star = TempStar.objects.get(user=user)
-    assert temp_star.archived is False
+    assert temp_star.repository.archived is False
 
 
 @pytest.mark.django_db
@@ -770,7 +1949,7 @@ def test_generate_data_excludes_archived_when_preference_false(
     user.user_profile.save()
 
     # Create mix of archived and non-archived TempStars
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -781,7 +1960,7 @@ def test_generate_data_excludes_archived_when_preference_false(
         repo_url="https://github.com/owner/active-repo",
         archived=False,
     )
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="2",
@@ -811,7 +1990,7 @@ def test_generate_data_includes_archived_by_default(mock_async_task, user) -> No
     assert user.user_profile.include_archived is True
 
     # Create archived TempStar
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -839,7 +2018,7 @@ def test_generate_data_preserves_archived_status_in_stars(
     mock_async_task, user
 ) -> None:
     """Test that archived status is correctly copied from TempStar to Star."""
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -850,7 +2029,7 @@ def test_generate_data_preserves_archived_status_in_stars(
         repo_url="https://github.com/owner/active-repo",
         archived=False,
     )
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="2",
@@ -883,7 +2062,7 @@ def test_generate_data_handles_all_archived_when_excluded(
     user.user_profile.save()
 
     # Create only archived TempStars
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -894,7 +2073,7 @@ def test_generate_data_handles_all_archived_when_excluded(
         repo_url="https://github.com/owner/archived-repo-1",
         archived=True,
     )
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="2",
@@ -927,7 +2106,7 @@ def test_generate_data_includes_own_when_preference_false(
     user.user_profile.save()
 
     # create mix of own and non-own TempStars
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -938,7 +2117,7 @@ def test_generate_data_includes_own_when_preference_false(
         repo_url="https://github.com/owner/active-repo",
         archived=False,
     )
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="2",
@@ -949,7 +2128,7 @@ def test_generate_data_includes_own_when_preference_false(
         repo_url="https://github.com/owner/archived-repo",
         archived=True,
     )
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="3",
@@ -960,7 +2139,7 @@ def test_generate_data_includes_own_when_preference_false(
         repo_url="https://github.com/456/active-repo-2",
         archived=False,
     )
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="4",
@@ -985,14 +2164,10 @@ def test_generate_data_includes_own_when_preference_false(
 # cycle tracking tests
 
 
-@pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_cycle_tracking_with_one_to_one_field(mock_async_task, user) -> None:
-    """Test that cycle tracking works correctly with OneToOneField to Star."""
-    for i in range(10):
-        TempStar.objects.create(
+def create_catalog(user, count: int) -> None:
+    for i in range(count):
+        create_temp_star(
             user=user,
-            provider="github",
             provider_id=str(i),
             name=f"repo{i}",
             owner="owner",
@@ -1001,218 +2176,195 @@ def test_cycle_tracking_with_one_to_one_field(mock_async_task, user) -> None:
             repo_url=f"https://github.com/owner/repo{i}",
         )
 
+
+def reminder_provider_ids(index: int) -> list[str]:
+    reminder = Reminder.objects.order_by("created_at")[index]
+    return list(reminder.star_set.order_by("id").values_list("provider_id", flat=True))
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_cycle_tracking_with_cursor(mock_async_task, user) -> None:
+    create_catalog(user, 10)
     user.user_profile.max_entries = 5
     user.user_profile.save()
 
     generate_data(user.id, "irrelevant")
 
     user.user_profile.refresh_from_db()
-    assert user.user_profile.cycle_start is not None
-
-    reminder1 = Reminder.objects.first()
-    assert reminder1 is not None
-    reminder1_ids = set(reminder1.star_set.values_list("provider_id", flat=True))
-    assert len(reminder1_ids) == 5
+    assert user.user_profile.cycle_cursor is not None
 
     backdate_reminders()
-
-    TempStar.objects.all().delete()
-    for i in range(10):
-        TempStar.objects.create(
-            user=user,
-            provider="github",
-            provider_id=str(i),
-            name=f"repo{i}",
-            owner="owner",
-            owner_id="123",
-            star_count=10,
-            repo_url=f"https://github.com/owner/repo{i}",
-        )
-
     generate_data(user.id, "irrelevant")
 
-    user.user_profile.refresh_from_db()
-    assert user.user_profile.cycle_start is None
-
-    reminder2 = Reminder.objects.order_by("created_at")[1]
-    reminder2_ids = set(reminder2.star_set.values_list("provider_id", flat=True))
+    reminder1_ids = set(reminder_provider_ids(0))
+    reminder2_ids = set(reminder_provider_ids(1))
+    assert len(reminder1_ids) == 5
     assert len(reminder2_ids) == 5
-
     assert len(reminder1_ids & reminder2_ids) == 0
 
 
 @pytest.mark.django_db
 @patch("starminder.implementations.jobs.async_task")
-def test_cycle_cutoff_mid_reminder(mock_async_task, user) -> None:
-    """Test cycle reset when cutoff happens mid-reminder."""
-    for i in range(10):
-        TempStar.objects.create(
-            user=user,
-            provider="github",
-            provider_id=str(i),
-            name=f"repo{i}",
-            owner="owner",
-            owner_id="123",
-            star_count=10,
-            repo_url=f"https://github.com/owner/repo{i}",
-        )
-
+def test_cycle_wraps_mid_reminder(mock_async_task, user) -> None:
+    create_catalog(user, 10)
     user.user_profile.max_entries = 7
     user.user_profile.save()
 
     generate_data(user.id, "irrelevant")
+    backdate_reminders()
+    generate_data(user.id, "irrelevant")
+
+    reminder1_ids = reminder_provider_ids(0)
+    reminder2_ids = reminder_provider_ids(1)
+    assert len(reminder2_ids) == 7
+    assert len(set(reminder2_ids)) == 7
+    # the old cycle's last three, then the first four of a new one
+    assert set(reminder2_ids[:3]) == {str(i) for i in range(10)} - set(reminder1_ids)
     user.user_profile.refresh_from_db()
-    assert user.user_profile.cycle_start is not None
+    assert user.user_profile.cycle_cursor is not None
 
+    # the new cycle carries on past the four it opened with
     backdate_reminders()
+    generate_data(user.id, "irrelevant")
+    reminder3_ids = reminder_provider_ids(2)
+    assert not set(reminder3_ids[:6]) & set(reminder2_ids[3:])
 
-    TempStar.objects.all().delete()
-    for i in range(10):
-        TempStar.objects.create(
-            user=user,
-            provider="github",
-            provider_id=str(i),
-            name=f"repo{i}",
-            owner="owner",
-            owner_id="123",
-            star_count=10,
-            repo_url=f"https://github.com/owner/repo{i}",
-        )
 
-    generate_data(user.id, "irrelevant")
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_cycle_reshuffles_on_wrap(mock_async_task, user) -> None:
+    create_catalog(user, 6)
+    user.user_profile.max_entries = 4
+    user.user_profile.save()
+    ranks = dict(TempStar.objects.values_list("id", "cycle_rank"))
 
-    user.user_profile.refresh_from_db()
-    assert user.user_profile.cycle_start is not None
+    generate_data(user.id, "irrelevant")
+    assert dict(TempStar.objects.values_list("id", "cycle_rank")) == ranks
 
-    reminder2 = Reminder.objects.order_by("created_at")[1]
-    stars2 = list(reminder2.star_set.order_by("id"))
+    backdate_reminders()
+    generate_data(user.id, "irrelevant")
 
-    assert user.user_profile.cycle_start.id == stars2[3].id
-    assert len(stars2) == 7
+    assert dict(TempStar.objects.values_list("id", "cycle_rank")) != ranks
 
 
 @pytest.mark.django_db
-def test_cycle_start_validation(user, django_user_model) -> None:
-    """Test that cycle_start validation rejects Stars from other users."""
-    from django.core.exceptions import ValidationError
+@patch("starminder.implementations.jobs.async_task")
+def test_cycle_small_catalog_shows_everything(mock_async_task, user) -> None:
+    create_catalog(user, 3)
+    user.user_profile.max_entries = 5
+    user.user_profile.save()
 
-    other_user = django_user_model.objects.create_user(
-        username="other", password="pass"
-    )
+    generate_data(user.id, "irrelevant")
 
-    other_reminder = Reminder.objects.create(user=other_user)
-    other_star = Star.objects.create(
-        reminder=other_reminder,
-        provider="github",
-        provider_id="999",
-        name="repo",
+    assert sorted(reminder_provider_ids(0)) == ["0", "1", "2"]
+    user.user_profile.refresh_from_db()
+    assert user.user_profile.cycle_cursor is None
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_new_stars_join_current_cycle(mock_async_task, user) -> None:
+    create_catalog(user, 4)
+    TempStar.objects.update(cycle_rank=0.1)
+    user.user_profile.max_entries = 1
+    user.user_profile.save()
+    UserProfile.objects.filter(user=user).update(cycle_cursor=0.5)
+
+    new_star = create_temp_star(
+        user=user,
+        provider_id="new",
+        name="new-repo",
         owner="owner",
         owner_id="123",
         star_count=10,
-        repo_url="https://github.com/owner/repo",
+        repo_url="https://github.com/owner/new-repo",
     )
+    TempStar.objects.filter(id=new_star.id).update(cycle_rank=0.7)
 
-    user.user_profile.cycle_start = other_star
+    generate_data(user.id, "irrelevant")
 
-    with pytest.raises(ValidationError):
-        user.user_profile.save()
+    assert reminder_provider_ids(0) == ["new"]
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_all_repos_shown_resets_at_first_star(mock_async_task, user) -> None:
-    """Test that when all repos shown, cycle resets at the first new Star."""
-    for i in range(6):
-        TempStar.objects.create(
-            user=user,
-            provider="github",
-            provider_id=str(i),
-            name=f"repo{i}",
-            owner="owner",
-            owner_id="123",
-            star_count=10,
-            repo_url=f"https://github.com/owner/repo{i}",
-        )
-
-    user.user_profile.max_entries = 4
-    user.user_profile.save()
+def test_ingest_items_ranks_new_stars_after_cursor(user, temp_star) -> None:
+    TempStar.objects.update(cycle_rank=0.1)
+    UserProfile.objects.filter(user=user).update(cycle_cursor=0.9)
+    items = [
+        {
+            "id": i,
+            "name": f"repo{i}",
+            "owner": {"login": "owner", "id": 1},
+            "stargazers_count": 10,
+            "html_url": f"https://github.com/owner/repo{i}",
+        }
+        for i in range(20)
+    ] + [
+        {
+            "id": int(temp_star.repository.provider_id),
+            "name": temp_star.repository.name,
+            "owner": {"login": "owner", "id": 1},
+            "stargazers_count": 10,
+            "html_url": temp_star.repository.repo_url,
+        }
+    ]
 
-    generate_data(user.id, "irrelevant")
-    user.user_profile.refresh_from_db()
-    assert user.user_profile.cycle_start is not None
+    ingest_items(user, items)
 
-    backdate_reminders()
+    new_ranks = TempStar.objects.exclude(id=temp_star.id).values_list(
+        "cycle_rank", flat=True
+    )
+    assert len(new_ranks) == 20
+    assert all(rank > 0.9 for rank in new_ranks)
+    temp_star.refresh_from_db()
+    assert temp_star.cycle_rank == 0.1
 
-    TempStar.objects.all().delete()
-    for i in range(6):
-        TempStar.objects.create(
-            user=user,
-            provider="github",
-            provider_id=str(i),
-            name=f"repo{i}",
-            owner="owner",
-            owner_id="123",
-            star_count=10,
-            repo_url=f"https://github.com/owner/repo{i}",
-        )
 
-    generate_data(user.id, "irrelevant")
-    user.user_profile.refresh_from_db()
+@pytest.mark.django_db
+def test_ingest_items_ranks_new_stars_among_rest_after_wrap(user, temp_star) -> None:
+    # a wrap ranks the new cycle's opening stars below 0 and the cursor on them
+    TempStar.objects.update(cycle_rank=-1)
+    UserProfile.objects.filter(user=user).update(cycle_cursor=-1)
+    items = [
+        {
+            "id": i,
+            "name": f"repo{i}",
+            "owner": {"login": "owner", "id": 1},
+            "stargazers_count": 10,
+            "html_url": f"https://github.com/owner/repo{i}",
+        }
+        for i in range(20)
+    ]
 
-    reminder2 = Reminder.objects.order_by("created_at")[1]
-    stars2 = list(reminder2.star_set.order_by("id"))
+    ingest_items(user, items)
 
-    assert user.user_profile.cycle_start is not None
-    assert user.user_profile.cycle_start.id == stars2[2].id
+    new_ranks = TempStar.objects.exclude(id=temp_star.id).values_list(
+        "cycle_rank", flat=True
+    )
+    assert len(new_ranks) == 20
+    assert all(0 <= rank <= 1 for rank in new_ranks)
 
 
 @pytest.mark.django_db
 @patch("starminder.implementations.jobs.async_task")
 def test_no_duplicates_in_first_cycle(mock_async_task, user) -> None:
     """Test that no duplicates appear within the first cycle."""
-    for i in range(12):
-        TempStar.objects.create(
-            user=user,
-            provider="github",
-            provider_id=str(i),
-            name=f"repo{i}",
-            owner="owner",
-            owner_id="123",
-            star_count=10,
-            repo_url=f"https://github.com/owner/repo{i}",
-        )
-
+    create_catalog(user, 12)
     user.user_profile.max_entries = 5
     user.user_profile.save()
 
-    all_shown_ids = set()
-
-    for reminder_num in range(3):
+    for _ in range(3):
         generate_data(user.id, "irrelevant")
         backdate_reminders()
 
-        TempStar.objects.all().delete()
-        for i in range(12):
-            TempStar.objects.create(
-                user=user,
-                provider="github",
-                provider_id=str(i),
-                name=f"repo{i}",
-                owner="owner",
-                owner_id="123",
-                star_count=10,
-                repo_url=f"https://github.com/owner/repo{i}",
-            )
-
-        reminder = Reminder.objects.order_by("created_at")[reminder_num]
-        provider_ids = set(reminder.star_set.values_list("provider_id", flat=True))
-
-        if len(all_shown_ids) < 12:
-            duplicates = all_shown_ids & provider_ids
-            if len(all_shown_ids) + len(provider_ids) <= 12:
-                assert len(duplicates) == 0, f"Found duplicates in cycle: {duplicates}"
-
-        all_shown_ids.update(provider_ids)
+    shown_ids = [
+        provider_id
+        for index in range(3)
+        for provider_id in reminder_provider_ids(index)
+    ]
+    # 12 stars: two full reminders and two from the first cycle's end
+    assert len(set(shown_ids[:12])) == 12
 
 
 # project URL flagging tests
@@ -1253,7 +2405,7 @@ def test_generate_data_checks_only_sampled_project_urls(
 ) -> None:
     """Test that the checker gets one call with only the sampled stars' URLs."""
     for i in range(3):
-        TempStar.objects.create(
+        create_temp_star(
             user=user,
             provider="github",
             provider_id=str(i),
@@ -1281,7 +2433,7 @@ def test_generate_data_does_not_flag_missing_project_url(
     mock_async_task, user, mock_get_flagged_urls
 ) -> None:
     """Test that stars without a project URL are never flagged."""
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -1308,7 +2460,7 @@ def test_generate_data_flags_description_with_flagged_url(
     mock_async_task, user, mock_get_flagged_urls
 ) -> None:
     """Test that a description containing a flagged URL sets the flag."""
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -1346,7 +2498,7 @@ def test_generate_data_checks_description_and_project_urls_together(
     mock_async_task, user, mock_get_flagged_urls
 ) -> None:
     """Test that description URLs join project URLs in the single batch call."""
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -1372,7 +2524,7 @@ def test_generate_data_does_not_flag_missing_description(
     mock_async_task, user, mock_get_flagged_urls
 ) -> None:
     """Test that stars without a description are never flagged."""
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -1394,27 +2546,15 @@ def test_generate_data_does_not_flag_missing_description(
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-def test_user_job_deletes_leftover_temp_stars(
-    mock_async_task, user, user2, social_token, temp_star
+@patch("starminder.implementations.jobs.run_pipeline")
+def test_user_job_keeps_catalog(
+    mock_run_pipeline, user, social_token, temp_star
 ) -> None:
-    """Test that a run starts from a clean slate, for the running user only."""
-    TempStar.objects.create(
-        user=user2,
-        provider="github",
-        provider_id="1",
-        name="repo",
-        owner="owner",
-        owner_id="123",
-        star_count=10,
-        repo_url="https://github.com/owner/repo",
-    )
-
+    """Test that a run builds on the existing catalog instead of rebuilding it."""
     user_job(user.id)
 
-    assert TempStar.objects.filter(user=user).count() == 0
-    assert TempStar.objects.filter(user=user2).count() == 1
-    mock_async_task.assert_called_once()
+    assert TempStar.objects.filter(user=user).count() == 1
+    mock_run_pipeline.assert_called_once()
 
 
 @pytest.mark.django_db
@@ -1450,7 +2590,7 @@ def test_generate_data_proceeds_when_reminder_is_old(
 def test_generate_data_rolls_back_on_crash(mock_async_task, user, temp_star) -> None:
     """Test that a mid-run crash leaves no partial reminder behind."""
     with patch(
-        "starminder.implementations.jobs.Star.objects.create",
+        "starminder.implementations.jobs.Star.objects.bulk_create",
         side_effect=RuntimeError("boom"),
     ):
         with pytest.raises(RuntimeError):
@@ -1460,6 +2600,91 @@ def test_generate_data_rolls_back_on_crash(mock_async_task, user, temp_star) ->
     mock_async_task.assert_not_called()
 
 
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_rolls_back_wrap_on_crash(mock_async_task, user) -> None:
+    """Test that a crash in a wrapping run keeps the old cycle and cursor."""
+    create_catalog(user, 6)
+    user.user_profile.max_entries = 4
+    user.user_profile.save()
+    generate_data(user.id, "irrelevant")
+    backdate_reminders()
+
+    user.user_profile.refresh_from_db()
+    cycle_cursor = user.user_profile.cycle_cursor
+    ranks = dict(TempStar.objects.values_list("id", "cycle_rank"))
+
+    with patch(
+        "starminder.implementations.jobs.Star.objects.bulk_create",
+        side_effect=RuntimeError("boom"),
+    ):
+        with pytest.raises(RuntimeError):
+            generate_data(user.id, "irrelevant")
+
+    assert Reminder.objects.filter(user=user).count() == 1
+    user.user_profile.refresh_from_db()
+    assert user.user_profile.cycle_cursor == cycle_cursor
+    assert dict(TempStar.objects.values_list("id", "cycle_rank")) == ranks
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.async_task")
+def test_generate_data_checks_links_before_writing(
+    mock_async_task, user, temp_star, mock_get_flagged_urls
+) -> None:
+    """Test that the link check runs before the reminder transaction opens."""
+    reminders_during_check = []
+    mock_get_flagged_urls.side_effect = lambda urls: (
+        reminders_during_check.append(Reminder.objects.count()) or set()
+    )
+
+    generate_data(user.id, "irrelevant")
+
+    assert reminders_during_check == [0]
+    assert Reminder.objects.filter(user=user).count() == 1
+
+
+# link check warm-up tests
+
+
+@pytest.mark.django_db
+def test_warm_link_checks_checks_next_reminder(user, mock_get_flagged_urls) -> None:
+    for i in range(4):
+        temp_star = create_temp_star(
+            user=user,
+            provider_id=str(i),
+            name=f"repo{i}",
+            owner="owner",
+            owner_id="123",
+            star_count=10,
+            repo_url=f"https://github.com/owner/repo{i}",
+            project_url=f"https://project{i}.example",
+        )
+        TempStar.objects.filter(id=temp_star.id).update(cycle_rank=i / 10)
+    user.user_profile.max_entries = 2
+    user.user_profile.save()
+    UserProfile.objects.filter(user=user).update(cycle_cursor=0.05)
+
+    warm_link_checks(user.id, "irrelevant")
+
+    mock_get_flagged_urls.assert_called_once_with(
+        ["https://project1.example", "https://project2.example"]
+    )
+    assert not Reminder.objects.exists()
+
+
+@pytest.mark.django_db
+@patch("starminder.implementations.jobs.sentry_sdk")
+def test_warm_link_checks_survives_failure(
+    mock_sentry, user, temp_star, mock_get_flagged_urls
+) -> None:
+    mock_get_flagged_urls.side_effect = RuntimeError("boom")
+
+    warm_link_checks(user.id, "irrelevant")
+
+    mock_sentry.capture_exception.assert_called_once()
+
+
 # checker failure tests
 
 
@@ -1478,9 +2703,6 @@ def test_generate_data_survives_checker_failure(
     assert star.name_flagged is False
     assert star.description_flagged is False
 
-    cleanup_call = mock_async_task.call_args_list[-1]
-    assert cleanup_call[0][0] == "starminder.implementations.jobs.cleanup_temp_stars"
-
 
 @pytest.mark.django_db
 @patch("starminder.implementations.jobs.async_task")
@@ -1488,7 +2710,7 @@ def test_generate_data_flags_unicode_description_domain(
     mock_async_task, user, mock_get_flagged_urls
 ) -> None:
     """Test that bare unicode domains in descriptions reach the checker."""
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -1517,7 +2739,7 @@ def test_generate_data_flags_flagged_name(
     mock_async_task, user, mock_get_flagged_urls
 ) -> None:
     """Test that a domain-like flagged name sets the flag but stays raw."""
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -1556,7 +2778,7 @@ def test_generate_data_checks_name_urls_in_batch(
     mock_async_task, user, mock_get_flagged_urls
 ) -> None:
     """Test that name-derived URLs join the single batch call."""
-    TempStar.objects.create(
+    create_temp_star(
         user=user,
         provider="github",
         provider_id="1",
@@ -1584,14 +2806,9 @@ def test_generate_data_checks_name_urls_in_batch(
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.datetime")
-def test_start_jobs_excludes_disabled_users(
-    mock_datetime, mock_async_task, user, user2
-) -> None:
+def test_start_jobs_excludes_disabled_users(clock, user, user2) -> None:
     """Test that disabled users are excluded from scheduled jobs."""
-    now = datetime(2025, 10, 11, 12, 0)
-    mock_datetime.now.return_value = now
+    now = NOON
 
     # Set both users to same schedule
     user.user_profile.day_of_week = now.weekday()
@@ -1604,42 +2821,41 @@ def test_start_jobs_excludes_disabled_users(
     user2.user_profile.enabled = False
     user2.user_profile.save()
 
+    clock.return_value = NOON
     start_jobs()
 
     # Only the enabled user should be scheduled
-    mock_async_task.assert_called_once_with(
-        "starminder.implementations.jobs.user_job",
-        user.id,
-    )
+    assert queued_user_ids() == [user.id]
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.datetime")
-def test_scheduled_for_excludes_disabled_profiles(
-    mock_datetime, mock_async_task, user, user2
-) -> None:
-    """Test that UserProfile.objects.scheduled_for() excludes disabled users."""
-    now = datetime(2025, 10, 11, 12, 0)
+def test_due_excludes_disabled_profiles(user, user2) -> None:
+    """Test that UserProfile.objects.due() excludes disabled users."""
+    UserProfile.objects.update(next_run_at=BEFORE_NOON)
+    UserProfile.objects.filter(user=user2).update(enabled=False)
 
-    # Set both users to same schedule
-    user.user_profile.day_of_week = now.weekday()
-    user.user_profile.hour_of_day = now.hour
-    user.user_profile.enabled = True
-    user.user_profile.save()
+    due_profiles = UserProfile.objects.due(NOON)
 
-    user2.user_profile.day_of_week = now.weekday()
-    user2.user_profile.hour_of_day = now.hour
-    user2.user_profile.enabled = False
-    user2.user_profile.save()
+    assert [profile.user_id for profile in due_profiles] == [user.id]
+
+
+@pytest.mark.django_db
+def test_due_excludes_future_runs(user) -> None:
+    UserProfile.objects.update(next_run_at=NOON + timedelta(minutes=1))
+
+    assert not UserProfile.objects.due(NOON).exists()
+
+
+@pytest.mark.django_db
+def test_due_uses_next_run_index(user) -> None:
+    if connection.vendor == "postgresql":
+        # a test-sized table is always cheaper to scan sequentially
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
 
-    scheduled_profiles = UserProfile.objects.scheduled_for(now)
+    plan = UserProfile.objects.due(NOON).explain()
 
-    # Only the enabled user should be in the queryset
-    assert scheduled_profiles.count() == 1
-    first_profile = scheduled_profiles.first()
-    assert first_profile is not None
-    assert first_profile.user.id == user.id
+    assert "userprofile_next_run" in plan
 
 
 @pytest.mark.django_db
@@ -1656,56 +2872,48 @@ def test_new_users_enabled_by_default(db, django_user_model) -> None:
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.datetime")
-def test_disabling_user_prevents_scheduling(
-    mock_datetime, mock_async_task, user
-) -> None:
+def test_disabling_user_prevents_scheduling(clock, user) -> None:
     """Test that disabling a user prevents them from being scheduled."""
-    now = datetime(2025, 10, 11, 12, 0)
-    mock_datetime.now.return_value = now
+    now = NOON
 
     user.user_profile.day_of_week = now.weekday()
     user.user_profile.hour_of_day = now.hour
     user.user_profile.enabled = True
     user.user_profile.save()
 
+    clock.return_value = NOON
     start_jobs()
-    assert mock_async_task.call_count == 1
+    assert queued_user_ids() == [user.id]
 
     # Now disable the user
-    mock_async_task.reset_mock()
+    OrmQ.objects.all().delete()
     user.user_profile.enabled = False
     user.user_profile.save()
 
+    clock.return_value = NOON
     start_jobs()
-    mock_async_task.assert_not_called()
+    assert queued_user_ids() == []
 
 
 @pytest.mark.django_db
-@patch("starminder.implementations.jobs.async_task")
-@patch("starminder.implementations.jobs.datetime")
-def test_reenabling_user_allows_scheduling(
-    mock_datetime, mock_async_task, user
-) -> None:
+def test_reenabling_user_allows_scheduling(clock, user) -> None:
     """Test that re-enabling a user allows them to be scheduled again."""
-    now = datetime(2025, 10, 11, 12, 0)
-    mock_datetime.now.return_value = now
+    now = NOON
 
     user.user_profile.day_of_week = now.weekday()
     user.user_profile.hour_of_day = now.hour
     user.user_profile.enabled = False
     user.user_profile.save()
 
+    clock.return_value = NOON
     start_jobs()
-    mock_async_task.assert_not_called()
+    assert queued_user_ids() == []
 
-    # Re-enable the user
+    # Re-enable the user ahead of the next run
+    clock.return_value = BEFORE_NOON
     user.user_profile.enabled = True
     user.user_profile.save()
 
+    clock.return_value = NOON
     start_jobs()
-    mock_async_task.assert_called_once_with(
-        "starminder.implementations.jobs.user_job",
-        user.id,
-    )
+    assert queued_user_ids() == [user.id]
@@ -214,3 +214,10 @@ EMAIL_FROM = "Starminder <hello@starminder.dev>"
 
 PUSHOVER_USER_KEY = parsenvy.str("PUSHOVER_USER_KEY")
 PUSHOVER_API_TOKEN = parsenvy.str("PUSHOVER_API_TOKEN")
+
+# "rest" or "graphql"; GraphQL fetches only the fields stars need
+GITHUB_STAR_FETCHER = parsenvy.str("GITHUB_STAR_FETCHER", "rest")
+
+# minutes over which each hour's user jobs are spread, each user at a stable
+# offset; 0 queues them all at once
+START_JOBS_SPREAD_MINUTES = parsenvy.int("START_JOBS_SPREAD_MINUTES", 0)